@@ -32,6 +32,7 @@ from FlatCAMObj import FlatCAMCNCjob, FlatCAMExcellon, FlatCAMGerber, FlatCAMGeo
 from PlotCanvas import PlotCanvas
 from FlatCAMGUI import FlatCAMGUI, GlobalOptionsUI, FlatCAMActivityView, FlatCAMInfoBar
 from FlatCAMCommon import LoudDict
+from FlatCAMCache import GeometryCache
 from FlatCAMShell import FCShell
 from FlatCAMDraw import FlatCAMDraw
 from FlatCAMProcess import *
@@ -265,6 +266,9 @@ class App(QtCore.QObject):
             "excellon_spindlespeed": self.defaults_form.excellon_group.spindlespeed_entry,
             "excellon_toolchangez": self.defaults_form.excellon_group.toolchangez_entry,
             "excellon_tooldia": self.defaults_form.excellon_group.tooldia_entry,
+            "excellon_optimize": self.defaults_form.excellon_group.optimize_cb,
+            "excellon_canned": self.defaults_form.excellon_group.canned_cb,
+            "excellon_peckdepth": self.defaults_form.excellon_group.peckdepth_entry,
             "geometry_plot": self.defaults_form.geometry_group.plot_cb,
             "geometry_cutz": self.defaults_form.geometry_group.cutz_entry,
             "geometry_travelz": self.defaults_form.geometry_group.travelz_entry,
@@ -277,12 +281,16 @@ class App(QtCore.QObject):
             "geometry_selectmethod": self.defaults_form.geometry_group.selectmethod_combo,
             "geometry_pathconnect": self.defaults_form.geometry_group.pathconnect_cb,
             "geometry_paintcontour": self.defaults_form.geometry_group.contour_cb,
+            "geometry_optimize": self.defaults_form.geometry_group.optimize_cb,
             "cncjob_plot": self.defaults_form.cncjob_group.plot_cb,
+            "cncjob_fastplot": self.defaults_form.cncjob_group.fastplot_cb,
             "cncjob_tooldia": self.defaults_form.cncjob_group.tooldia_entry,
             "cncjob_prepend": self.defaults_form.cncjob_group.prepend_text,
             "cncjob_append": self.defaults_form.cncjob_group.append_text,
             "cncjob_dwell": self.defaults_form.cncjob_group.dwell_cb,
-            "cncjob_dwelltime": self.defaults_form.cncjob_group.dwelltime_cb
+            "cncjob_dwelltime": self.defaults_form.cncjob_group.dwelltime_cb,
+            "cncjob_compress": self.defaults_form.cncjob_group.compress_cb,
+            "cncjob_compresstolerance": self.defaults_form.cncjob_group.compresstolerance_entry
         }
 
         self.defaults = LoudDict()
@@ -314,6 +322,9 @@ class App(QtCore.QObject):
             "excellon_spindlespeed": None,
             "excellon_toolchangez": 1.0,
             "excellon_tooldia": 0.016,
+            "excellon_optimize": False,
+            "excellon_canned": False,
+            "excellon_peckdepth": 0.0,
             "geometry_plot": True,
             "geometry_cutz": -0.002,
             "geometry_travelz": 0.1,
@@ -326,12 +337,16 @@ class App(QtCore.QObject):
             "geometry_selectmethod": "single",
             "geometry_pathconnect": True,
             "geometry_paintcontour": True,
+            "geometry_optimize": False,
             "cncjob_plot": True,
+            "cncjob_fastplot": True,
             "cncjob_tooldia": 0.016,
             "cncjob_prepend": "",
             "cncjob_append": "",
             "cncjob_dwell": True,
             "cncjob_dwelltime": 1,
+            "cncjob_compress": False,
+            "cncjob_compresstolerance": 0.0,
             "background_timeout": 300000,  # Default value is 5 minutes
             "verbose_error_level": 0,  # Shell verbosity 0 = default
                                        # (python trace only for unknown errors),
@@ -359,7 +374,16 @@ class App(QtCore.QObject):
             "zdownrate": None,
             "excellon_zeros": "L",
             "gerber_use_buffer_for_union": True,
-            "cncjob_coordinate_format": "X%.4fY%.4f"
+            "gerber_use_fast_tokenizer": True,
+            "gerber_use_parallel_union": False,
+            "gerber_arc_tolerance": 0.0002,
+            "cncjob_arc_tolerance": 0.0002,
+            "cncjob_annotate_density": 0.002,
+            "cncjob_arc_fit_tolerance": 0.0,
+            "cncjob_coordinate_format": "X%.4fY%.4f",
+            "geometry_paint_workers": 1,
+            "global_geometry_cache": True,
+            "global_geometry_cache_size": 200  # MB
         })
 
         ###############################
@@ -375,6 +399,10 @@ class App(QtCore.QObject):
         self.propagate_defaults()
         self.restore_main_win_geom()
 
+        # Parsed Gerber and Excellon files
+        self.geometry_cache = GeometryCache(self.data_path + '/cache',
+                                            max_size=self.defaults["global_geometry_cache_size"] * 1024 * 1024)
+
         def auto_save_defaults():
             try:
                 self.save_defaults(silent=True)
@@ -410,6 +438,9 @@ class App(QtCore.QObject):
             "excellon_spindlespeed": self.options_form.excellon_group.spindlespeed_entry,
             "excellon_toolchangez": self.options_form.excellon_group.toolchangez_entry,
             "excellon_tooldia": self.options_form.excellon_group.tooldia_entry,
+            "excellon_optimize": self.options_form.excellon_group.optimize_cb,
+            "excellon_canned": self.options_form.excellon_group.canned_cb,
+            "excellon_peckdepth": self.options_form.excellon_group.peckdepth_entry,
             "geometry_plot": self.options_form.geometry_group.plot_cb,
             "geometry_cutz": self.options_form.geometry_group.cutz_entry,
             "geometry_travelz": self.options_form.geometry_group.travelz_entry,
@@ -420,7 +451,9 @@ class App(QtCore.QObject):
             "geometry_paintoverlap": self.options_form.geometry_group.paintoverlap_entry,
             "geometry_paintmargin": self.options_form.geometry_group.paintmargin_entry,
             "geometry_selectmethod": self.options_form.geometry_group.selectmethod_combo,
+            "geometry_optimize": self.options_form.geometry_group.optimize_cb,
             "cncjob_plot": self.options_form.cncjob_group.plot_cb,
+            "cncjob_fastplot": self.options_form.cncjob_group.fastplot_cb,
             "cncjob_tooldia": self.options_form.cncjob_group.tooldia_entry,
             "cncjob_prepend": self.options_form.cncjob_group.prepend_text,
             "cncjob_append": self.options_form.cncjob_group.append_text
@@ -453,6 +486,9 @@ class App(QtCore.QObject):
             "excellon_spindlespeed": None,
             "excellon_toolchangez": 1.0,
             "excellon_tooldia": 0.016,
+            "excellon_optimize": False,
+            "excellon_canned": False,
+            "excellon_peckdepth": 0.0,
             "geometry_plot": True,
             "geometry_cutz": -0.002,
             "geometry_travelz": 0.1,
@@ -463,7 +499,9 @@ class App(QtCore.QObject):
             "geometry_paintoverlap": 0.15,
             "geometry_paintmargin": 0.0,
             "geometry_selectmethod": "single",
+            "geometry_optimize": False,
             "cncjob_plot": True,
+            "cncjob_fastplot": True,
             "cncjob_tooldia": 0.016,
             "cncjob_prepend": "",
             "cncjob_append": "",
@@ -1401,6 +1439,7 @@ class App(QtCore.QObject):
         dimensions = ['gerber_isotooldia', 'gerber_cutoutmargin', 'gerber_cutoutgapsize',
                       'gerber_noncoppermargin', 'gerber_bboxmargin', 'excellon_drillz',
                       'excellon_travelz', 'excellon_feedrate', 'excellon_toolchangez', 'excellon_tooldia', 'cncjob_tooldia',
+                      'excellon_peckdepth', 'cncjob_compresstolerance',
                       'geometry_cutz', 'geometry_travelz', 'geometry_feedrate',
                       'geometry_cnctooldia', 'geometry_painttooldia', 'geometry_paintoverlap',
                       'geometry_paintmargin']
@@ -2034,6 +2073,54 @@ class App(QtCore.QObject):
             # GUI feedback
             self.inform.emit("Opened: " + filename)
 
+    def load_cached(self, obj, filename, params):
+        """
+        Populates a Gerber or Excellon object from the geometry
+        cache, if the file has been opened before with the same
+        parser settings. Reports the result on the shell.
+
+        :param obj: Object being initialized.
+        :type obj: FlatCAMGerber | FlatCAMExcellon
+        :param filename: Source file.
+        :type filename: str
+        :param params: Parser settings that affect the result.
+        :type params: dict
+        :return: Cache key (None if the cache is disabled) and whether
+            the object was loaded.
+        :rtype: tuple
+        """
+
+        if not self.defaults["global_geometry_cache"]:
+            return None, False
+
+        params = dict(params, units=obj.units)
+        key = self.geometry_cache.key(filename, obj.kind, params)
+        cached = self.geometry_cache.load(key, obj)
+
+        self.inform.emit("Geometry cache %s: %s (%d hits, %d misses)" %
+                         ("hit" if cached else "miss", filename,
+                          self.geometry_cache.hits, self.geometry_cache.misses))
+
+        return key, cached
+
+    def store_cached(self, key, obj):
+        """
+        Stores a freshly parsed object in the geometry cache. Failing
+        to do so is logged but does not affect the object.
+
+        :param key: Key from ``load_cached()``. Nothing is done if None.
+        :param obj: Parsed object.
+        :return: None
+        """
+
+        if key is None:
+            return
+
+        try:
+            self.geometry_cache.store(key, obj)
+        except Exception as e:
+            self.log.warning("Could not store in geometry cache: %s" % str(e))
+
     def open_gerber(self, filename, follow=False, outname=None):
         """
         Opens a Gerber file, parses it and creates a new object for
@@ -2058,7 +2145,15 @@ class App(QtCore.QObject):
             # Opening the file happens here
             self.progress.emit(30)
             try:
-                gerber_obj.parse_file(filename, follow=follow)
+                cache_key, cached = self.load_cached(gerber_obj, filename,
+                                                     {"follow": follow,
+                                                      "steps_per_circle": gerber_obj.steps_per_circ,
+                                                      "arc_tolerance": gerber_obj.arc_tolerance})
+                if not cached:
+                    # Parsing takes progress from 30 to 70.
+                    gerber_obj.parse_file(filename, follow=follow,
+                                          progress=lambda percent: app_obj.progress.emit(30 + 40 * percent // 100))
+                    self.store_cached(cache_key, gerber_obj)
 
             except IOError:
                 app_obj.inform.emit("[error] Failed to open file: " + filename)
@@ -2127,7 +2222,11 @@ class App(QtCore.QObject):
             #self.progress.emit(20)
 
             try:
-                excellon_obj.parse_file(filename)
+                cache_key, cached = self.load_cached(excellon_obj, filename,
+                                                     {"zeros": excellon_obj.zeros})
+                if not cached:
+                    excellon_obj.parse_file(filename,
+                                            progress=lambda percent: app_obj.progress.emit(percent * 70 // 100))
 
             except IOError:
                 app_obj.inform.emit("[error] Cannot open file: " + filename)
@@ -2141,7 +2240,9 @@ class App(QtCore.QObject):
                 raise
 
             try:
-                excellon_obj.create_geometry()
+                if not cached:
+                    excellon_obj.create_geometry()
+                    self.store_cached(cache_key, excellon_obj)
 
             except:
                 msg = "[error] An internal error has ocurred. See shell.\n"
@@ -2309,7 +2410,14 @@ class App(QtCore.QObject):
             "zdownrate": CNCjob,
             "excellon_zeros": Excellon,
             "gerber_use_buffer_for_union": Gerber,
-            "cncjob_coordinate_format": CNCjob
+            "gerber_use_fast_tokenizer": Gerber,
+            "gerber_use_parallel_union": Gerber,
+            "gerber_arc_tolerance": Gerber,
+            "cncjob_arc_tolerance": CNCjob,
+            "cncjob_coordinate_format": CNCjob,
+            "cncjob_annotate_density": CNCjob,
+            "cncjob_arc_fit_tolerance": CNCjob,
+            "geometry_paint_workers": Geometry
             # "spindlespeed": CNCjob
         }
 
@@ -0,0 +1,243 @@
+############################################################
+# FlatCAM: 2D Post-processing for Manufacturing            #
+# http://flatcam.org                                       #
+# Author: Juan Pablo Caram (c)                             #
+# Date: 2/5/2014                                           #
+# MIT Licence                                              #
+############################################################
+
+import os
+import shutil
+import hashlib
+import logging
+import numpy as np
+import simplejson as json
+from shapely import wkb
+
+from camlib import to_dict, dict2obj
+
+log = logging.getLogger('base2')
+
+
+class GeometryCache(object):
+    """
+    Persistent cache of parsed Gerber and Excellon objects.
+
+    Each entry is a folder named after a hash of the source file
+    and of the parameters that affect parsing. It contains:
+
+    * ``meta.json``: The serializable attributes of the object
+      (``ser_attrs``) other than the geometry and the drills.
+    * ``geometry.npy``: WKB of ``solid_geometry`` (each element if
+      it is a list) concatenated into a single byte array.
+    * ``offsets.npy``: Where each WKB starts in ``geometry.npy``.
+    * ``drills.npy``: Excellon drills as (x, y, tool index) rows.
+
+    Arrays are loaded memory-mapped. The total size of the cache is
+    kept under ``max_size`` by removing the least recently used
+    entries.
+    """
+
+    # Change when the format of the entries changes.
+    version = 1
+
+    # Serializable attributes not stored in meta.json. Options
+    # and kind belong to the application object, not the file.
+    skip_attrs = ['solid_geometry', 'drills', 'options', 'kind']
+
+    def __init__(self, path, max_size=200 * 1024 * 1024):
+        """
+        :param path: Folder for the cache. Created if it does not exist.
+        :type path: str
+        :param max_size: Maximum size of the cache in bytes.
+        :type max_size: int
+        """
+
+        self.path = path
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+            log.debug('Created geometry cache folder: ' + self.path)
+
+    @staticmethod
+    def key(filename, kind, params):
+        """
+        Key of a file in the cache.
+
+        :param filename: Source file.
+        :type filename: str
+        :param kind: Kind of object, i.e. "gerber" or "excellon".
+        :type kind: str
+        :param params: Parser settings that affect the result.
+        :type params: dict
+        :return: Hex digest of the contents of the file and the parameters.
+        :rtype: str
+        """
+
+        digest = hashlib.sha1()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+
+        digest.update(json.dumps([GeometryCache.version, kind, params],
+                                 sort_keys=True).encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key)
+
+    def store(self, key, obj):
+        """
+        Stores the parsed object in the cache and evicts old
+        entries if the cache is over its size.
+
+        :param key: Key as returned by ``key()``.
+        :param obj: Gerber or Excellon object after parsing.
+        :return: None
+        """
+
+        entry = self.entry_path(key)
+        tmp = entry + '.tmp'
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+
+        meta = {}
+        for attr in obj.ser_attrs:
+            if attr not in self.skip_attrs:
+                meta[attr] = getattr(obj, attr)
+
+        ## Geometry
+        geometry = obj.solid_geometry
+        meta['geometry_is_list'] = type(geometry) == list
+        if not meta['geometry_is_list']:
+            geometry = [geometry]
+
+        blobs = [wkb.dumps(geo) for geo in geometry]
+        offsets = np.cumsum([0] + [len(blob) for blob in blobs])
+        np.save(os.path.join(tmp, 'geometry.npy'), np.frombuffer(b''.join(blobs), dtype=np.uint8))
+        np.save(os.path.join(tmp, 'offsets.npy'), offsets)
+
+        ## Drills
+        if 'drills' in obj.ser_attrs:
+            drills = np.column_stack((obj.drill_x, obj.drill_y, obj.drill_tool)).astype(float)
+            meta['drill_tools'] = list(obj.drill_tools)
+            np.save(os.path.join(tmp, 'drills.npy'), drills)
+
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f, default=to_dict)
+
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.rename(tmp, entry)
+
+        self.evict(keep=key)
+
+    def load(self, key, obj):
+        """
+        Loads a cached entry into the object, if it exists.
+
+        :param key: Key as returned by ``key()``.
+        :param obj: Gerber or Excellon object to populate.
+        :return: Whether the entry was found and loaded.
+        :rtype: bool
+        """
+
+        entry = self.entry_path(key)
+
+        if not os.path.exists(os.path.join(entry, 'meta.json')):
+            self.misses += 1
+            return False
+
+        try:
+            with open(os.path.join(entry, 'meta.json')) as f:
+                meta = json.load(f, object_hook=dict2obj)
+
+            blob = np.load(os.path.join(entry, 'geometry.npy'), mmap_mode='r')
+            offsets = np.load(os.path.join(entry, 'offsets.npy'))
+            geometry = [wkb.loads(blob[offsets[i]:offsets[i + 1]].tobytes())
+                        for i in range(len(offsets) - 1)]
+
+            if 'drill_tools' in meta:
+                drills = np.load(os.path.join(entry, 'drills.npy'), mmap_mode='r')
+                obj.set_drills(drills[:, 0], drills[:, 1], drills[:, 2], meta['drill_tools'])
+        except Exception as e:
+            log.warning("Removing unreadable geometry cache entry %s: %s" % (key, str(e)))
+            shutil.rmtree(entry, ignore_errors=True)
+            self.misses += 1
+            return False
+
+        for attr in obj.ser_attrs:
+            if attr in meta and attr not in self.skip_attrs:
+                setattr(obj, attr, meta[attr])
+
+        obj.solid_geometry = geometry if meta['geometry_is_list'] else geometry[0]
+
+        # Mark as recently used.
+        os.utime(entry, None)
+
+        self.hits += 1
+        return True
+
+    def entries(self):
+        """
+        :return: List of (last use time, size in bytes, key) for every
+            entry in the cache.
+        :rtype: list
+        """
+
+        entries = []
+        for key in os.listdir(self.path):
+            entry = self.entry_path(key)
+            if key.endswith('.tmp') or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, key))
+        return entries
+
+    def size(self):
+        """
+        :return: Total size of the cache in bytes.
+        :rtype: int
+        """
+        return sum(entry[1] for entry in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the
+        cache is not larger than ``self.max_size``.
+
+        :param keep: Key of an entry that must not be removed.
+        :return: Number of entries removed.
+        :rtype: int
+        """
+
+        entries = sorted(self.entries())
+        total = sum(entry[1] for entry in entries)
+        removed = 0
+
+        for mtime, size, key in entries:
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total -= size
+            removed += 1
+            log.debug("Evicted geometry cache entry: %s" % key)
+
+        return removed
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+
+        :return: None
+        """
+        for mtime, size, key in self.entries():
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
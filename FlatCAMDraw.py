@@ -1508,27 +1508,16 @@ class FlatCAMDraw(QtCore.QObject):
                 if isinstance(geo, Polygon):
                     yield geo
 
-            raise StopIteration
-
         for geo in selected:
 
             local_results = []
-            for poly in recurse(geo.geo):
-
-                if method == "seed":
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = Geometry.clear_polygon2(poly.buffer(-margin),
-                                             tooldia, overlap=overlap)
-
-                else:
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = Geometry.clear_polygon(poly.buffer(-margin),
-                                            tooldia, overlap=overlap)
-
-                if cp is not None:
-                    local_results += list(cp.get_objects())
+            paths_list, _, _ = paint_polygons(list(recurse(geo.geo)), method, tooldia,
+                                              overlap=overlap, margin=margin)
+            for paths in paths_list:
+                if paths is not None:
+                    local_results += paths
 
-                results.append(cascaded_union(local_results))
+            results.append(cascaded_union(local_results))
 
         # This is a dirty patch:
         for r in results:
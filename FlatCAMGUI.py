@@ -649,6 +649,37 @@ class ExcellonOptionsGroupUI(OptionsGroupUI):
         self.spindlespeed_entry = IntEntry(allow_empty=True)
         grid1.addWidget(self.spindlespeed_entry, 4, 1)
 
+        optimizelabel = QtGui.QLabel('Optimize order:')
+        optimizelabel.setToolTip(
+            "Reorder the drills of each tool\n"
+            "to shorten the travel between them."
+        )
+        grid1.addWidget(optimizelabel, 5, 0)
+        self.optimize_cb = FCCheckBox()
+        grid1.addWidget(self.optimize_cb, 5, 1)
+
+        # Canned cycles
+        cannedlabel = QtGui.QLabel('Canned cycle:')
+        cannedlabel.setToolTip(
+            "Drill with a canned cycle (G81,\n"
+            "or G83 with pecking): one line\n"
+            "per hole instead of four."
+        )
+        grid1.addWidget(cannedlabel, 6, 0)
+        self.canned_cb = FCCheckBox()
+        grid1.addWidget(self.canned_cb, 6, 1)
+
+        pecklabel = QtGui.QLabel('Peck depth:')
+        pecklabel.setToolTip(
+            "Depth of each peck in the\n"
+            "canned cycle (G83). No\n"
+            "pecking (G81) if 0."
+        )
+        grid1.addWidget(pecklabel, 7, 0)
+        self.peckdepth_entry = LengthEntry()
+        grid1.addWidget(self.peckdepth_entry, 7, 1)
+        self.ois_peck = OptionalInputSection(self.canned_cb, [self.peckdepth_entry])
+
         #### Milling Holes ####
         self.mill_hole_label = QtGui.QLabel('<b>Mill Holes</b>')
         self.mill_hole_label.setToolTip(
@@ -744,6 +775,17 @@ class GeometryOptionsGroupUI(OptionsGroupUI):
         self.cncspindlespeed_entry = IntEntry(allow_empty=True)
         grid1.addWidget(self.cncspindlespeed_entry, 4, 1)
 
+        # Path order
+        optimizelabel = QtGui.QLabel('Optimize order:')
+        optimizelabel.setToolTip(
+            "Reorder the paths and choose where\n"
+            "to start each one to shorten the\n"
+            "travel between them."
+        )
+        grid1.addWidget(optimizelabel, 5, 0)
+        self.optimize_cb = FCCheckBox()
+        grid1.addWidget(self.optimize_cb, 5, 1)
+
         # ------------------------------
         ## Paint area
         # ------------------------------
@@ -796,13 +838,17 @@ class GeometryOptionsGroupUI(OptionsGroupUI):
         methodlabel.setToolTip(
             "Algorithm to paint the polygon:<BR>"
             "<B>Standard</B>: Fixed step inwards.<BR>"
-            "<B>Seed-based</B>: Outwards from seed."
+            "<B>Seed-based</B>: Outwards from seed.<BR>"
+            "<B>Straight lines</B>: Horizontal lines.<BR>"
+            "<B>Zig-zag lines</B>: Horizontal lines, back<BR>"
+            "and forth along the edges."
         )
         grid2.addWidget(methodlabel, 3, 0)
         self.paintmethod_combo = RadioSet([
             {"label": "Standard", "value": "standard"},
             {"label": "Seed-based", "value": "seed"},
-            {"label": "Straight lines", "value": "lines"}
+            {"label": "Straight lines", "value": "lines"},
+            {"label": "Zig-zag lines", "value": "zigzag"}
         ], orientation='vertical')
         grid2.addWidget(self.paintmethod_combo, 3, 1)
 
@@ -860,6 +906,16 @@ class CNCJobOptionsGroupUI(OptionsGroupUI):
         )
         grid0.addWidget(self.plot_cb, 0, 0)
 
+        # Fast plot CB
+        self.fastplot_cb = FCCheckBox('Fast plot')
+        self.fastplot_cb.setToolTip(
+            "Draw the tool paths as lines\n"
+            "instead of a shape for each.\n"
+            "Much faster for large jobs. Paths\n"
+            "are numbered only when zoomed in."
+        )
+        grid0.addWidget(self.fastplot_cb, 0, 1)
+
         # Tool dia for plot
         tdlabel = QtGui.QLabel('Tool dia:')
         tdlabel.setToolTip(
@@ -921,6 +977,26 @@ class CNCJobOptionsGroupUI(OptionsGroupUI):
         grid1.addWidget(dwelltime, 1, 0)
         grid1.addWidget(self.dwelltime_cb, 1, 1)
 
+        # Modal compression
+        compresslabel = QtGui.QLabel('Compress:')
+        compresslabel.setToolTip(
+            "Leave out words that do not change\n"
+            "the machine state, and moves that\n"
+            "go nowhere, to send fewer bytes."
+        )
+        compresstolerance = QtGui.QLabel('Merge tolerance:')
+        compresstolerance.setToolTip(
+            "Straight moves in a row that stay\n"
+            "this close to a line become one."
+        )
+        self.compress_cb = FCCheckBox()
+        self.compresstolerance_entry = LengthEntry()
+        grid1.addWidget(compresslabel, 2, 0)
+        grid1.addWidget(self.compress_cb, 2, 1)
+        grid1.addWidget(compresstolerance, 3, 0)
+        grid1.addWidget(self.compresstolerance_entry, 3, 1)
+        self.ois_compress = OptionalInputSection(self.compress_cb, [self.compresstolerance_entry])
+
 
 class GlobalOptionsUI(QtGui.QWidget):
     """
@@ -530,26 +530,30 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
         base_name = self.options["name"] + "_iso"
         base_name = outname or base_name
 
-        def generate_envelope(offset, invert):
+        def invert_envelope(geom):
             # isolation_geometry produces an envelope that is going on the left of the geometry
             # (the copper features). To leave the least amount of burrs on the features
             # the tool needs to travel on the right side of the features (this is called conventional milling)
             # the first pass is the one cutting all of the features, so it needs to be reversed
             # the other passes overlap preceding ones and cut the left over copper. It is better for them
             # to cut on the right side of the left over copper i.e on the left side of the features. 
-            geom = self.isolation_geometry(offset)
-            if invert:
-                if type(geom) is MultiPolygon:
-                    pl = []
-                    for p in geom:
-                        pl.append(Polygon(p.exterior.coords[::-1], p.interiors))
-                    geom = MultiPolygon(pl)
-                elif type(geom) is Polygon:
-                    geom = Polygon(geom.exterior.coords[::-1], geom.interiors)
-                else:
-                    raise str("Unexpected Geometry")
+            if type(geom) is MultiPolygon:
+                pl = []
+                for p in geom:
+                    pl.append(Polygon(p.exterior.coords[::-1], p.interiors))
+                geom = MultiPolygon(pl)
+            elif type(geom) is Polygon:
+                geom = Polygon(geom.exterior.coords[::-1], geom.interiors)
+            else:
+                raise str("Unexpected Geometry")
             return geom
 
+        # All passes are computed at once, each from the previous one.
+        offsets = [(2 * i + 1) / 2.0 * dia - i * overlap * dia for i in range(passes)]
+        envelopes = self.isolation_passes(offsets, tolerance=self.in_units(self.arc_tolerance))
+        if passes > 0:
+            envelopes[0] = invert_envelope(envelopes[0])
+
         if combine:
             iso_name = base_name
 
@@ -557,11 +561,7 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
             def iso_init(geo_obj, app_obj):
                 # Propagate options
                 geo_obj.options["cnctooldia"] = self.options["isotooldia"]
-                geo_obj.solid_geometry = []
-                for i in range(passes):
-                    offset = (2 * i + 1) / 2.0 * dia - i * overlap * dia
-                    geom = generate_envelope (offset, i == 0)
-                    geo_obj.solid_geometry.append(geom)
+                geo_obj.solid_geometry = list(envelopes)
                 app_obj.inform.emit("Isolation geometry created: %s" % geo_obj.options["name"])
 
             # TODO: Do something if this is None. Offer changing name?
@@ -570,17 +570,16 @@ class FlatCAMGerber(FlatCAMObj, Gerber):
         else:
             for i in range(passes):
 
-                offset = (2 * i + 1) / 2.0 * dia - i * overlap  * dia
                 if passes > 1:
                     iso_name = base_name + str(i + 1)
                 else:
                     iso_name = base_name
 
                 # TODO: This is ugly. Create way to pass data into init function.
-                def iso_init(geo_obj, app_obj):
+                def iso_init(geo_obj, app_obj, envelope=envelopes[i]):
                     # Propagate options
                     geo_obj.options["cnctooldia"] = self.options["isotooldia"]
-                    geo_obj.solid_geometry = generate_envelope (offset, i == 0)
+                    geo_obj.solid_geometry = envelope
                     app_obj.inform.emit("Isolation geometry created: %s" % geo_obj.options["name"])
 
                 # TODO: Do something if this is None. Offer changing name?
@@ -698,7 +697,10 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
             "tooldia": 0.1,
             "toolchange": False,
             "toolchangez": 1.0,
-            "spindlespeed": None
+            "spindlespeed": None,
+            "optimize": False,
+            "canned": False,
+            "peckdepth": 0.0
         })
 
         # TODO: Document this.
@@ -750,10 +752,9 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
                         except:
                             exc.app.log.warning("Failed to copy option.",option)
 
-                #deep copy of all drills,to avoid any references
-                for drill in exc.drills:
-                    point = Point(drill['point'].x,drill['point'].y)
-                    exc_final.drills.append({"point": point, "tool": drill['tool']})
+                # copy of all drills, to avoid any references
+                exc_final.add_drills(exc.drill_x, exc.drill_y,
+                                     [exc.drill_tools[t] for t in exc.drill_tool.tolist()])
                 toolsrework=dict()
                 max_numeric_tool=0
                 for toolname in list(exc.tools.copy().keys()):
@@ -789,14 +790,13 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
         self.ui.tools_table.setRowCount(n)
         self.ui.tools_table.setSortingEnabled(False)
 
+        drills_by_tool = self.drills_by_tool()
+
         i = 0
         for tool in self.tools:
 
-            drill_cnt = 0   # variable to store the nr of drills per tool
             # Find no of drills for the current tool
-            for drill in self.drills:
-                if drill.get('tool') == tool:
-                    drill_cnt += 1
+            drill_cnt = len(drills_by_tool.get(tool, []))
 
             id = QtGui.QTableWidgetItem(tool)
             id.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
@@ -846,7 +846,10 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
             "tooldia": self.ui.tooldia_entry,
             "toolchange": self.ui.toolchange_cb,
             "toolchangez": self.ui.toolchangez_entry,
-            "spindlespeed": self.ui.spindlespeed_entry
+            "spindlespeed": self.ui.spindlespeed_entry,
+            "optimize": self.ui.optimize_cb,
+            "canned": self.ui.canned_cb,
+            "peckdepth": self.ui.peckdepth_entry
         })
 
         assert isinstance(self.ui, ExcellonObjectUI), \
@@ -973,7 +976,13 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
             tools_csv = ','.join(tools)
             job_obj.generate_from_excellon_by_tool(self, tools_csv,
                                                    toolchange=self.options["toolchange"],
-                                                   toolchangez=self.options["toolchangez"])
+                                                   toolchangez=self.options["toolchangez"],
+                                                   optimize=self.options["optimize"],
+                                                   canned=self.options["canned"],
+                                                   peck=self.options["peckdepth"])
+            if self.options["optimize"]:
+                app_obj.inform.emit("Drill travel: %.4f in file order, %.4f optimized." %
+                                    job_obj.drill_travel)
 
             app_obj.progress.emit(50)
             job_obj.gcode_parse()
@@ -1013,6 +1022,7 @@ class FlatCAMExcellon(FlatCAMObj, Excellon):
         self.options['drillz'] *= factor
         self.options['travelz'] *= factor
         self.options['feedrate'] *= factor
+        self.options['peckdepth'] *= factor
 
     def plot(self):
 
@@ -1069,11 +1079,14 @@ class FlatCAMCNCjob(FlatCAMObj, CNCjob):
 
         self.options.update({
             "plot": True,
+            "fastplot": True,
             "tooldia": 0.4 / 25.4,  # 0.4mm in inches
             "append": "",
             "prepend": "",
             "dwell": False,
-            "dwelltime": 1
+            "dwelltime": 1,
+            "compress": False,
+            "compresstolerance": 0.0
         })
 
         # Attributes to be included in serialization
@@ -1091,12 +1104,15 @@ class FlatCAMCNCjob(FlatCAMObj, CNCjob):
 
         self.form_fields.update({
             "plot": self.ui.plot_cb,
+            "fastplot": self.ui.fastplot_cb,
             "tooldia": self.ui.tooldia_entry,
             "append": self.ui.append_text,
             "prepend": self.ui.prepend_text,
             "postprocess": self.ui.process_script,
             "dwell": self.ui.dwell_cb,
-            "dwelltime": self.ui.dwelltime_entry
+            "dwelltime": self.ui.dwelltime_entry,
+            "compress": self.ui.compress_cb,
+            "compresstolerance": self.ui.compresstolerance_entry
         })
 
         self.ui.plot_cb.stateChanged.connect(self.on_plot_cb_click)
@@ -1164,9 +1180,13 @@ class FlatCAMCNCjob(FlatCAMObj, CNCjob):
 
     def export_gcode(self, filename, preamble='', postamble='', processor=''):
 
-        lines = StringIO(self.gcode)
+        lines = self.gcode_writer.lines()
 
         ## Post processing
+        # Drop what does not change the machine state?
+        if self.options['compress']:
+            lines = self.modal_generator(lines, tolerance=self.options['compresstolerance'])
+
         # Dwell?
         if self.options['dwell']:
             log.debug("Will add G04!")
@@ -1185,6 +1205,10 @@ class FlatCAMCNCjob(FlatCAMObj, CNCjob):
         # Just for adding it to the recent files list.
         self.app.file_opened.emit("cncjob", filename)
 
+        if self.options['compress']:
+            self.app.inform.emit("Compressed G-code: %d bytes saved of %d." %
+                                 (self.modal_stats[0] - self.modal_stats[1], self.modal_stats[0]))
+
         self.app.inform.emit("Saved to: " + filename)
 
     def get_gcode(self, preamble='', postamble=''):
@@ -1204,7 +1228,9 @@ class FlatCAMCNCjob(FlatCAMObj, CNCjob):
         if not FlatCAMObj.plot(self):
             return
 
-        self.plot2(self.axes, tooldia=self.options["tooldia"])
+        self.plot2(self.axes, tooldia=self.options["tooldia"],
+                   fast=self.options["fastplot"],
+                   density=self.app.plotcanvas.get_density)
 
         self.app.plotcanvas.auto_adjust_axes()
 
@@ -1212,6 +1238,7 @@ class FlatCAMCNCjob(FlatCAMObj, CNCjob):
         factor = CNCjob.convert_units(self, units)
         FlatCAMApp.App.log.debug("FlatCAMCNCjob.convert_units()")
         self.options["tooldia"] *= factor
+        self.options["compresstolerance"] *= factor
 
 
 class FlatCAMGeometry(FlatCAMObj, Geometry):
@@ -1276,6 +1303,7 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
             "paintcontour": True,
             "multidepth": False,
             "depthperpass": 0.002,
+            "optimize": False,
             "selectmethod": "single"
         })
 
@@ -1310,6 +1338,7 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
             "paintcontour": self.ui.paintcontour_cb,
             "multidepth": self.ui.mpass_cb,
             "depthperpass": self.ui.maxdepth_entry,
+            "optimize": self.ui.optimize_cb,
             "selectmethod": self.ui.selectmethod_combo
         })
 
@@ -1391,6 +1420,12 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
                 cp = self.clear_polygon3(poly.buffer(-self.options["paintmargin"]),
                                          tooldia, overlap=overlap, connect=connect,
                                          contour=contour)
+
+            elif self.options["paintmethod"] == "zigzag":
+                # Type(cp) == FlatCAMRTreeStorage | None
+                cp = self.clear_polygon3(poly.buffer(-self.options["paintmargin"]),
+                                         tooldia, overlap=overlap, connect=connect,
+                                         contour=contour, zigzag=True)
             else:
                 # Type(cp) == FlatCAMRTreeStorage | None
                 cp = self.clear_polygon(poly.buffer(-self.options["paintmargin"]),
@@ -1407,7 +1442,11 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
             geo_obj.make_index()
             print("Done")
 
-            self.app.inform.emit("Done.")
+            if cp is not None and connect:
+                self.app.inform.emit("Done. %d paths connected, %d tool lifts." %
+                                     (cp.joins, cp.lifts))
+            else:
+                self.app.inform.emit("Done.")
 
         def job_thread(app_obj):
             try:
@@ -1443,8 +1482,6 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
         name = outname or self.options["name"] + "_paint"
 
         # This is a recursive generator of individual Polygons.
-        # Note: Double check correct implementation. Might exit
-        #       early if it finds something that is not a Polygon?
         def recurse(geo):
             try:
                 for subg in geo:
@@ -1454,37 +1491,27 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
                 if isinstance(geo, Polygon):
                     yield geo
 
-            raise StopIteration
-
         # Initializes the new geometry object
         def gen_paintarea(geo_obj, app_obj):
             assert isinstance(geo_obj, FlatCAMGeometry), \
                 "Initializer expected a FlatCAMGeometry, got %s" % type(geo_obj)
 
-            geo_obj.solid_geometry = []
-
-            for poly in recurse(self.solid_geometry):
+            def progress(done, total):
+                proc.set_status("%d/%d" % (done, total))
 
-                if self.options["paintmethod"] == "seed":
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = self.clear_polygon2(poly.buffer(-self.options["paintmargin"]),
-                                             tooldia, overlap=overlap, contour=contour,
-                                             connect=connect)
+            # Runs in worker processes if geometry_paint_workers
+            # is not 1. Results are in the order of the polygons.
+            results, joins, lifts = paint_polygons(list(recurse(self.solid_geometry)),
+                                                   self.options["paintmethod"], tooldia,
+                                                   overlap=overlap,
+                                                   margin=self.options["paintmargin"],
+                                                   connect=connect, contour=contour,
+                                                   progress=progress)
 
-                elif self.options["paintmethod"] == "lines":
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = self.clear_polygon3(poly.buffer(-self.options["paintmargin"]),
-                                             tooldia, overlap=overlap, contour=contour,
-                                             connect=connect)
-
-                else:
-                    # Type(cp) == FlatCAMRTreeStorage | None
-                    cp = self.clear_polygon(poly.buffer(-self.options["paintmargin"]),
-                                            tooldia, overlap=overlap, contour=contour,
-                                            connect=connect)
-
-                if cp is not None:
-                    geo_obj.solid_geometry += list(cp.get_objects())
+            geo_obj.solid_geometry = []
+            for paths in results:
+                if paths is not None:
+                    geo_obj.solid_geometry += paths
 
             geo_obj.options["cnctooldia"] = tooldia
 
@@ -1493,7 +1520,10 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
             geo_obj.make_index()
             print("Done")
 
-            self.app.inform.emit("Done.")
+            if connect:
+                self.app.inform.emit("Done. %d paths connected, %d tool lifts." % (joins, lifts))
+            else:
+                self.app.inform.emit("Done.")
 
         def job_thread(app_obj):
             try:
@@ -1526,6 +1556,7 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
                        spindlespeed=None,
                        multidepth=None,
                        depthperpass=None,
+                       optimize=None,
                        use_thread=True):
         """
         Creates a CNCJob out of this Geometry object. The actual
@@ -1538,6 +1569,7 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
         :param tooldia: Tool diameter
         :param outname: Name of the new object
         :param spindlespeed: Spindle speed (RPM)
+        :param optimize: Reorder the paths to shorten the travel.
         :return: None
         """
 
@@ -1548,6 +1580,7 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
         tooldia = tooldia if tooldia is not None else self.options["cnctooldia"]
         multidepth = multidepth if multidepth is not None else self.options["multidepth"]
         depthperpass = depthperpass if depthperpass is not None else self.options["depthperpass"]
+        optimize = optimize if optimize is not None else self.options["optimize"]
 
         # To allow default value to be "" (optional in gui) and translate to None
         # if not isinstance(spindlespeed, int):
@@ -1580,7 +1613,14 @@ class FlatCAMGeometry(FlatCAMObj, Geometry):
             job_obj.generate_from_geometry_2(self,
                                              multidepth=multidepth,
                                              depthpercut=depthperpass,
-                                             tolerance=0.0005)
+                                             tolerance=0.0005,
+                                             optimize=optimize)
+            if optimize:
+                app_obj.inform.emit("Path travel: %.4f nearest first, %.4f optimized." %
+                                    job_obj.path_travel)
+            if job_obj.arc_fit_lines[1] < job_obj.arc_fit_lines[0]:
+                app_obj.inform.emit("Arc fitting: %d cutting moves in %d lines." %
+                                    tuple(job_obj.arc_fit_lines))
 
             app_obj.progress.emit(50)
             job_obj.gcode_parse()
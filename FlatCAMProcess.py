@@ -29,7 +29,8 @@ class FCProcess(object):
 
     def __init__(self, descr):
         self.callbacks = {
-            "done": []
+            "done": [],
+            "change": []
         }
         self.descr = descr
         self.status = "Active"
@@ -66,8 +67,14 @@ class FCProcess(object):
     def set_status(self, status_string):
         self.status = status_string
 
+        for fcn in self.callbacks["change"]:
+            fcn(self)
+
     def status_msg(self):
-        return self.descr
+        if self.status == "Active":
+            return self.descr
+
+        return "%s %s" % (self.descr, self.status)
 
 
 class FCProcessContainer(object):
@@ -94,6 +101,7 @@ class FCProcessContainer(object):
         proc = FCProcess(descr)
 
         proc.connect(self.on_done, event="done")
+        proc.connect(self.on_change, event="change")
 
         self.add(proc)
 
@@ -14,16 +14,24 @@ from numpy import arctan2, Inf, array, sqrt, pi, ceil, sin, cos, dot, float32, \
     transpose
 from numpy.linalg import solve, norm
 from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
 import re
 import sys
 import traceback
 from decimal import Decimal
 
+import os
+import math
+import time
+import mmap
 import collections
+import multiprocessing
+import concurrent.futures
 import numpy as np
 import matplotlib
 #import matplotlib.pyplot as plt
 #from scipy.spatial import Delaunay, KDTree
+from scipy.spatial import cKDTree
 
 from rtree import index as rtindex
 
@@ -32,9 +40,12 @@ from shapely.geometry import Polygon, LineString, Point, LinearRing
 from shapely.geometry import MultiPoint, MultiPolygon
 from shapely.geometry import box as shply_box
 from shapely.ops import cascaded_union, unary_union
+from shapely.strtree import STRtree
+from shapely.prepared import prep
 import shapely.affinity as affinity
 from shapely.wkt import loads as sloads
 from shapely.wkt import dumps as sdumps
+from shapely.wkb import loads as wkb_loads
 from shapely.geometry.base import BaseGeometry
 
 # Used for solid polygons in Matplotlib
@@ -76,7 +87,8 @@ class Geometry(object):
     """
 
     defaults = {
-        "init_units": 'in'
+        "init_units": 'in',
+        "paint_workers": 1
     }
 
     def __init__(self):
@@ -416,6 +428,40 @@ class Geometry(object):
         """
         return self.solid_geometry.buffer(offset)
 
+    def isolation_passes(self, offsets, tolerance=0.0):
+        """
+        Creates contours around geometry at each of the given
+        offset distances. Each pass is the previous one buffered
+        by the difference in offset, which is much faster than
+        buffering the whole geometry again at the full offset.
+
+        :param offsets: Offset distances, in increasing order.
+        :type offsets: list
+        :param tolerance: Passes after the first are simplified
+            within this distance, so that vertices on round
+            corners do not pile up from pass to pass.
+        :type tolerance: float
+        :return: The buffered geometry for each offset.
+        :rtype: list
+        """
+        passes = []
+
+        for i, offset in enumerate(offsets):
+            t0 = time.time()
+
+            if i == 0 or offset <= offsets[i - 1]:
+                geom = self.isolation_geometry(offset)
+            else:
+                geom = passes[-1].buffer(offset - offsets[i - 1])
+                if tolerance > 0:
+                    geom = geom.simplify(tolerance)
+
+            passes.append(geom)
+            log.debug("isolation_passes(): pass %d at offset %f in %f seconds." %
+                      (i + 1, offset, time.time() - t0))
+
+        return passes
+
     def import_svg(self, filename, flip=True):
         """
         Imports shapes from an SVG file into the object's geometry.
@@ -640,7 +686,7 @@ class Geometry(object):
 
     @staticmethod
     def clear_polygon3(polygon, tooldia, overlap=0.15, connect=True,
-                       contour=True):
+                       contour=True, zigzag=False):
         """
         Creates geometry inside a polygon for a tool to cover
         the whole area.
@@ -653,6 +699,8 @@ class Geometry(object):
         :param overlap: Tool path overlap percentage.
         :param connect: Connect lines to avoid tool lifts.
         :param contour: Paint around the edges.
+        :param zigzag: Link the lines back and forth into
+            zig-zag paths, before connecting them.
         :return:
         """
 
@@ -666,7 +714,12 @@ class Geometry(object):
         geoms = FlatCAMRTreeStorage()
         geoms.get_points = get_pts
 
-        lines = []
+        # Trim to the polygon
+        margin_poly = polygon.buffer(-tooldia / 2)
+        if margin_poly.is_empty:
+            return None
+
+        ys = []
 
         # Bounding box
         left, bot, right, top = polygon.bounds
@@ -674,31 +727,32 @@ class Geometry(object):
         # First line
         y = top - tooldia / 2
         while y > bot + tooldia / 2:
-            line = LineString([(left, y), (right, y)])
-            lines.append(line)
+            ys.append(y)
             y -= tooldia * (1 - overlap)
 
         # Last line
-        y = bot + tooldia / 2
-        line = LineString([(left, y), (right, y)])
-        lines.append(line)
-
-        # Combine
-        linesgeo = unary_union(lines)
+        ys.append(bot + tooldia / 2)
 
-        # Trim to the polygon
-        margin_poly = polygon.buffer(-tooldia / 2)
-        lines_trimmed = linesgeo.intersection(margin_poly)
+        # The first and last lines can run along the top and
+        # bottom edges, so they are moved inside by a hair.
+        hair = tooldia * 1e-6
+        ys = np.clip(ys, margin_poly.bounds[1] + hair, margin_poly.bounds[3] - hair)
 
         # Add lines to storage
-        for line in lines_trimmed:
-            geoms.insert(line)
+        if zigzag:
+            for path in scanline_zigzag(margin_poly, ys):
+                geoms.insert(LineString(path))
+        else:
+            rows, lefts, rights = scanline_segments(margin_poly, ys)[:3]
+            for row, x0, x1 in zip(rows, lefts, rights):
+                geoms.insert(LineString([(x0, ys[row]), (x1, ys[row])]))
 
         # Add margin (contour) to storage
         if contour:
-            geoms.insert(margin_poly.exterior)
-            for ints in margin_poly.interiors:
-                geoms.insert(ints)
+            for poly in autolist(margin_poly):
+                geoms.insert(poly.exterior)
+                for ints in poly.interiors:
+                    geoms.insert(ints)
 
         # Optimization: Reduce lifts
         if connect:
@@ -734,6 +788,13 @@ class Geometry(object):
         Connects paths that results in a connection segment that is
         within the paint area. This avoids unnecessary tool lifting.
 
+        The tool fits along a connection if the connection is within
+        the boundary shrunk by the tool radius. Connections well inside
+        or well outside of it are decided by testing the segment alone
+        against the shrunk boundary. Only the ones in between are
+        buffered and tested against the boundary. All polygons are
+        prepared once.
+
         :param storage: Geometry to be optimized.
         :type storage: FlatCAMRTreeStorage
         :param boundary: Polygon defining the limits of the paintable area.
@@ -742,7 +803,9 @@ class Geometry(object):
         :rtype tooldia: float
         :param max_walk: Maximum allowable distance without lifting tool.
         :type max_walk: float or None
-        :return: Optimized geometry.
+        :return: Optimized geometry. Its ``joins`` and ``lifts``
+            attributes are the number of connections made and of
+            tool lifts left.
         :rtype: FlatCAMRTreeStorage
         """
 
@@ -756,26 +819,27 @@ class Geometry(object):
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
 
-        # storage = FlatCAMRTreeStorage()
-        # storage.get_points = get_pts
-        #
-        # for shape in geolist:
-        #     if shape is not None:  # TODO: This shouldn't have happened.
-        #         # Make LlinearRings into linestrings otherwise
-        #         # When chaining the coordinates path is messed up.
-        #         storage.insert(LineString(shape))
-        #         #storage.insert(shape)
+        ## Where the tool fits
+        # Margins are well above the error of buffer() with its
+        # default resolution (under 0.2% of the distance).
+        margin = tooldia / 100
+        fits = prep(boundary)
+        fits_inner = prep(boundary.buffer(-tooldia / 2 - margin))
+        fits_outer = prep(boundary.buffer(-tooldia / 2 + margin))
 
         ## Iterate over geometry paths getting the nearest each time.
         #optimized_paths = []
         optimized_paths = FlatCAMRTreeStorage()
         optimized_paths.get_points = get_pts
+        joins = 0
+        lifts = 0
         path_count = 0
         current_pt = (0, 0)
         pt, geo = storage.nearest(current_pt)
         storage.remove(geo)
-        geo = LineString(geo)
-        current_pt = geo.coords[-1]
+        # Coordinates of the path being connected.
+        coords = list(geo.coords)
+        current_pt = coords[-1]
         try:
             while True:
                 path_count += 1
@@ -783,57 +847,69 @@ class Geometry(object):
 
                 pt, candidate = storage.nearest(current_pt)
                 storage.remove(candidate)
-                candidate = LineString(candidate)
+                candidate_coords = list(candidate.coords)
 
                 # If last point in geometry is the nearest
                 # then reverse coordinates.
                 # but prefer the first one if last == first
-                if pt != candidate.coords[0] and pt == candidate.coords[-1]:
-                    candidate.coords = list(candidate.coords)[::-1]
+                if pt != candidate_coords[0] and pt == candidate_coords[-1]:
+                    candidate_coords.reverse()
 
                 # Straight line from current_pt to pt.
                 # Is the toolpath inside the geometry?
                 walk_path = LineString([current_pt, pt])
-                walk_cut = walk_path.buffer(tooldia / 2)
+                if walk_path.length >= max_walk:
+                    inside = False
+                elif fits_inner.contains(walk_path):
+                    inside = True
+                elif not fits_outer.contains(walk_path):
+                    inside = False
+                else:
+                    inside = fits.contains(walk_path.buffer(tooldia / 2))
 
-                if walk_cut.within(boundary) and walk_path.length < max_walk:
+                if inside:
                     #log.debug("Walk to path #%d is inside. Joining." % path_count)
 
                     # Completely inside. Append...
-                    geo.coords = list(geo.coords) + list(candidate.coords)
-                    # try:
-                    #     last = optimized_paths[-1]
-                    #     last.coords = list(last.coords) + list(geo.coords)
-                    # except IndexError:
-                    #     optimized_paths.append(geo)
+                    coords.extend(candidate_coords)
+                    joins += 1
 
                 else:
 
                     # Have to lift tool. End path.
                     #log.debug("Path #%d not within boundary. Next." % path_count)
-                    #optimized_paths.append(geo)
-                    optimized_paths.insert(geo)
-                    geo = candidate
+                    optimized_paths.insert(LineString(coords))
+                    coords = candidate_coords
+                    lifts += 1
 
-                current_pt = geo.coords[-1]
-
-                # Next
-                #pt, geo = storage.nearest(current_pt)
+                current_pt = coords[-1]
 
         except StopIteration:  # Nothing left in storage.
-            #pass
-            optimized_paths.insert(geo)
+            optimized_paths.insert(LineString(coords))
+
+        log.debug("paint_connect(): %d joins, %d lifts." % (joins, lifts))
+        optimized_paths.joins = joins
+        optimized_paths.lifts = lifts
 
         return optimized_paths
 
     @staticmethod
-    def path_connect(storage, origin=(0, 0)):
+    def path_connect(storage, origin=(0, 0), tolerance=1e-9):
         """
         Simplifies paths in the FlatCAMRTreeStorage storage by
         connecting paths that touch on their enpoints.
 
+        Endpoints are found in a dictionary keyed by their coordinates
+        quantized to ``tolerance``, so each join is a lookup. Chains
+        start at the paths nearest to ``origin`` and grow at both ends.
+        Their coordinates are kept as a list of arrays and become a
+        LineString once, when the chain cannot grow any more.
+        LinearRings are not connected.
+
         :param storage: Storage containing the initial paths.
         :rtype storage: FlatCAMRTreeStorage
+        :param origin: Chains start from paths near this point.
+        :param tolerance: Endpoints closer than this are joined.
         :return: Simplified storage.
         :rtype: FlatCAMRTreeStorage
         """
@@ -843,95 +919,76 @@ class Geometry(object):
         ## Index first and last points in paths
         def get_pts(o):
             return [o.coords[0], o.coords[-1]]
-        #
-        # storage = FlatCAMRTreeStorage()
-        # storage.get_points = get_pts
-        #
-        # for shape in pathlist:
-        #     if shape is not None:  # TODO: This shouldn't have happened.
-        #         storage.insert(shape)
 
-        path_count = 0
-        pt, geo = storage.nearest(origin)
-        storage.remove(geo)
-        #optimized_geometry = [geo]
         optimized_geometry = FlatCAMRTreeStorage()
         optimized_geometry.get_points = get_pts
-        #optimized_geometry.insert(geo)
-        try:
-            while True:
-                path_count += 1
 
-                #print "geo is", geo
-
-                _, left = storage.nearest(geo.coords[0])
-                #print "left is", left
-
-                # If left touches geo, remove left from original
-                # storage and append to geo.
-                if type(left) == LineString:
-                    if left.coords[0] == geo.coords[0]:
-                        storage.remove(left)
-                        geo.coords = list(geo.coords)[::-1] + list(left.coords)
-                        continue
-
-                    if left.coords[-1] == geo.coords[0]:
-                        storage.remove(left)
-                        geo.coords = list(left.coords) + list(geo.coords)
-                        continue
-
-                    if left.coords[0] == geo.coords[-1]:
-                        storage.remove(left)
-                        geo.coords = list(geo.coords) + list(left.coords)
-                        continue
-
-                    if left.coords[-1] == geo.coords[-1]:
-                        storage.remove(left)
-                        geo.coords = list(geo.coords) + list(left.coords)[::-1]
-                        continue
-
-                _, right = storage.nearest(geo.coords[-1])
-                #print "right is", right
-
-                # If right touches geo, remove left from original
-                # storage and append to geo.
-                if type(right) == LineString:
-                    if right.coords[0] == geo.coords[-1]:
-                        storage.remove(right)
-                        geo.coords = list(geo.coords) + list(right.coords)
-                        continue
-
-                    if right.coords[-1] == geo.coords[-1]:
-                        storage.remove(right)
-                        geo.coords = list(geo.coords) + list(right.coords)[::-1]
-                        continue
-
-                    if right.coords[0] == geo.coords[0]:
-                        storage.remove(right)
-                        geo.coords = list(geo.coords)[::-1] + list(right.coords)
-                        continue
-
-                    if right.coords[-1] == geo.coords[0]:
-                        storage.remove(right)
-                        geo.coords = list(left.coords) + list(geo.coords)
+        paths = []
+        for geo in storage.get_objects():
+            if type(geo) == LineString:
+                paths.append(np.array(geo.coords))
+            else:
+                optimized_geometry.insert(geo)
+
+        if len(paths) == 0:
+            return optimized_geometry
+
+        ## Endpoints by cell
+        starts = np.array([path[0, :2] for path in paths])
+        ends = np.array([path[-1, :2] for path in paths])
+        cells = {}
+        for i, cell in enumerate(map(tuple, np.rint(np.vstack((starts, ends)) / tolerance).astype(np.int64).tolist())):
+            cells.setdefault(cell, []).append(i)
+
+        n = len(paths)
+        used = [False] * n
+
+        def take(point):
+            """
+            Finds a path not yet used with an endpoint at ``point``.
+            Returns its coordinates starting at that endpoint.
+            """
+            cx, cy = int(round(point[0] / tolerance)), int(round(point[1] / tolerance))
+            for cell in ((cx + dx, cy + dy) for dx in (0, -1, 1) for dy in (0, -1, 1)):
+                for i in cells.get(cell, ()):
+                    j = i % n
+                    if used[j]:
                         continue
+                    end = ends[j] if i >= n else starts[j]
+                    if abs(end[0] - point[0]) <= tolerance and abs(end[1] - point[1]) <= tolerance:
+                        used[j] = True
+                        return paths[j][::-1] if i >= n else paths[j]
+            return None
 
-                # right is either a LinearRing or it does not connect
-                # to geo (nothing left to connect to geo), so we continue
-                # with right as geo.
-                storage.remove(right)
+        ## Chains
+        path_count = 0
+        distance = np.minimum(np.hypot(*(starts - origin).T), np.hypot(*(ends - origin).T))
+        for seed in np.argsort(distance, kind='stable').tolist():
+            if used[seed]:
+                continue
+            used[seed] = True
+            path_count += 1
 
-                if type(right) == LinearRing:
-                    optimized_geometry.insert(right)
-                else:
-                    # Cannot exteng geo any further. Put it away.
-                    optimized_geometry.insert(geo)
+            # Blocks after the seed, and reversed blocks before it.
+            forward = [paths[seed]]
+            while True:
+                block = take(forward[-1][-1])
+                if block is None:
+                    break
+                forward.append(block[1:])
+                path_count += 1
 
-                    # Continue with right.
-                    geo = right
+            backward = []
+            head = paths[seed][0]
+            while True:
+                block = take(head)
+                if block is None:
+                    break
+                backward.append(block[:0:-1])
+                head = block[-1]
+                path_count += 1
 
-        except StopIteration:  # Nothing found in storage.
-            optimized_geometry.insert(geo)
+            optimized_geometry.insert(LineString(np.vstack(backward[::-1] + forward)))
 
         #print path_count
         log.debug("path_count = %d" % path_count)
@@ -966,6 +1023,20 @@ class Geometry(object):
         self.scale(factor)
         return factor
 
+    def in_units(self, value):
+        """
+        Converts a length given in inches to the units of
+        this object.
+
+        :param value: Length in inches.
+        :type value: float
+        :return: Length in ``self.units``.
+        :rtype: float
+        """
+        if self.units.upper() == "MM":
+            return value * 25.4
+        return value
+
     def to_dict(self):
         """
         Returns a respresentation of the object as a dictionary.
@@ -1138,6 +1209,7 @@ class ApertureMacro:
     amcomm_re = re.compile(r'^0(.*)')
     amprim_re = re.compile(r'^[1-9].*')
     amvar_re = re.compile(r'^\$([0-9a-zA-z]+)=(.*)')
+    amexpr_re = re.compile(r'\$([0-9]+|[a-zA-Z][0-9a-zA-Z]*)|[xX]')
 
     def __init__(self, name=None):
         self.name = name
@@ -1149,6 +1221,11 @@ class ApertureMacro:
         self.locvars = {}
         self.geometry = None
 
+        ## Compiled form of self.raw, see compile(), and geometry
+        ## already made by make_geometry() keyed by modifiers.
+        self.program = None
+        self.geometry_cache = {}
+
     def to_dict(self):
         """
         Returns the object in a serializable form. Only the name and
@@ -1174,6 +1251,9 @@ class ApertureMacro:
         for attr in ['name', 'raw']:
             setattr(self, attr, d[attr])
 
+        self.program = None
+        self.geometry_cache = {}
+
     def parse_content(self):
         """
         Creates numerical lists for all primitives in the aperture
@@ -1255,6 +1335,90 @@ class ApertureMacro:
         """
         self.raw += data
 
+        self.program = None
+        self.geometry_cache = {}
+
+    @staticmethod
+    def compile_expression(expr):
+        """
+        Compiles an arithmetic expression of the macro into
+        Python bytecode. Variables ($n) are read from the mapping
+        ``V`` and ``x``/``X`` is the multiplication operator, also
+        right after a numbered variable as in ``$1x2``.
+
+        :param expr: Arithmetic expression, i.e. "$1x0.5+$2"
+        :type expr: str
+        :return: Code object to be run with eval().
+        """
+
+        def replace(match):
+            if match.group(1) is None:
+                return '*'
+            return 'V[%r]' % match.group(1)
+
+        return compile(ApertureMacro.amexpr_re.sub(replace, expr), '<macro>', 'eval')
+
+    def compile(self):
+        """
+        Compiles the macro in ``self.raw`` into ``self.program``, a list
+        of ('var', name, code) and ('prim', [code, ...]) steps. This
+        is done only once per macro definition and the program is then
+        run by ``evaluate()`` for every set of modifiers.
+
+        :return: None
+        """
+
+        raw = self.raw.replace('\n', '').replace('\r', '').strip(" *")
+        self.program = []
+
+        for part in raw.split('*'):
+            ### Comments. Ignored.
+            if ApertureMacro.amcomm_re.search(part):
+                continue
+
+            ### Variables
+            match = ApertureMacro.amvar_re.search(part)
+            if match:
+                self.program.append(('var', match.group(1),
+                                     ApertureMacro.compile_expression(match.group(2))))
+                continue
+
+            ### Primitives
+            if ApertureMacro.amprim_re.search(part):
+                self.program.append(('prim', [ApertureMacro.compile_expression(x)
+                                              for x in part.split(",")]))
+                continue
+
+            log.warning("Unknown syntax of aperture macro part: %s" % str(part))
+
+    def evaluate(self, modifiers):
+        """
+        Runs the compiled macro for the given modifiers.
+
+        :param modifiers: Modifiers (parameters) for this macro
+        :type modifiers: list
+        :return: Numerical lists for all primitives.
+        :rtype: list
+        """
+
+        if self.program is None:
+            self.compile()
+
+        # Variables that are not defined evaluate to 0.
+        variables = collections.defaultdict(int)
+        for i in range(0, len(modifiers)):
+            variables[str(i + 1)] = modifiers[i]
+        scope = {'__builtins__': {}, 'V': variables}
+
+        primitives = []
+        for step in self.program:
+            if step[0] == 'var':
+                variables[step[1]] = eval(step[2], scope)
+            else:
+                primitives.append([eval(x, scope) for x in step[1]])
+
+        return primitives
+
     @staticmethod
     def default2zero(n, mods):
         """
@@ -1459,34 +1623,46 @@ class ApertureMacro:
             "7": ApertureMacro.make_thermal
         }
 
-        ## Store modifiers as local variables
         modifiers = modifiers or []
-        modifiers = [float(m) for m in modifiers]
-        self.locvars = {}
-        for i in range(0, len(modifiers)):
-            self.locvars[str(i + 1)] = modifiers[i]
+        modifiers = tuple(float(m) for m in modifiers)
+
+        ## Already made for these modifiers?
+        try:
+            self.geometry = self.geometry_cache[modifiers]
+            return self.geometry
+        except KeyError:
+            pass
 
-        ## Parse
-        self.primitives = []  # Cleanup
+        ## Run the compiled macro
+        self.primitives = self.evaluate(modifiers)
         self.geometry = Polygon()
-        self.parse_content()
 
-        ## Make the geometry
+        ## Make the geometry. Consecutive primitives of the same
+        ## polarity are joined in a single union before being
+        ## added (1) or subtracted (0).
+        def apply_batch(geometry, batch, pol):
+            if pol == 1:
+                return geometry.union(unary_union(batch))
+            if pol == 0:
+                return geometry.difference(unary_union(batch))
+            return geometry
+
+        batch = []
+        batch_pol = None
         for primitive in self.primitives:
             # Make the primitive
             prim_geo = makers[str(int(primitive[0]))](primitive[1:])
 
-            # Add it (according to polarity)
-            # if self.geometry is None and prim_geo['pol'] == 1:
-            #     self.geometry = prim_geo['geometry']
-            #     continue
-            if prim_geo['pol'] == 1:
-                self.geometry = self.geometry.union(prim_geo['geometry'])
-                continue
-            if prim_geo['pol'] == 0:
-                self.geometry = self.geometry.difference(prim_geo['geometry'])
-                continue
+            if prim_geo['pol'] != batch_pol:
+                self.geometry = apply_batch(self.geometry, batch, batch_pol)
+                batch = []
+                batch_pol = prim_geo['pol']
 
+            batch.append(prim_geo['geometry'])
+
+        self.geometry = apply_batch(self.geometry, batch, batch_pol)
+
+        self.geometry_cache[modifiers] = self.geometry
         return self.geometry
 
 
@@ -1529,7 +1705,10 @@ class Gerber (Geometry):
 
     defaults = {
         "steps_per_circle": 40,
-        "use_buffer_for_union": True
+        "arc_tolerance": 0.0002,
+        "use_buffer_for_union": True,
+        "use_fast_tokenizer": True,
+        "use_parallel_union": False
     }
 
     def __init__(self, steps_per_circle=None):
@@ -1646,11 +1825,82 @@ class Gerber (Geometry):
         self.am1_re = re.compile(r'^%AM([^\*]+)\*([^%]+)?(%)?$')
         self.am2_re = re.compile(r'(.*)%$')
 
+        #### Tokenizer ####
+        # Full list of statement patterns in the order in which the
+        # parser has always tried them. This is the fallback path of
+        # the tokenizer (see tokenize_regex()).
+        self.token_patterns = [
+            ('LIN', self.lin_re),
+            ('CIRC', self.circ_re),
+            ('OPCODE', self.opcode_re),
+            ('QUAD', self.quad_re),
+            ('REGIONON', self.regionon_re),
+            ('REGIONOFF', self.regionoff_re),
+            ('AD', self.ad_re),
+            ('INTERP', self.interp_re),
+            ('TOOL', self.tool_re),
+            ('LPOL', self.lpol_re),
+            ('FMT', self.fmt_re),
+            ('MODE', self.mode_re),
+            ('UNITS', self.units_re),
+            ('ABSREL', self.absrel_re),
+            ('COMMENT', self.comm_re),
+            ('EOF', self.eof_re)
+        ]
+
+        # Coordinate data block in the usual G/X/Y/I/J/D order. No
+        # look-aheads, so it is much cheaper than lin_re and circ_re.
+        self.coord_re = re.compile(r'^(?:G0?([123]))?(?:X([\+-]?\d+))?(?:Y([\+-]?\d+))?' +
+                                   r'(?:I([\+-]?\d+))?(?:J([\+-]?\d+))?(?:D(0?[123]))?\*$')
+
+        # Candidate patterns by leading characters of the statement.
+        # Those starting with X, Y, I, J or G0[123] go through coord_re.
+        self.token_dispatch = {
+            'D': [('OPCODE', self.opcode_re), ('TOOL', self.tool_re)],
+            'G04': [('FMT', self.fmt_re), ('COMMENT', self.comm_re)],
+            'G4': [('FMT', self.fmt_re), ('COMMENT', self.comm_re)],
+            'G36': [('REGIONON', self.regionon_re)],
+            'G37': [('REGIONOFF', self.regionoff_re)],
+            'G54': [('TOOL', self.tool_re)],
+            'G70': [('UNITS', self.units_re)],
+            'G71': [('UNITS', self.units_re)],
+            'G74': [('QUAD', self.quad_re)],
+            'G75': [('QUAD', self.quad_re)],
+            'G90': [('ABSREL', self.absrel_re)],
+            'G91': [('ABSREL', self.absrel_re)],
+            '%AD': [('AD', self.ad_re)],
+            '%LP': [('LPOL', self.lpol_re)],
+            '%FS': [('FMT', self.fmt_re)],
+            '%MO': [('MODE', self.mode_re)],
+            'M02': [('EOF', self.eof_re)]
+        }
+
+        # Statements without parameters are looked up directly.
+        self.token_statements = {}
+        for code in ['D1', 'D01', 'D2', 'D02', 'D3', 'D03', 'G1', 'G01', 'G2', 'G02',
+                     'G3', 'G03', 'G36', 'G37', 'G70', 'G71', 'G74', 'G75', 'G90',
+                     'G91', 'M02']:
+            self.token_statements[code + '*'] = self.tokenize_regex(code + '*')
+
         # How to discretize a circle.
         self.steps_per_circ = steps_per_circle or Gerber.defaults['steps_per_circle']
 
+        # Maximum distance (in inches) between an arc and the segments
+        # approximating it. If 0, arcs use steps_per_circ instead.
+        self.arc_tolerance = self.defaults["arc_tolerance"]
+
         self.use_buffer_for_union = self.defaults["use_buffer_for_union"]
 
+        self.use_fast_tokenizer = self.defaults["use_fast_tokenizer"]
+
+        self.use_parallel_union = self.defaults["use_parallel_union"]
+
+        # Flash templates {aperture_id: (geometry, parts, multi)} built
+        # at the origin by flash() and translated for every flash.
+        self.flash_cache = {}
+        self.flash_cache_hits = 0
+        self.flash_cache_misses = 0
+
     def scale(self, factor):
         """
         Scales the objects' geometry on the XY plane by a given factor.
@@ -1759,6 +2009,9 @@ class Gerber (Geometry):
         # referenced it without the zero, so this is a hack to handle that.
         apid = str(int(apertureId))
 
+        # A redefined aperture invalidates its flash template.
+        self.flash_cache.pop(apid, None)
+
         try:  # Could be empty for aperture macros
             paramList = apParameters.split('X')
         except:
@@ -1801,11 +2054,12 @@ class Gerber (Geometry):
         log.warning("Aperture not implemented: %s" % str(apertureType))
         return None
         
-    def parse_file(self, filename, follow=False):
+    def parse_file(self, filename, follow=False, progress=None):
         """
         Calls Gerber.parse_lines() with generator of lines
         read from the given file. Will split the lines if multiple
-        statements are found in a single original line.
+        statements are found in a single original line. The file
+        is read lazily with ``mmap_lines()``.
 
         The following line is split into two::
 
@@ -1818,35 +2072,119 @@ class Gerber (Geometry):
         :param follow: If true, will not create polygons, just lines
             following the gerber path.
         :type follow: bool
+        :param progress: Called with the percentage of the file read.
+        :type progress: function
         :return: None
         """
 
-        with open(filename, 'r') as gfile:
+        self.parse_lines(Gerber.split_statements(mmap_lines(filename, progress=progress)),
+                         follow=follow)
 
-            def line_generator():
-                for line in gfile:
-                    line = line.strip(' \r\n')
-                    while len(line) > 0:
+    @staticmethod
+    def split_statements(lines):
+        """
+        Generator of Gerber statements from a sequence of lines.
+        Lines ending in '%' are left as they are, otherwise they
+        are split after every '*'.
 
-                        # If ends with '%' leave as is.
-                        if line[-1] == '%':
-                            yield line
-                            break
+        :param lines: Lines of Gerber source.
+        :type lines: iterable
+        :return: Generator of str.
+        """
 
-                        # Split after '*' if any.
-                        starpos = line.find('*')
-                        if starpos > -1:
-                            cleanline = line[:starpos + 1]
-                            yield cleanline
-                            line = line[starpos + 1:]
+        for line in lines:
+            line = line.strip(' \r\n')
+            if len(line) == 0:
+                continue
 
-                        # Otherwise leave as is.
-                        else:
-                            # yield cleanline
-                            yield line
-                            break
+            if line[-1] == '%':
+                yield line
+                continue
 
-            self.parse_lines(line_generator(), follow=follow)
+            parts = line.split('*')
+            last = parts.pop()
+            for part in parts:
+                yield part + '*'
+            if len(last) > 0:
+                yield last
+
+    def tokenize(self, gline):
+        """
+        Identifies the kind of a single Gerber statement. Statements
+        without parameters (D01*, G75*, ...) are looked up directly,
+        coordinate data blocks go through a single pattern without
+        look-aheads and the rest are dispatched on their leading
+        characters, so only the patterns that can possibly match
+        are tried. Anything unusual is handed to ``tokenize_regex()``,
+        which tries every pattern in the original order, so the
+        result is always the same as that of ``tokenize_regex()``.
+
+        Aperture macros are not handled here as they depend on
+        the state of the parser.
+
+        :param gline: Clean Gerber statement (no surrounding whitespace).
+        :type gline: str
+        :return: (token, groups) where groups are the same as those of the
+            pattern that would have matched the statement, or (None, None).
+        :rtype: tuple
+        """
+
+        if not self.use_fast_tokenizer:
+            return self.tokenize_regex(gline)
+
+        statement = self.token_statements.get(gline)
+        if statement is not None:
+            return statement
+
+        lead = gline[:1]
+        if lead in ('X', 'Y', 'I', 'J'):
+            candidates = None
+        else:
+            candidates = self.token_dispatch.get(gline[:3]) or \
+                self.token_dispatch.get(gline[:2]) or \
+                self.token_dispatch.get(lead)
+
+        ## Coordinate data: X, Y, I, J, G01, G1, G02, ...
+        if candidates is None and lead in ('X', 'Y', 'I', 'J', 'G'):
+            match = self.coord_re.match(gline)
+            if match:
+                g, x, y, i, j, d = match.groups()
+
+                # Same as lin_re
+                if i is None and j is None and g in (None, '1'):
+                    if x is not None or y is not None:
+                        return 'LIN', (g, x, y, d and d[-1])
+
+                # Same as circ_re
+                elif g != '1' and d in (None, '01', '02'):
+                    if x is not None or y is not None or i is not None or j is not None:
+                        return 'CIRC', (g, x, y, i, j, d and d[-1])
+
+        if candidates is not None:
+            for token, pattern in candidates:
+                match = pattern.search(gline)
+                if match:
+                    return token, match.groups()
+
+        return self.tokenize_regex(gline)
+
+    def tokenize_regex(self, gline):
+        """
+        Identifies the kind of a single Gerber statement by trying
+        every pattern in ``self.token_patterns`` in order.
+
+        :param gline: Clean Gerber statement (no surrounding whitespace).
+        :type gline: str
+        :return: (token, groups) of the first matching pattern or (None, None).
+        :rtype: tuple
+        """
+
+        for token, pattern in self.token_patterns:
+            match = pattern.search(gline)
+            if match:
+                return token, match.groups()
+
+        return None, None
 
     #@profile
     def parse_lines(self, glines, follow=False):
@@ -1873,6 +2211,11 @@ class Gerber (Geometry):
         # applyng a union for every new polygon.
         poly_buffer = []
 
+        # Combined poly_buffer of every polarity layer as
+        # (polarity, geometry). Evaluated at the end of the file
+        # by evaluate_layers().
+        layers = []
+
         last_path_aperture = None
         current_aperture = None
 
@@ -1904,6 +2247,11 @@ class Gerber (Geometry):
         # If a region is being defined
         making_region = False
 
+        # Flash templates are only valid for the current set of apertures.
+        self.flash_cache = {}
+        self.flash_cache_hits = 0
+        self.flash_cache_misses = 0
+
         #### Parsing starts here ####
         line_num = 0
         gline = ""
@@ -1921,7 +2269,7 @@ class Gerber (Geometry):
                 # but macros can have complicated statements than could
                 # be caught by other patterns.
                 if current_macro is None:  # No macro started yet
-                    match = self.am1_re.search(gline)
+                    match = gline.startswith('%AM') and self.am1_re.search(gline)
                     # Start macro if match, else not an AM, carry on.
                     if match:
                         log.debug("Starting macro. Line %d: %s" % (line_num, gline))
@@ -1946,15 +2294,17 @@ class Gerber (Geometry):
                         self.aperture_macros[current_macro].append(gline)
                     continue
 
+                ### Identify the statement
+                token, groups = self.tokenize(gline)
+
                 ### G01 - Linear interpolation plus flashes
                 # Operation code (D0x) missing is deprecated... oh well I will support it.
                 # REGEX: r'^(?:G0?(1))?(?:X(-?\d+))?(?:Y(-?\d+))?(?:D0([123]))?\*$'
-                match = self.lin_re.search(gline)
-                if match:
+                if token == 'LIN':
                     # Dxx alone?
-                    # if match.group(1) is None and match.group(2) is None and match.group(3) is None:
+                    # if groups[0] is None and groups[1] is None and groups[2] is None:
                     #     try:
-                    #         current_operation_code = int(match.group(4))
+                    #         current_operation_code = int(groups[3])
                     #     except:
                     #         pass  # A line with just * will match too.
                     #     continue
@@ -1962,14 +2312,14 @@ class Gerber (Geometry):
                     #       operation code.
 
                     # Parse coordinates
-                    if match.group(2) is not None:
-                        current_x = parse_gerber_number(match.group(2), self.frac_digits)
-                    if match.group(3) is not None:
-                        current_y = parse_gerber_number(match.group(3), self.frac_digits)
+                    if groups[1] is not None:
+                        current_x = parse_gerber_number(groups[1], self.frac_digits)
+                    if groups[2] is not None:
+                        current_y = parse_gerber_number(groups[2], self.frac_digits)
 
                     # Parse operation code
-                    if match.group(4) is not None:
-                        current_operation_code = int(match.group(4))
+                    if groups[3] is not None:
+                        current_operation_code = int(groups[3])
 
                     # Pen down: add segment
                     if current_operation_code == 1:
@@ -2024,8 +2374,7 @@ class Gerber (Geometry):
                         # Draw the flash
                         if follow:
                             continue
-                        flash = Gerber.create_flash_geometry(Point([current_x, current_y]),
-                                                             self.apertures[current_aperture])
+                        flash = self.flash(current_x, current_y, current_aperture)
                         if not flash.is_empty:
                             poly_buffer.append(flash)
 
@@ -2033,11 +2382,10 @@ class Gerber (Geometry):
 
                 ### G02/3 - Circular interpolation
                 # 2-clockwise, 3-counterclockwise
-                match = self.circ_re.search(gline)
-                if match:
+                if token == 'CIRC':
                     arcdir = [None, None, "cw", "ccw"]
 
-                    mode, x, y, i, j, d = match.groups()
+                    mode, x, y, i, j, d = groups
                     try:
                         x = parse_gerber_number(x, self.frac_digits)
                     except:
@@ -2112,7 +2460,8 @@ class Gerber (Geometry):
 
                         this_arc = arc(center, radius, start, stop,
                                        arcdir[current_interpolation_mode],
-                                       self.steps_per_circ)
+                                       self.steps_per_circ,
+                                       self.in_units(self.arc_tolerance))
 
                         # The last point in the computed arc can have
                         # numerical errors. The exact final point is the
@@ -2167,7 +2516,8 @@ class Gerber (Geometry):
                                 log.debug("########## ACCEPTING ARC ############")
                                 this_arc = arc(center, radius, start, stop,
                                                arcdir[current_interpolation_mode],
-                                               self.steps_per_circ)
+                                               self.steps_per_circ,
+                                               self.in_units(self.arc_tolerance))
 
                                 # Replace with exact values
                                 this_arc[-1] = (x, y)
@@ -2189,9 +2539,8 @@ class Gerber (Geometry):
                 ### Operation code alone
                 # Operation code alone, usually just D03 (Flash)
                 # self.opcode_re = re.compile(r'^D0?([123])\*$')
-                match = self.opcode_re.search(gline)
-                if match:
-                    current_operation_code = int(match.group(1))
+                if token == 'OPCODE':
+                    current_operation_code = int(groups[0])
                     if current_operation_code == 3:
 
                         ## --- Buffered ---
@@ -2201,8 +2550,7 @@ class Gerber (Geometry):
                             #                                      self.apertures[current_aperture])
                             if follow:
                                 continue
-                            flash = Gerber.create_flash_geometry(Point(current_x, current_y),
-                                                                 self.apertures[current_aperture])
+                            flash = self.flash(current_x, current_y, current_aperture)
                             if not flash.is_empty:
                                 poly_buffer.append(flash)
                         except IndexError:
@@ -2211,16 +2559,15 @@ class Gerber (Geometry):
                     continue
 
                 ### G74/75* - Single or multiple quadrant arcs
-                match = self.quad_re.search(gline)
-                if match:
-                    if match.group(1) == '4':
+                if token == 'QUAD':
+                    if groups[0] == '4':
                         quadrant_mode = 'SINGLE'
                     else:
                         quadrant_mode = 'MULTI'
                     continue
 
                 ### G36* - Begin region
-                if self.regionon_re.search(gline):
+                if token == 'REGIONON':
                     if len(path) > 1:
                         # Take care of what is left in the path
 
@@ -2240,7 +2587,7 @@ class Gerber (Geometry):
                     continue
 
                 ### G37* - End region
-                if self.regionoff_re.search(gline):
+                if token == 'REGIONOFF':
                     making_region = False
 
                     # Only one path defines region?
@@ -2273,27 +2620,24 @@ class Gerber (Geometry):
                     continue
 
                 ### Aperture definitions %ADD...
-                match = self.ad_re.search(gline)
-                if match:
+                if token == 'AD':
                     log.info("Found aperture definition. Line %d: %s" % (line_num, gline))
-                    self.aperture_parse(match.group(1), match.group(2), match.group(3))
+                    self.aperture_parse(groups[0], groups[1], groups[2])
                     continue
 
                 ### G01/2/3* - Interpolation mode change
                 # Can occur along with coordinates and operation code but
                 # sometimes by itself (handled here).
                 # Example: G01*
-                match = self.interp_re.search(gline)
-                if match:
-                    current_interpolation_mode = int(match.group(1))
+                if token == 'INTERP':
+                    current_interpolation_mode = int(groups[0])
                     continue
 
                 ### Tool/aperture change
                 # Example: D12*
-                match = self.tool_re.search(gline)
-                if match:
-                    current_aperture = match.group(1)
-                    log.debug("Line %d: Aperture change to (%s)" % (line_num, match.group(1)))
+                if token == 'TOOL':
+                    current_aperture = groups[0]
+                    log.debug("Line %d: Aperture change to (%s)" % (line_num, groups[0]))
                     log.debug(self.apertures[current_aperture])
 
                     # If the aperture value is zero then make it something quite small but with a non-zero value
@@ -2325,9 +2669,8 @@ class Gerber (Geometry):
                 # Example: %LPD*% or %LPC*%
                 # If polarity changes, creates geometry from current
                 # buffer, then adds or subtracts accordingly.
-                match = self.lpol_re.search(gline)
-                if match:
-                    if len(path) > 1 and current_polarity != match.group(1):
+                if token == 'LPOL':
+                    if len(path) > 1 and current_polarity != groups[0]:
 
                         # --- Buffered ----
                         width = self.apertures[last_path_aperture]["size"]
@@ -2345,59 +2688,55 @@ class Gerber (Geometry):
                     # If added for testing of bug #83
                     # TODO: Remove when bug fixed
                     if len(poly_buffer) > 0:
-                        if current_polarity == 'D':
-                            self.solid_geometry = self.solid_geometry.union(cascaded_union(poly_buffer))
-                        else:
-                            self.solid_geometry = self.solid_geometry.difference(cascaded_union(poly_buffer))
+                        if not follow:
+                            if self.use_parallel_union:
+                                new_poly = parallel_union(poly_buffer)
+                            else:
+                                new_poly = cascaded_union(poly_buffer)
+                            layers.append((current_polarity, new_poly))
                         poly_buffer = []
 
-                    current_polarity = match.group(1)
+                    current_polarity = groups[0]
                     continue
 
                 ### Number format
                 # Example: %FSLAX24Y24*%
                 # TODO: This is ignoring most of the format. Implement the rest.
-                match = self.fmt_re.search(gline)
-                if match:
+                if token == 'FMT':
                     absolute = {'A': True, 'I': False}
-                    self.int_digits = int(match.group(3))
-                    self.frac_digits = int(match.group(4))
+                    self.int_digits = int(groups[2])
+                    self.frac_digits = int(groups[3])
                     continue
 
                 ### Mode (IN/MM)
                 # Example: %MOIN*%
-                match = self.mode_re.search(gline)
-                if match:
-                    #self.units = match.group(1)
+                if token == 'MODE':
+                    #self.units = groups[0]
 
                     # Changed for issue #80
-                    self.convert_units(match.group(1))
+                    self.convert_units(groups[0])
                     continue
 
                 ### Units (G70/1) OBSOLETE
-                match = self.units_re.search(gline)
-                if match:
-                    #self.units = {'0': 'IN', '1': 'MM'}[match.group(1)]
+                if token == 'UNITS':
+                    #self.units = {'0': 'IN', '1': 'MM'}[groups[0]]
 
                     # Changed for issue #80
-                    self.convert_units({'0': 'IN', '1': 'MM'}[match.group(1)])
+                    self.convert_units({'0': 'IN', '1': 'MM'}[groups[0]])
                     continue
 
                 ### Absolute/relative coordinates G90/1 OBSOLETE
-                match = self.absrel_re.search(gline)
-                if match:
-                    absolute = {'0': True, '1': False}[match.group(1)]
+                if token == 'ABSREL':
+                    absolute = {'0': True, '1': False}[groups[0]]
                     continue
 
                 #### Ignored lines
                 ## Comments
-                match = self.comm_re.search(gline)
-                if match:
+                if token == 'COMMENT':
                     continue
 
                 ## EOF
-                match = self.eof_re.search(gline)
-                if match:
+                if token == 'EOF':
                     continue
 
                 ### Line did not match any pattern. Warn user.
@@ -2415,13 +2754,20 @@ class Gerber (Geometry):
                 if not geo.is_empty:
                     poly_buffer.append(geo)
 
+            log.info("Flash template cache: %d hits, %d misses." %
+                     (self.flash_cache_hits, self.flash_cache_misses))
+
             # --- Apply buffer ---
             if follow:
                 self.solid_geometry = poly_buffer
                 return
 
             log.warn("Joining %d polygons." % len(poly_buffer))
-            if self.use_buffer_for_union:
+            if self.use_parallel_union:
+                log.debug("Union by parallel_union()...")
+                new_poly = parallel_union(poly_buffer)
+                log.warn("Union(parallel) done.")
+            elif self.use_buffer_for_union:
                 log.debug("Union by buffer...")
                 new_poly = MultiPolygon(poly_buffer)
                 new_poly = new_poly.buffer(0.00000001)
@@ -2432,10 +2778,12 @@ class Gerber (Geometry):
                 new_poly = cascaded_union(poly_buffer)
                 new_poly = new_poly.buffer(0)
                 log.warn("Union done.")
-            if current_polarity == 'D':
-                self.solid_geometry = self.solid_geometry.union(new_poly)
-            else:
-                self.solid_geometry = self.solid_geometry.difference(new_poly)
+            layers.append((current_polarity, new_poly))
+
+            log.debug("Evaluating %d polarity layers..." % len(layers))
+            self.solid_geometry = Gerber.evaluate_layers([('D', self.solid_geometry)] + layers,
+                                                         parallel_union if self.use_parallel_union
+                                                         else unary_union)
 
         except Exception as err:
             ex_type, ex, tb = sys.exc_info()
@@ -2445,6 +2793,169 @@ class Gerber (Geometry):
             log.error("PARSING FAILED. Line %d: %s" % (line_num, gline))
             raise ParseError("Line %d: %s" % (line_num, gline), repr(err))
 
+    @staticmethod
+    def evaluate_layers(layers, union=unary_union):
+        """
+        Combines a stack of polarity layers into a single geometry.
+
+        Polygons of dark layers are kept as separate pieces in a
+        spatial index. Each clear layer is only subtracted from the
+        pieces whose bounds intersect its polygons, and the remaining
+        pieces are joined once at the end. This is equivalent to
+        adding and subtracting every layer in order from the whole
+        geometry.
+
+        A piece much larger than the clear polygons it meets (e.g. a
+        ground plane) is first cut in halves, and the halves away
+        from them go back into the index untouched. Each cutout then
+        only costs as much as the part of the plane around it.
+
+        :param layers: List of (polarity, geometry) in the order they
+            appear in the file. Polarity is 'D' (dark) or 'C' (clear).
+        :type layers: list
+        :param union: Function to join the list of remaining pieces.
+        :type union: function
+        :return: Resulting geometry.
+        :rtype: Polygon | MultiPolygon
+        """
+
+        index = rtindex.Index()
+        pieces = {}
+        next_id = [0]
+
+        def add(geometry):
+            for poly in getattr(geometry, 'geoms', [geometry]):
+                if poly.geom_type == 'Polygon' and not poly.is_empty:
+                    pieces[next_id[0]] = poly
+                    index.insert(next_id[0], poly.bounds)
+                    next_id[0] += 1
+
+        def subtract(piece, clear, bounds):
+            """
+            Subtracts clear polygons within the given bounds from a
+            piece, halving the piece while it is more than 4 times
+            their size.
+            """
+            minx, miny, maxx, maxy = piece.bounds
+            size = max(bounds[2] - bounds[0], bounds[3] - bounds[1])
+            if max(maxx - minx, maxy - miny) <= 4 * size:
+                add(piece.difference(unary_union(clear)))
+                return
+
+            if maxx - minx > maxy - miny:
+                mid = (minx + maxx) / 2.0
+                halves = [shply_box(minx, miny, mid, maxy), shply_box(mid, miny, maxx, maxy)]
+            else:
+                mid = (miny + maxy) / 2.0
+                halves = [shply_box(minx, miny, maxx, mid), shply_box(minx, mid, maxx, maxy)]
+
+            for half in halves:
+                part = piece.intersection(half)
+                if not half.intersects(shply_box(*bounds)):
+                    add(part)
+                    continue
+                for poly in getattr(part, 'geoms', [part]):
+                    if poly.geom_type == 'Polygon' and not poly.is_empty:
+                        subtract(poly, clear, bounds)
+
+        for polarity, geometry in layers:
+            polys = [poly for poly in getattr(geometry, 'geoms', [geometry])
+                     if poly.geom_type == 'Polygon' and not poly.is_empty]
+
+            if polarity == 'D':
+                for poly in polys:
+                    add(poly)
+                continue
+
+            ## Clear. Find what pieces it can affect.
+            affected = collections.defaultdict(list)
+            for poly in polys:
+                for i in index.intersection(poly.bounds):
+                    affected[i].append(poly)
+
+            for i in affected:
+                piece = pieces.pop(i)
+                index.delete(i, piece.bounds)
+
+                clear = affected[i]
+                bounds = (min(p.bounds[0] for p in clear), min(p.bounds[1] for p in clear),
+                          max(p.bounds[2] for p in clear), max(p.bounds[3] for p in clear))
+                subtract(piece, clear, bounds)
+
+        if len(pieces) == 0:
+            return Polygon()
+
+        return union(list(pieces.values()))
+
+    def flash(self, x, y, aperture_id):
+        """
+        Geometry of a flash of the given aperture at (x, y).
+
+        The shape of each aperture is created only once, at the origin,
+        by ``create_flash_geometry()`` and kept in ``self.flash_cache``.
+        Subsequent flashes of the same aperture just offset the
+        template's coordinate arrays.
+
+        :param x: X coordinate of the flash.
+        :type x: float
+        :param y: Y coordinate of the flash.
+        :type y: float
+        :param aperture_id: Key of the aperture in ``self.apertures``.
+        :type aperture_id: str
+        :return: Flash geometry.
+        :rtype: Polygon | MultiPolygon
+        """
+
+        try:
+            geo, parts, multi = self.flash_cache[aperture_id]
+            self.flash_cache_hits += 1
+        except KeyError:
+            geo = Gerber.create_flash_geometry(Point(0, 0), self.apertures[aperture_id])
+            parts, multi = Gerber.flash_template_parts(geo)
+            self.flash_cache[aperture_id] = (geo, parts, multi)
+            self.flash_cache_misses += 1
+
+        if geo is None or geo.is_empty:
+            return geo
+
+        # Not made of polygons, let shapely do it.
+        if parts is None:
+            return affinity.translate(geo, xoff=x, yoff=y)
+
+        offset = (x, y)
+        polys = [Polygon(shell + offset, [hole + offset for hole in holes])
+                 for shell, holes in parts]
+
+        if multi:
+            return MultiPolygon(polys)
+        return polys[0]
+
+    @staticmethod
+    def flash_template_parts(geo):
+        """
+        Splits a flash template into coordinate arrays of its
+        polygons so it can be translated without shapely.
+
+        :param geo: Flash geometry at the origin.
+        :return: ([(shell, [holes]), ...], is_multipolygon) with
+            Nx2 numpy arrays or (None, False) if the geometry
+            is not a Polygon or MultiPolygon.
+        :rtype: tuple
+        """
+
+        if type(geo) == Polygon:
+            polys = [geo]
+        elif type(geo) == MultiPolygon:
+            polys = list(geo.geoms)
+        else:
+            return None, False
+
+        parts = [(np.array(poly.exterior.coords),
+                  [np.array(hole.coords) for hole in poly.interiors])
+                 for poly in polys if not poly.is_empty]
+
+        return parts, type(geo) == MultiPolygon
+
     @staticmethod
     def create_flash_geometry(location, aperture):
 
@@ -2570,6 +3081,15 @@ class Excellon(Geometry):
     point             (Shapely.Point) Where to drill
     tool              (str) A key in ``tools``
     ================  ====================================
+
+      The drills are stored in columns (see below) and this list
+      is built from them on first access. Changing the dictionaries
+      in it has no effect; assign a new list instead.
+
+    * ``drill_x``, ``drill_y`` (numpy.ndarray): Coordinates of the drills.
+    * ``drill_tool`` (numpy.ndarray): For each drill, the index of its
+      tool name in ``drill_tools``.
+    * ``drill_tools`` (list): Tool names used by the drills.
     """
 
     defaults = {
@@ -2588,7 +3108,10 @@ class Excellon(Geometry):
 
         # self.tools[name] = {"C": diameter<float>}
         self.tools = {}
-        self.drills = []
+
+        # Drills, in columns: drill_x, drill_y, drill_tool and
+        # drill_tools. See the drills property.
+        self.set_drills([], [], [], [])
 
         ## IN|MM -> Units are inherited from Geometry
         #self.units = units
@@ -2670,27 +3193,120 @@ class Excellon(Geometry):
 
         # Parse coordinates
         self.leadingzeros_re = re.compile(r'^[-\+]?(0*)(\d*)')
-        
-    def parse_file(self, filename):
+
+    @property
+    def drills(self):
+        """
+        Drills as a list of ``{'point': Point, 'tool': name}``
+        dictionaries, in drill order. Built from the drill columns
+        the first time it is read after they change.
+        """
+        if self._drills is None:
+            names = self.drill_tools
+            self._drills = [{'point': Point(x, y), 'tool': names[t]}
+                            for x, y, t in zip(self.drill_x.tolist(),
+                                               self.drill_y.tolist(),
+                                               self.drill_tool.tolist())]
+        return self._drills
+
+    @drills.setter
+    def drills(self, drills):
+        tool, tools = self.tool_indexes([drill['tool'] for drill in drills])
+        self.set_drills([drill['point'].x for drill in drills],
+                        [drill['point'].y for drill in drills],
+                        tool, tools)
+
+    @staticmethod
+    def tool_indexes(names):
+        """
+        :param names: Tool name of each drill.
+        :type names: list
+        :return: (index of each name in the sorted unique names, sorted unique names)
+        :rtype: tuple
+        """
+        if len(names) == 0:
+            return np.zeros(0, dtype=int), []
+        tools, index = np.unique(np.array(names, dtype=str), return_inverse=True)
+        return index.astype(int), tools.tolist()
+
+    def set_drills(self, x, y, tool, tools):
+        """
+        Replaces all drills.
+
+        :param x: X coordinates.
+        :param y: Y coordinates.
+        :param tool: Index in ``tools`` of the tool of each drill.
+        :param tools: Tool names.
+        :type tools: list
+        :return: None
+        """
+        self.drill_x = np.array(x, dtype=float).reshape(-1)
+        self.drill_y = np.array(y, dtype=float).reshape(-1)
+        self.drill_tool = np.array(tool, dtype=int).reshape(-1)
+        self.drill_tools = list(tools)
+        self._drills = None
+
+    def add_drills(self, x, y, names):
+        """
+        Appends drills.
+
+        :param x: X coordinates.
+        :param y: Y coordinates.
+        :param names: Tool name of each drill.
+        :return: None
+        """
+        tool, tools = self.tool_indexes(list(self.drill_tools[t] for t in self.drill_tool) +
+                                        list(names))
+        self.set_drills(np.concatenate((self.drill_x, np.array(x, dtype=float).reshape(-1))),
+                        np.concatenate((self.drill_y, np.array(y, dtype=float).reshape(-1))),
+                        tool, tools)
+
+    def drills_by_tool(self):
+        """
+        Groups the drills by tool with a stable sort, so drills
+        keep their order within each tool.
+
+        :return: Tool name -> (N, 2) array of drill coordinates,
+            for every tool with at least one drill.
+        :rtype: dict
+        """
+        order = np.argsort(self.drill_tool, kind='stable')
+        counts = np.bincount(self.drill_tool, minlength=len(self.drill_tools))
+        xy = np.column_stack((self.drill_x[order], self.drill_y[order]))
+        groups = np.split(xy, np.cumsum(counts)[:-1])
+        return dict((name, group) for name, group in zip(self.drill_tools, groups)
+                    if len(group) > 0)
+
+    def affine_drills(self, a, b, d, e, xoff, yoff):
+        """
+        Applies ``x' = a*x + b*y + xoff``, ``y' = d*x + e*y + yoff``
+        to all drills at once. Same matrix layout as
+        ``shapely.affinity.affine_transform``.
+
+        :return: None
         """
-        Reads the specified file as array of lines as
-        passes it to ``parse_lines()``.
+        xy = np.dot(np.array([[a, b], [d, e]]), np.vstack((self.drill_x, self.drill_y)))
+        self.set_drills(xy[0] + xoff, xy[1] + yoff, self.drill_tool, self.drill_tools)
+
+    def parse_file(self, filename, progress=None):
+        """
+        Reads the specified file lazily with ``mmap_lines()``
+        and passes the lines to ``parse_lines()``.
 
         :param filename: The file to be read and parsed.
         :type filename: str
+        :param progress: Called with the percentage of the file read.
+        :type progress: function
         :return: None
         """
-        efile = open(filename, 'r')
-        estr = efile.readlines()
-        efile.close()
-        self.parse_lines(estr)
+        self.parse_lines(mmap_lines(filename, progress=progress))
 
     def parse_lines(self, elines):
         """
         Main Excellon parser.
 
-        :param elines: List of strings, each being a line of Excellon code.
-        :type elines: list
+        :param elines: Strings, each being a line of Excellon code.
+        :type elines: iterable
         :return: None
         """
 
@@ -2700,6 +3316,10 @@ class Excellon(Geometry):
         current_x = None
         current_y = None
 
+        # Drills found. Added to the drill columns at the end
+        # or before a change of units, which scales existing drills.
+        new_x, new_y, new_tools = [], [], []
+
         #### Parsing starts here ####
         line_num = 0  # Line number
         eline = ""
@@ -2731,6 +3351,8 @@ class Excellon(Geometry):
                     #self.units = {"1": "MM", "2": "IN"}[match.group(1)]
 
                     # Modified for issue #80
+                    self.add_drills(new_x, new_y, new_tools)
+                    new_x, new_y, new_tools = [], [], []
                     self.convert_units({"1": "MM", "2": "IN"}[match.group(1)])
                     log.debug("  Units: %s" % self.units)
                     continue
@@ -2766,7 +3388,9 @@ class Excellon(Geometry):
                             log.error("Missing coordinates")
                             continue
 
-                        self.drills.append({'point': Point((x, y)), 'tool': current_tool})
+                        new_x.append(x)
+                        new_y.append(y)
+                        new_tools.append(current_tool)
                         log.debug("{:15} {:8} {:8}".format(eline, x, y))
                         continue
 
@@ -2789,7 +3413,9 @@ class Excellon(Geometry):
                             log.error("Missing coordinates")
                             continue
 
-                        self.drills.append({'point': Point((x, y)), 'tool': current_tool})
+                        new_x.append(x)
+                        new_y.append(y)
+                        new_tools.append(current_tool)
                         log.debug("{:15} {:8} {:8}".format(eline, x, y))
                         continue
 
@@ -2821,12 +3447,16 @@ class Excellon(Geometry):
                         #self.units = {"INCH": "IN", "METRIC": "MM"}[match.group(1)]
 
                         # Modified for issue #80
+                        self.add_drills(new_x, new_y, new_tools)
+                        new_x, new_y, new_tools = [], [], []
                         self.convert_units({"INCH": "IN", "METRIC": "MM"}[match.group(1)])
                         log.debug("  Units/Format: %s %s" % (self.units, self.zeros))
                         continue
 
                 log.warning("Line ignored: %s" % eline)
 
+            self.add_drills(new_x, new_y, new_tools)
+
             log.info("Zeros: %s, Units %s." % (self.zeros, self.units))
 
         except Exception as e:
@@ -2870,17 +3500,21 @@ class Excellon(Geometry):
     def create_geometry(self):
         """
         Creates circles of the tool diameter at every point
-        specified in ``self.drills``.
+        specified in ``self.drills``. The circle of each tool is
+        made once and translated to the drills.
 
         :return: None
         """
-        self.solid_geometry = []
+        templates = []
+        for name in self.drill_tools:
+            circle = Point(0, 0).buffer(self.tools[name]['C'] / 2.0)
+            # Zero-diameter tools buffer to an empty polygon.
+            templates.append(np.array(circle.exterior.coords) if not circle.is_empty else None)
 
-        for drill in self.drills:
-            # poly = drill['point'].buffer(self.tools[drill['tool']]["C"]/2.0)
-            tooldia = self.tools[drill['tool']]['C']
-            poly = drill['point'].buffer(tooldia / 2.0)
-            self.solid_geometry.append(poly)
+        self.solid_geometry = [Polygon(templates[t] + (x, y)) if templates[t] is not None else Polygon()
+                               for x, y, t in zip(self.drill_x.tolist(),
+                                                  self.drill_y.tolist(),
+                                                  self.drill_tool.tolist())]
 
     def scale(self, factor):
         """
@@ -2894,8 +3528,7 @@ class Excellon(Geometry):
         """
 
         # Drills
-        for drill in self.drills:
-            drill['point'] = affinity.scale(drill['point'], factor, factor, origin=(0, 0))
+        self.affine_drills(factor, 0.0, 0.0, factor, 0.0, 0.0)
 
         self.create_geometry()
 
@@ -2911,8 +3544,7 @@ class Excellon(Geometry):
         dx, dy = vect
 
         # Drills
-        for drill in self.drills:
-            drill['point'] = affinity.translate(drill['point'], xoff=dx, yoff=dy)
+        self.affine_drills(1.0, 0.0, 0.0, 1.0, dx, dy)
 
         # Recreate geometry
         self.create_geometry()
@@ -2931,8 +3563,7 @@ class Excellon(Geometry):
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
         # Modify data
-        for drill in self.drills:
-            drill['point'] = affinity.scale(drill['point'], xscale, yscale, origin=(px, py))
+        self.affine_drills(xscale, 0.0, 0.0, yscale, px - px * xscale, py - py * yscale)
 
         # Recreate geometry
         self.create_geometry()
@@ -2959,16 +3590,18 @@ class Excellon(Geometry):
         if angle_x is None:
             angle_x = 0.0
         if point is None:
-            # Drills
-            for drill in self.drills:
-                drill['point'] = affinity.skew(drill['point'], angle_x, angle_y,
-                                               origin=(0, 0))
+            px, py = 0.0, 0.0
         else:
-            # Drills
             px, py = point
-            for drill in self.drills:
-                drill['point'] = affinity.skew(drill['point'], angle_x, angle_y,
-                                               origin=(px, py))
+
+        # Drills. Same matrix as shapely.affinity.skew().
+        tanx = np.tan(np.radians(angle_x))
+        tany = np.tan(np.radians(angle_y))
+        if abs(tanx) < 2.5e-16:
+            tanx = 0.0
+        if abs(tany) < 2.5e-16:
+            tany = 0.0
+        self.affine_drills(1.0, tanx, tany, 1.0, -py * tanx, -px * tany)
 
         self.create_geometry()
 
@@ -2979,15 +3612,21 @@ class Excellon(Geometry):
         :param point: point around which to rotate
         :return:
         """
-        if point is None:
-            # Drills
-            for drill in self.drills:
-                drill['point'] = affinity.rotate(drill['point'], angle, origin='center')
-        else:
-            # Drills
+        if point is not None:
+            # Drills. Same matrix as shapely.affinity.rotate().
+            # Without a point each drill was rotated about its own
+            # center, which leaves it where it is.
             px, py = point
-            for drill in self.drills:
-                drill['point'] = affinity.rotate(drill['point'], angle, origin=(px, py))
+            theta = np.radians(angle)
+            cosp = np.cos(theta)
+            sinp = np.sin(theta)
+            if abs(cosp) < 2.5e-16:
+                cosp = 0.0
+            if abs(sinp) < 2.5e-16:
+                sinp = 0.0
+            self.affine_drills(cosp, -sinp, sinp, cosp,
+                               px - px * cosp + py * sinp,
+                               py - px * sinp - py * cosp)
 
         self.create_geometry()
 
@@ -3003,26 +3642,272 @@ class Excellon(Geometry):
         return factor
 
 
-class CNCjob(Geometry):
+class GCodeWriter(object):
     """
-    Represents work to be done by a CNC machine.
+    Destination for generated G-code, written in pieces with
+    ``write()``.
 
-    *ATTRIBUTES*
+    In memory, the pieces are kept in a list and joined only
+    when the whole text is asked for. With a filename, they go
+    straight to the file, and the text is read back from it only
+    if asked for, so huge programs never have to be in memory.
+    """
 
-    * ``gcode_parsed`` (list): Each is a dictionary:
+    def __init__(self, filename=None):
+        """
+        :param filename: File to write to. In memory if None.
+        :type filename: str
+        """
 
-    =====================  =========================================
+        self.filename = filename
+        self.chunks = []
+        self.file = None
+
+        if filename is not None:
+            self.file = open(filename, 'w')
+
+    def write(self, text):
+        if self.file is not None:
+            self.file.write(text)
+        else:
+            self.chunks.append(text)
+
+    def close(self):
+        """
+        Closes the file, if writing to one. Further reads
+        come from the file.
+
+        :return: None
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def getvalue(self):
+        """
+        :return: All the G-code written.
+        :rtype: str
+        """
+        if self.filename is not None:
+            self.close()
+            with open(self.filename) as f:
+                return f.read()
+
+        if len(self.chunks) > 1:
+            self.chunks = [''.join(self.chunks)]
+        return self.chunks[0] if len(self.chunks) > 0 else ''
+
+    def lines(self):
+        """
+        Iterates over the lines of G-code written, reading
+        them from the file if writing to one.
+        """
+        if self.filename is not None:
+            self.close()
+            with open(self.filename) as f:
+                for line in f:
+                    yield line
+        else:
+            for line in StringIO(self.getvalue()):
+                yield line
+
+
+class ToolpathStore(object):
+    """
+    Tool paths of a CNC job, kept in arrays:
+
+    * ``vertices``: (N, 2) array with the points of all the paths.
+    * ``offsets``: (P + 1,) array. Path ``i`` is
+      ``vertices[offsets[i]:offsets[i + 1]]``.
+    * ``kinds``: (P,) array with a code for the kind of each path.
+      ``kind_names[code]`` gives it as ["T" (travel) or "C" (cut),
+      "F" (fast) or "S" (slow)].
+    """
+
+    kind_names = [['C', 'F'], ['C', 'S'], ['T', 'F'], ['T', 'S']]
+
+    def __init__(self, vertices=None, offsets=None, kinds=None):
+        if vertices is None:
+            vertices = np.zeros((0, 2))
+        if offsets is None:
+            offsets = np.zeros(1, dtype=int)
+        if kinds is None:
+            kinds = np.zeros(0, dtype=np.uint8)
+
+        self.vertices = np.asarray(vertices, dtype=float).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=int)
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @staticmethod
+    def kind_code(kind):
+        """
+        :param kind: ["T" or "C", "F" or "S"]
+        :return: Code for the kind. See ``kind_names``.
+        :rtype: int
+        """
+        return 2 * (kind[0] == 'T') + (kind[1] == 'S')
+
+    @staticmethod
+    def from_list(paths):
+        """
+        Makes a store from a list of {"geom": LineString, "kind": kind},
+        the form of ``CNCjob.gcode_parsed``.
+
+        :rtype: ToolpathStore
+        """
+        coords = [np.asarray(path['geom'].coords)[:, :2] for path in paths]
+        counts = [len(c) for c in coords]
+
+        return ToolpathStore(np.concatenate([np.zeros((0, 2))] + coords),
+                             np.concatenate(([0], np.cumsum(counts, dtype=int))),
+                             [ToolpathStore.kind_code(path['kind']) for path in paths])
+
+    @staticmethod
+    def from_columns(columns):
+        """
+        Builds tool paths from the columns made by ``CNCjob.gcode_tokenize()``.
+        Each path starts where the previous one ended, or at (0, 0), and
+        its kind is taken from its last point.
+
+        :param columns: As returned by ``CNCjob.gcode_tokenize()``.
+        :rtype: ToolpathStore
+        """
+
+        x, y, path = columns['x'], columns['y'], columns['path']
+        if len(path) == 0:
+            return ToolpathStore()
+
+        # First and last row of each path.
+        starts = np.flatnonzero(np.diff(path)) + 1
+        first = np.concatenate(([0], starts))
+        last = np.concatenate((starts, [len(path)])) - 1
+
+        # Each path is prefixed with the last point of the previous
+        # one, so path i takes rows first[i]..last[i] plus one.
+        n = len(first)
+        counts = last - first + 2
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        vertices = np.zeros((offsets[-1], 2))
+        rows = np.ones(offsets[-1], dtype=bool)
+        rows[offsets[:-1]] = False
+        vertices[rows, 0] = x
+        vertices[rows, 1] = y
+        vertices[offsets[1:n]] = vertices[offsets[1:n] - 1]
+
+        kinds = 2 * (columns['z'][last] > 0) + (columns['g'][last] > 0)
+        return ToolpathStore(vertices, offsets, kinds)
+
+    def path(self, i):
+        """
+        :return: (M, 2) array with the points of path ``i``.
+        """
+        return self.vertices[self.offsets[i]:self.offsets[i + 1]]
+
+    def kind(self, i):
+        """
+        :return: ["T" or "C", "F" or "S"] for path ``i``.
+        """
+        return list(self.kind_names[self.kinds[i]])
+
+    def linestrings(self, indexes=None):
+        """
+        :param indexes: Paths to make. All if None.
+        :return: List of LineString.
+        """
+        if indexes is None:
+            indexes = range(len(self))
+        return [LineString(self.path(i)) for i in indexes]
+
+    def to_list(self):
+        """
+        :return: List of {"geom": LineString, "kind": kind},
+            the form of ``CNCjob.gcode_parsed``.
+        """
+        return [{"geom": LineString(self.path(i)), "kind": self.kind(i)}
+                for i in range(len(self))]
+
+    def bounds(self):
+        """
+        :return: (xmin, ymin, xmax, ymax) of all the paths.
+        """
+        if len(self.vertices) == 0:
+            return 0.0, 0.0, 0.0, 0.0
+        xmin, ymin = self.vertices.min(axis=0)
+        xmax, ymax = self.vertices.max(axis=0)
+        return xmin, ymin, xmax, ymax
+
+    def path_centers(self):
+        """
+        :return: (P, 2) array with the centers of the bounding
+            boxes of the paths.
+        """
+        starts = self.offsets[:-1]
+        lower = np.minimum.reduceat(self.vertices, starts, axis=0)
+        upper = np.maximum.reduceat(self.vertices, starts, axis=0)
+        return (lower + upper) / 2.0
+
+    def affine(self, a, b, d, e, xoff, yoff):
+        """
+        Transforms all the points by
+
+            x' = a * x + b * y + xoff
+            y' = d * x + e * y + yoff
+
+        ``xoff`` and ``yoff`` may also be arrays with one value per point.
+
+        :return: The transformed paths.
+        :rtype: ToolpathStore
+        """
+        x = self.vertices[:, 0]
+        y = self.vertices[:, 1]
+        vertices = np.column_stack((a * x + b * y + xoff, d * x + e * y + yoff))
+        return ToolpathStore(vertices, self.offsets, self.kinds)
+
+    def to_dict(self):
+        return {
+            "vertices": self.vertices.ravel().tolist(),
+            "offsets": self.offsets.tolist(),
+            "kinds": self.kinds.tolist()
+        }
+
+    def from_dict(self, d):
+        self.__init__(d["vertices"], d["offsets"], d["kinds"])
+
+
+class CNCjob(Geometry):
+    """
+    Represents work to be done by a CNC machine.
+
+    *ATTRIBUTES*
+
+    * ``toolpaths`` (ToolpathStore): Tool paths (XY plane) in arrays.
+    * ``solid_geometry``: Union of the tool paths, made when first
+      asked for after the paths change. ``bounds()`` does not need it.
+    * ``gcode_parsed`` (list): The same paths, made from ``toolpaths``
+      when asked for. Each is a dictionary:
+
+    =====================  =========================================
     Key                    Value
     =====================  =========================================
     geom                   (Shapely.LineString) Tool path (XY plane)
     kind                   (string) "AB", A is "T" (travel) or
                            "C" (cut). B is "F" (fast) or "S" (slow).
     =====================  =========================================
+
+    Changing the list has no effect on the job. Assign a new list to
+    ``gcode_parsed``, or change ``toolpaths``, instead.
     """
 
     defaults = {
         "zdownrate": None,
-        "coordinate_format": "X%.4fY%.4f"
+        "coordinate_format": "X%.4fY%.4f",
+        "arc_tolerance": 0.0002,
+        "annotate_density": 0.002,
+        "arc_fit_tolerance": 0.0
     }
 
     def __init__(self,
@@ -3047,11 +3932,31 @@ class CNCjob(Geometry):
         #self.pausecode = "G04 P1"
         self.feedminutecode = "G94"
         self.absolutecode = "G90"
-        self.gcode = ""
+        self.gcode_writer = GCodeWriter()
         self.input_geometry_bounds = None
-        self.gcode_parsed = None
+        self.toolpaths = ToolpathStore()
         self.steps_per_circ = 20  # Used when parsing G-code arcs
 
+        # Maximum distance (in inches) between a G-code arc and the
+        # segments approximating it. If 0, steps_per_circ is used.
+        self.arc_tolerance = CNCjob.defaults["arc_tolerance"]
+
+        # XY travel between drills as (in file order, as generated),
+        # set by generate_from_excellon_by_tool().
+        self.drill_travel = None
+
+        # XY travel between paths as (nearest first, as generated),
+        # set by generate_from_geometry_2().
+        self.path_travel = None
+
+        # Cutting moves as [before, after] fitting arcs, counted
+        # by linear2gcode(). See CNCjob.defaults["arc_fit_tolerance"].
+        self.arc_fit_lines = [0, 0]
+
+        # (callback registry, connection id) of the handler updating
+        # the last plot_collections() plot on zoom and pan.
+        self.plot_callback = None
+
         if zdownrate is not None:
             self.zdownrate = float(zdownrate)
         elif CNCjob.defaults["zdownrate"] is not None:
@@ -3068,6 +3973,94 @@ class CNCjob(Geometry):
                            'gcode', 'input_geometry_bounds', 'gcode_parsed',
                            'steps_per_circ']
 
+    @property
+    def gcode(self):
+        """
+        The G-code program, joined from ``self.gcode_writer``
+        (or read from its file) when asked for.
+        """
+        return self.gcode_writer.getvalue()
+
+    @gcode.setter
+    def gcode(self, text):
+        self.gcode_writer = GCodeWriter()
+        self.gcode_writer.write(text)
+
+    @property
+    def toolpaths(self):
+        return self._toolpaths
+
+    @toolpaths.setter
+    def toolpaths(self, toolpaths):
+        self._toolpaths = toolpaths
+        self._gcode_parsed = None
+        self._solid_geometry = None
+
+    @property
+    def solid_geometry(self):
+        """
+        Union of all the tool paths. Made from ``self.toolpaths`` when
+        asked for, and kept until the paths change. None if there are
+        no paths.
+        """
+        if self._solid_geometry is None and len(self.toolpaths) > 0:
+            self._solid_geometry = cascaded_union(self.toolpaths.linestrings())
+        return self._solid_geometry
+
+    @solid_geometry.setter
+    def solid_geometry(self, geometry):
+        """
+        :param geometry: Geometry to use instead of the union of the
+            tool paths, or None to make the union when needed.
+        """
+        self._solid_geometry = geometry
+
+    @property
+    def gcode_parsed(self):
+        """
+        List of {"geom": LineString, "kind": kind} made from
+        ``self.toolpaths`` the first time it is asked for.
+        """
+        if self._gcode_parsed is None:
+            self._gcode_parsed = self.toolpaths.to_list()
+        return self._gcode_parsed
+
+    @gcode_parsed.setter
+    def gcode_parsed(self, paths):
+        """
+        :param paths: List of {"geom": LineString, "kind": kind}, a
+            ToolpathStore, its dictionary form or None (no paths).
+        """
+        if paths is None:
+            self.toolpaths = ToolpathStore()
+        elif isinstance(paths, ToolpathStore):
+            self.toolpaths = paths
+        elif isinstance(paths, dict):
+            self.toolpaths = ToolpathStore()
+            self.toolpaths.from_dict(paths)
+        else:
+            self.toolpaths = ToolpathStore.from_list(paths)
+
+    def to_dict(self):
+        """
+        Like ``Geometry.to_dict()``, but the tool paths are stored as
+        ``self.toolpaths`` instead of making ``self.gcode_parsed``, and
+        ``self.solid_geometry`` is left out.
+
+        :return: A dictionary-encoded copy of the object.
+        :rtype: dict
+        """
+        d = {}
+        for attr in self.ser_attrs:
+            if attr == 'gcode_parsed':
+                d[attr] = self.toolpaths
+            elif attr == 'solid_geometry':
+                # Made again from the paths when loaded.
+                d[attr] = None
+            else:
+                d[attr] = getattr(self, attr)
+        return d
+
     def convert_units(self, units):
         factor = Geometry.convert_units(self, units)
         log.debug("CNCjob.convert_units()")
@@ -3080,11 +4073,19 @@ class CNCjob(Geometry):
         return factor
 
     def generate_from_excellon_by_tool(self, exobj, tools="all",
-                                       toolchange=False, toolchangez=0.1):
+                                       toolchange=False, toolchangez=0.1,
+                                       optimize=False, optimize_time=1.0,
+                                       gcode_file=None, canned=False, peck=0.0):
         """
         Creates gcode for this object from an Excellon object
         for the specified tools.
 
+        Each hole is drilled with a rapid move to it, a cut down to
+        ``self.z_cut`` and up to 0, and a rapid move up to ``self.z_move``.
+        With ``canned``, a canned drilling cycle (G81, or G83 with
+        pecking) is started for each tool and then each hole is just
+        its XY coordinates. The cycle goes back up to ``self.z_move`` (G98).
+
         :param exobj: Excellon object to process
         :type exobj: Excellon
         :param tools: Comma separated tool names
@@ -3093,6 +4094,20 @@ class CNCjob(Geometry):
         :type toolchange: bool
         :param toolchangez: Height at which to perform the tool change.
         :type toolchangez: float
+        :param optimize: Order the drills of each tool with ``drill_order()``
+            instead of using the order in the file.
+        :type optimize: bool
+        :param optimize_time: Seconds to spend improving the order,
+            shared by the tools in proportion to their drills.
+        :type optimize_time: float
+        :param gcode_file: Write the G-code to this file instead of
+            keeping it in memory. See ``GCodeWriter``.
+        :type gcode_file: str
+        :param canned: Use canned drilling cycles.
+        :type canned: bool
+        :param peck: Depth of each peck (G83) with ``canned``.
+            No pecking (G81) if 0.
+        :type peck: float
         :return: None
         :rtype: None
         """
@@ -3120,37 +4135,58 @@ class CNCjob(Geometry):
             log.debug("Tools selected and sorted are: %s" % str(tools))
 
         # Points (Group by tool)
-        points = {}
-        for drill in exobj.drills:
-            if drill['tool'] in tools:
-                try:
-                    points[drill['tool']].append(drill['point'])
-                except KeyError:
-                    points[drill['tool']] = [drill['point']]
+        points = exobj.drills_by_tool()
+
+        # Drill order. Travel starts at (0, 0).
+        total = sum(len(points[tool]) for tool in tools if tool in points)
+        position_before = position = (0, 0)
+        travel_before = 0.0
+        travel_after = 0.0
+        for tool in tools:
+            if tool not in points:
+                continue
+            travel_before += path_length(points[tool], position_before)
+            position_before = points[tool][-1]
+            if optimize:
+                order = drill_order(points[tool], position,
+                                    time_budget=optimize_time * len(points[tool]) / total)
+                points[tool] = points[tool][order]
+            travel_after += path_length(points[tool], position)
+            position = points[tool][-1]
+        self.drill_travel = (travel_before, travel_after)
+        log.debug("Drill travel: %.4f in file order, %.4f as generated." % self.drill_travel)
 
         # log.debug("Found %d drills." % len(points))
-        self.gcode = []
+        self.gcode_writer = GCodeWriter(gcode_file)
+        gcode = self.gcode_writer
 
         # Basic G-Code macros
         t = "G00 " + CNCjob.defaults["coordinate_format"] + "\n"
         down = "G01 Z%.4f\n" % self.z_cut
         up = "G00 Z%.4f\n" % self.z_move
         up_to_zero = "G01 Z0\n"
+        xy = CNCjob.defaults["coordinate_format"] + "\n"
+        if peck > 0:
+            cycle = "G83 " + CNCjob.defaults["coordinate_format"] + \
+                    " Z%.4f R%.4f Q%.4f\n" % (self.z_cut, self.z_move, peck)
+        else:
+            cycle = "G81 " + CNCjob.defaults["coordinate_format"] + \
+                    " Z%.4f R%.4f\n" % (self.z_cut, self.z_move)
 
         # Initialization
-        gcode = self.unitcode[self.units.upper()] + "\n"
-        gcode += self.absolutecode + "\n"
-        gcode += self.feedminutecode + "\n"
-        gcode += "F%.2f\n" % self.feedrate
-        gcode += "G00 Z%.4f\n" % self.z_move  # Move to travel height
+        gcode.write(self.unitcode[self.units.upper()] + "\n")
+        gcode.write(self.absolutecode + "\n")
+        gcode.write(self.feedminutecode + "\n")
+        gcode.write("F%.2f\n" % self.feedrate)
+        gcode.write("G00 Z%.4f\n" % self.z_move)  # Move to travel height
 
         if self.spindlespeed is not None:
             # Spindle start with configured speed
-            gcode += "M03 S%d\n" % int(self.spindlespeed)
+            gcode.write("M03 S%d\n" % int(self.spindlespeed))
         else:
-            gcode += "M03\n"  # Spindle start
+            gcode.write("M03\n")  # Spindle start
 
-        # gcode += self.pausecode + "\n"
+        # gcode.write(self.pausecode + "\n")
 
         for tool in tools:
 
@@ -3158,28 +4194,35 @@ class CNCjob(Geometry):
             if tool in points:
                 # Tool change sequence (optional)
                 if toolchange:
-                    gcode += "G00 Z%.4f\n" % toolchangez
-                    gcode += "T%d\n" % int(tool)  # Indicate tool slot (for automatic tool changer)
-                    gcode += "M5\n"  # Spindle Stop
-                    gcode += "M6\n"  # Tool change
-                    gcode += "(MSG, Change to tool dia=%.4f)\n" % exobj.tools[tool]["C"]
-                    gcode += "M0\n"  # Temporary machine stop
+                    gcode.write("G00 Z%.4f\n" % toolchangez)
+                    gcode.write("T%d\n" % int(tool))  # Indicate tool slot (for automatic tool changer)
+                    gcode.write("M5\n")  # Spindle Stop
+                    gcode.write("M6\n")  # Tool change
+                    gcode.write("(MSG, Change to tool dia=%.4f)\n" % exobj.tools[tool]["C"])
+                    gcode.write("M0\n")  # Temporary machine stop
                     if self.spindlespeed is not None:
                         # Spindle start with configured speed
-                        gcode += "M03 S%d\n" % int(self.spindlespeed)
+                        gcode.write("M03 S%d\n" % int(self.spindlespeed))
                     else:
-                        gcode += "M03\n"  # Spindle start
+                        gcode.write("M03\n")  # Spindle start
 
                 # Drillling!
-                for point in points[tool]:
-                    x, y = point.coords.xy
-                    gcode += t % (x[0], y[0])
-                    gcode += down + up_to_zero + up
+                if canned:
+                    tool_points = points[tool].tolist()
+                    gcode.write(up)
+                    gcode.write("G98\n")  # Back up to the initial Z after each hole.
+                    gcode.write(cycle % tuple(tool_points[0]))
+                    gcode.write(''.join([xy % (x, y) for x, y in tool_points[1:]]))
+                    gcode.write("G80\n")  # Cancel the cycle.
+                else:
+                    for x, y in points[tool].tolist():
+                        gcode.write(t % (x, y))
+                        gcode.write(down + up_to_zero + up)
 
-        gcode += t % (0, 0)
-        gcode += "M05\n"  # Spindle stop
+        gcode.write(t % (0, 0))
+        gcode.write("M05\n")  # Spindle stop
 
-        self.gcode = gcode
+        gcode.close()
 
     def generate_from_geometry_2(self,
                                  geometry,
@@ -3187,13 +4230,17 @@ class CNCjob(Geometry):
                                  tooldia=None,
                                  tolerance=0,
                                  multidepth=False,
-                                 depthpercut=None):
+                                 depthpercut=None,
+                                 gcode_file=None,
+                                 optimize=False,
+                                 optimize_time=1.0):
         """
         Second algorithm to generate from Geometry.
 
         ALgorithm description:
         ----------------------
-        Uses RTree to find the nearest path to follow.
+        Orders the paths with ``path_order()`` to follow the
+        nearest path each time.
 
         :param geometry:
         :param append:
@@ -3202,6 +4249,15 @@ class CNCjob(Geometry):
         :param multidepth: If True, use multiple passes to reach
            the desired depth.
         :param depthpercut: Maximum depth in each pass.
+        :param gcode_file: Write the G-code to this file instead of
+            keeping it in memory. See ``GCodeWriter``.
+        :param optimize: Improve the order of the paths with 2-opt
+            moves and start closed paths at any vertex, see
+            ``path_order()``. Otherwise closed paths start at their
+            first vertex and the nearest path is taken each time.
+        :type optimize: bool
+        :param optimize_time: Seconds to spend improving the order.
+        :type optimize_time: float
         :return: None
         """
         assert isinstance(geometry, Geometry), \
@@ -3211,149 +4267,151 @@ class CNCjob(Geometry):
 
         ## Flatten the geometry
         # Only linear elements (no polygons) remain.
-        flat_geometry = geometry.flatten(pathonly=True)
+        flat_geometry = [geo for geo in geometry.flatten(pathonly=True)
+                         if geo is not None]  # TODO: This shouldn't have happened.
         log.debug("%d paths" % len(flat_geometry))
 
-        ## Index first and last points in paths
-        # What points to index.
-        def get_pts(o):
-            return [o.coords[0], o.coords[-1]]
-
-        # Create the indexed storage.
-        storage = FlatCAMRTreeStorage()
-        storage.get_points = get_pts
-
-        # Store the geometry
-        log.debug("Indexing geometry before generating G-Code...")
-        for shape in flat_geometry:
-            if shape is not None:  # TODO: This shouldn't have happened.
-                storage.insert(shape)
-
         if tooldia is not None:
             self.tooldia = tooldia
 
-        # self.input_geometry_bounds = geometry.bounds()
+        self.arc_fit_lines = [0, 0]
+
+        ## Depth of each pass
+        depths = [self.z_cut]
+        if multidepth:
+            if isinstance(self.z_cut, Decimal):
+                z_cut = self.z_cut
+            else:
+                z_cut = Decimal(self.z_cut).quantize(Decimal('0.000000001'))
+
+            if depthpercut is None:
+                depthpercut = z_cut
+            elif not isinstance(depthpercut, Decimal):
+                depthpercut = Decimal(depthpercut).quantize(Decimal('0.000000001'))
+
+            depths = []
+            depth = 0
+            while depth > z_cut:
+                # Increase depth. Limit to z_cut.
+                depth -= depthpercut
+                if depth < z_cut:
+                    depth = z_cut
+                depths.append(depth)
+
+        ## Order the paths
+        # Open paths cut back and forth an even number of
+        # times end where they start.
+        log.debug("Ordering paths before generating G-Code...")
+        paths = [np.array(geo.coords) for geo in flat_geometry]
+        returning = np.array([multidepth and len(depths) % 2 == 0 and type(geo) == LineString
+                              for geo in flat_geometry], dtype=bool)
+        order, entries = path_order(paths, returning=returning, rotate=False, time_budget=0)
+        travel_before = path_travel(paths, order, entries, returning=returning)
+        if optimize:
+            order, entries = path_order(paths, returning=returning, time_budget=optimize_time)
+        travel_after = path_travel(paths, order, entries, returning=returning)
+        self.path_travel = (travel_before, travel_after)
+        log.debug("Path travel: %.4f nearest first, %.4f as generated." % self.path_travel)
 
-        if not append:
-            self.gcode = ""
+        # self.input_geometry_bounds = geometry.bounds()
 
         # Initial G-Code
-        self.gcode = self.unitcode[self.units.upper()] + "\n"
-        self.gcode += self.absolutecode + "\n"
-        self.gcode += self.feedminutecode + "\n"
-        self.gcode += "F%.2f\n" % self.feedrate
-        self.gcode += "G00 Z%.4f\n" % self.z_move  # Move (up) to travel height
+        self.gcode_writer = GCodeWriter(gcode_file)
+        gcode = self.gcode_writer
+        gcode.write(self.unitcode[self.units.upper()] + "\n")
+        gcode.write(self.absolutecode + "\n")
+        gcode.write(self.feedminutecode + "\n")
+        gcode.write("F%.2f\n" % self.feedrate)
+        gcode.write("G00 Z%.4f\n" % self.z_move)  # Move (up) to travel height
         if self.spindlespeed is not None:
-            self.gcode += "M03 S%d\n" % int(self.spindlespeed)  # Spindle start with configured speed
+            gcode.write("M03 S%d\n" % int(self.spindlespeed))  # Spindle start with configured speed
         else:
-            self.gcode += "M03\n"  # Spindle start
-        #self.gcode += self.pausecode + "\n"
+            gcode.write("M03\n")  # Spindle start
+        #gcode.write(self.pausecode + "\n")
 
-        ## Iterate over geometry paths getting the nearest each time.
+        ## Iterate over geometry paths in order.
         log.debug("Starting G-Code...")
         path_count = 0
-        current_pt = (0, 0)
-        pt, geo = storage.nearest(current_pt)
-        try:
-            while True:
-                path_count += 1
-                #print "Current: ", "(%.3f, %.3f)" % current_pt
+        for index, entry in zip(order, entries):
+            path_count += 1
+
+            geo = flat_geometry[index]
+            if entry != 0:
+                geo = type(geo)(orient_path(paths[index], entry))
+
+            #---------- Single depth/pass --------
+            if not multidepth:
+                # G-code
+                # Note: self.linear2gcode() and self.point2gcode() will
+                # lower and raise the tool every time.
+                if type(geo) == LineString or type(geo) == LinearRing:
+                    gcode.write(self.linear2gcode(geo, tolerance=tolerance))
+                elif type(geo) == Point:
+                    gcode.write(self.point2gcode(geo))
+                else:
+                    log.warning("G-code generation not implemented for %s" % (str(type(geo))))
 
-                # Remove before modifying, otherwise
-                # deletion will fail.
-                storage.remove(geo)
+            #--------- Multi-pass ---------
+            else:
+                # Open paths are cut back and forth so we can continue
+                # cutting without returning to the beginning. The moves
+                # in each direction are formatted once.
+                if type(geo) == LineString:
+                    directions = [geo, LineString(list(geo.coords)[::-1])]
+                else:
+                    directions = [geo]
+                caches = [{} for _ in directions]
 
-                # If last point in geometry is the nearest
-                # but prefer the first one if last point == first point
-                # then reverse coordinates.
-                if pt != geo.coords[0] and pt == geo.coords[-1]:
-                    geo.coords = list(geo.coords)[::-1]
-
-                #---------- Single depth/pass --------
-                if not multidepth:
-                    # G-code
-                    # Note: self.linear2gcode() and self.point2gcode() will
-                    # lower and raise the tool every time.
+                for count, depth in enumerate(depths):
+                    geo = directions[count % len(directions)]
+
+                    # Cut at specific depth and do not lift the tool.
+                    # Note: linear2gcode() will use G00 to move to the
+                    # first point in the path, but it should be already
+                    # at the first point if the tool is down (in the material).
+                    # So, an extra G00 should show up but is inconsequential.
                     if type(geo) == LineString or type(geo) == LinearRing:
-                        self.gcode += self.linear2gcode(geo, tolerance=tolerance)
+                        gcode.write(self.linear2gcode(geo, tolerance=tolerance,
+                                                      zcut=depth,
+                                                      up=False,
+                                                      cache=caches[count % len(directions)]))
+
+                    # Ignore multi-pass for points.
                     elif type(geo) == Point:
-                        self.gcode += self.point2gcode(geo)
-                    else:
-                        log.warning("G-code generation not implemented for %s" % (str(type(geo))))
+                        gcode.write(self.point2gcode(geo))
+                        break  # Ignoring ...
 
-                #--------- Multi-pass ---------
-                else:
-                    if isinstance(self.z_cut, Decimal):
-                        z_cut = self.z_cut
                     else:
-                        z_cut = Decimal(self.z_cut).quantize(Decimal('0.000000001'))
-
-                    if depthpercut is None:
-                        depthpercut = z_cut
-                    elif not isinstance(depthpercut, Decimal):
-                        depthpercut = Decimal(depthpercut).quantize(Decimal('0.000000001'))
-
-                    depth = 0
-                    reverse = False
-                    while depth > z_cut:
-
-                        # Increase depth. Limit to z_cut.
-                        depth -= depthpercut
-                        if depth < z_cut:
-                            depth = z_cut
-
-                        # Cut at specific depth and do not lift the tool.
-                        # Note: linear2gcode() will use G00 to move to the
-                        # first point in the path, but it should be already
-                        # at the first point if the tool is down (in the material).
-                        # So, an extra G00 should show up but is inconsequential.
-                        if type(geo) == LineString or type(geo) == LinearRing:
-                            self.gcode += self.linear2gcode(geo, tolerance=tolerance,
-                                                            zcut=depth,
-                                                            up=False)
-
-                        # Ignore multi-pass for points.
-                        elif type(geo) == Point:
-                            self.gcode += self.point2gcode(geo)
-                            break  # Ignoring ...
-
-                        else:
-                            log.warning("G-code generation not implemented for %s" % (str(type(geo))))
-
-                        # Reverse coordinates if not a loop so we can continue
-                        # cutting without returning to the beginning.
-                        if type(geo) == LineString:
-                            geo.coords = list(geo.coords)[::-1]
-                            reverse = True
-
-                    # If geometry is reversed, revert.
-                    if reverse:
-                        if type(geo) == LineString:
-                            geo.coords = list(geo.coords)[::-1]
+                        log.warning("G-code generation not implemented for %s" % (str(type(geo))))
 
-                    # Lift the tool
-                    self.gcode += "G00 Z%.4f\n" % self.z_move
-                    # self.gcode += "( End of path. )\n"
+                # Lift the tool
+                gcode.write("G00 Z%.4f\n" % self.z_move)
+                # gcode.write("( End of path. )\n")
 
-                # Did deletion at the beginning.
-                # Delete from index, update current location and continue.
-                #rti.delete(hits[0], geo.coords[0])
-                #rti.delete(hits[0], geo.coords[-1])
+        log.debug("%s paths traced." % path_count)
+        if self.arc_fit_lines[0] > 0:
+            log.debug("Arc fitting: %d cutting moves in %d lines." % tuple(self.arc_fit_lines))
 
-                current_pt = geo.coords[-1]
+        # Finish
+        gcode.write("G00 Z%.4f\n" % self.z_move)  # Stop cutting
+        gcode.write("G00 X0Y0\n")
+        gcode.write("M05\n")  # Spindle stop
 
-                # Next
-                pt, geo = storage.nearest(current_pt)
+        gcode.close()
 
-        except StopIteration:  # Nothing found in storage.
-            pass
+    # Words at the start of a G-code line, e.g. "G01 X1.5 Y-2".
+    # A number may contain spaces. Anything after the last word
+    # that parses (like a comment) is ignored.
+    gcode_words_re = re.compile(r'(?:\s*[A-Z]\s*[\+\-\.\d\s]+)*')
+    gcode_word_re = re.compile(r'([A-Z])\s*([\+\-\.\d\s]+)')
 
-        log.debug("%s paths traced." % path_count)
+    # Same words for many lines at once: each match is a word,
+    # the end of a line, or any other character, which ends
+    # the words of its line.
+    gcode_token_re = re.compile(r'[A-Z][\+\-\.\d \t]*|\n|\S')
 
-        # Finish
-        self.gcode += "G00 Z%.4f\n" % self.z_move  # Stop cutting
-        self.gcode += "G00 X0Y0\n"
-        self.gcode += "M05\n"  # Spindle stop
+    # Lines read at a time by gcode_tokenize().
+    gcode_chunk_lines = 1 << 16
 
     @staticmethod
     def codes_split(gline):
@@ -3365,105 +4423,377 @@ class CNCjob(Geometry):
         :return: Dictionary with parsed line.
         """
 
-        command = {}
+        words = CNCjob.gcode_words_re.match(gline).group()
+        return dict((code, float(value.replace(" ", "")))
+                    for code, value in CNCjob.gcode_word_re.findall(words))
+
+    @staticmethod
+    def gcode_words(text, letters):
+        """
+        Tokenizes lines of G-code with one regular expression for
+        all of them. Words are read like ``codes_split()`` does.
+
+        :param text: Lines of G-code, each ending with a newline.
+        :type text: str
+        :param letters: Letters of the words to return.
+        :type letters: str
+        :return: For each letter, an array with the value of the
+            word in each line, or NaN if the line does not have it.
+        :rtype: dict
+        """
+
+        # The last token makes every row at least 2 characters
+        # wide. It is after the last line.
+        tokens = np.array(CNCjob.gcode_token_re.findall(text) + ['  '])
+
+        # Characters of each token as code points, one row per token.
+        chars = tokens.view(np.uint32).reshape(len(tokens), -1).copy()
+        newline = chars[:, 0] == 10
+        word = (chars[:, 0] >= 65) & (chars[:, 0] <= 90) & (chars[:, 1] != 0)
+        codes = chars[:, 0].copy()
+
+        # Without the letter, the rest of a word is its number.
+        chars[:, 0] = 32
+        values = chars.view(tokens.dtype).reshape(-1)
+
+        # Line of each token and whether the line had another
+        # character before it.
+        line = np.cumsum(newline) - newline
+        other = np.cumsum(~word & ~newline)
+        other_at_start = np.concatenate(([0], other[newline]))
+        valid = word & (other == other_at_start[line])
+
+        n_lines = int(newline.sum())
+        columns = {}
+        for letter in letters:
+            words = valid & (codes == ord(letter))
+            numbers = np.fromstring(' '.join(values[words].tolist()), sep=' ')
+            if len(numbers) != words.sum():  # Spaces in numbers.
+                numbers = np.char.replace(values[words], ' ', '').astype(float)
+            column = np.full(n_lines, np.nan)
+            column[line[words]] = numbers
+            columns[letter] = column
+
+        return columns
+
+    def gcode_tokenize(self, lines=None):
+        """
+        Reads G-code into columns with one row per point the
+        tool moves to on the XY plane. Arcs (G02/G03) are
+        expanded into segments. Sets ``self.units`` from G20/G21.
+
+        The lines are tokenized ``gcode_chunk_lines`` at a time
+        by ``gcode_words()`` and the modal values (coordinates,
+        motion mode, feed rate) carried forward with NumPy.
+
+        =====  ===============================================
+        Key    Value (numpy.ndarray)
+        =====  ===============================================
+        x, y   Coordinates of the point.
+        z      Height of the tool while moving to the point.
+        g      Motion mode (0, 1, 2 or 3).
+        f      Feed rate (NaN if not set yet).
+        path   Number of the path the point belongs to. A new
+               path starts at every line with a Z word.
+        =====  ===============================================
+
+        In canned drilling cycles (G81 to G89), the tool is taken to
+        be back up after each hole, so each hole is a rapid move in a
+        path of its own and the Z word (the bottom of the hole) is
+        ignored.
+
+        :param lines: Lines of G-code. ``self.gcode`` if None.
+        :type lines: iterable
+        :return: Dictionary of columns.
+        :rtype: dict
+        """
+
+        if lines is None:
+            lines = self.gcode_writer.lines()
+        lines = iter(lines)
+
+        arcdir = [None, None, "cw", "ccw"]
+        tolerance = self.in_units(self.arc_tolerance)
+
+        # Last known instruction
+        current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0.0, 'F': np.nan}
+        path = 0
 
-        match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
-        while match:
-            command[match.group(1)] = float(match.group(2).replace(" ", ""))
-            gline = gline[match.end():]
-            match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
+        chunks = []
+        while True:
+            chunk = list(itertools.islice(lines, self.gcode_chunk_lines))
+            if len(chunk) == 0:
+                break
 
-        return command
+            text = ''.join(chunk)
+            if text.count('\n') != len(chunk):
+                text = '\n'.join(line.rstrip('\n') for line in chunk) + '\n'
+
+            words = self.gcode_words(text, 'GXYZFIJ')
+
+            ## Units. These lines have no other effect.
+            units = np.flatnonzero((words['G'] == 20.0) | (words['G'] == 21.0))
+            if len(units) > 0:
+                self.units = {20.0: "IN", 21.0: "MM"}[words['G'][units[-1]]]
+                for letter in words:
+                    words[letter][units] = np.nan
+
+            ## Modal values: Each line's own word or the last one before.
+            modal = {}
+            for letter in 'GXYZF':
+                if letter == 'Z':
+                    canned = (modal['G'] >= 81) & (modal['G'] <= 89)
+                    words['Z'][canned] = np.nan
+
+                column = np.concatenate(([current[letter]], words[letter]))
+                index = np.where(np.isnan(column), 0, np.arange(len(column)))
+                column = column[np.maximum.accumulate(index)]
+                modal[letter] = column[1:]
+                modal['previous ' + letter] = column[:-1]
+                current[letter] = column[-1]
+
+            has_z = ~np.isnan(words['Z'])
+            has_xy = ~np.isnan(words['X']) | ~np.isnan(words['Y'])
+
+            for i in np.flatnonzero(has_z & has_xy & (modal['Z'] != modal['previous Z'])):
+                log.warning("Non-orthogonal motion: From Z=%s to X=%s Y=%s Z=%s" %
+                            (modal['previous Z'][i], words['X'][i], words['Y'][i], words['Z'][i]))
+
+            ## Paths change at every Z word, and at every hole in canned cycles.
+            paths = path + np.cumsum(has_z | (canned & has_xy))
+            path = paths[-1]
+
+            g = np.where(canned, 0, modal['G']).astype(int)
+            moves = np.flatnonzero(has_xy & (g >= 0) & (g <= 3))
+            counts = np.ones(len(moves), dtype=int)
+
+            ## Arcs, expanded into segments.
+            arcs = {}
+            for k in np.flatnonzero(g[moves] >= 2):
+                i = moves[k]
+                x0, y0 = modal['previous X'][i], modal['previous Y'][i]
+                di = 0.0 if np.isnan(words['I'][i]) else words['I'][i]
+                dj = 0.0 if np.isnan(words['J'][i]) else words['J'][i]
+                center = [di + x0, dj + y0]
+                radius = sqrt(di**2 + dj**2)
+                start = arctan2(-dj, -di)
+                stop = arctan2(-center[1] + modal['Y'][i], -center[0] + modal['X'][i])
+                arcs[k] = np.array(arc(center, radius, start, stop, arcdir[g[i]],
+                                       self.steps_per_circ, tolerance)).reshape(-1, 2)
+                counts[k] = len(arcs[k])
+
+            columns = {'x': np.repeat(modal['X'][moves], counts),
+                       'y': np.repeat(modal['Y'][moves], counts),
+                       'z': np.repeat(modal['Z'][moves], counts),
+                       'g': np.repeat(g[moves], counts),
+                       'f': np.repeat(modal['F'][moves], counts),
+                       'path': np.repeat(paths[moves], counts)}
+            offsets = np.cumsum(counts) - counts
+            for k, points in arcs.items():
+                columns['x'][offsets[k]:offsets[k] + counts[k]] = points[:, 0]
+                columns['y'][offsets[k]:offsets[k] + counts[k]] = points[:, 1]
+
+            chunks.append(columns)
+
+        keys = ['x', 'y', 'z', 'g', 'f', 'path']
+        dtypes = [float, float, float, int, float, int]
+        return dict((key, np.concatenate([np.zeros(0, dtype=dtype)] + [c[key] for c in chunks]))
+                    for key, dtype in zip(keys, dtypes))
 
     def gcode_parse(self):
         """
-        G-Code parser (from self.gcode). Generates dictionary with
-        single-segment LineString's and "kind" indicating cut or travel,
-        fast or feedrate speed.
+        G-Code parser (from self.gcode). Fills ``self.toolpaths``
+        with the tool paths and the "kind" of each, indicating cut
+        or travel, fast or feedrate speed.
+
+        The G-code is read into columns with ``gcode_tokenize()``
+        and the paths are made from them by ``ToolpathStore.from_columns()``.
+
+        :return: The tool paths.
+        :rtype: ToolpathStore
         """
 
-        kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
+        self.toolpaths = ToolpathStore.from_columns(self.gcode_tokenize())
+        return self.toolpaths
 
-        # Results go here
-        geometry = []        
+    # A line made only of these words can be rewritten by modal_generator().
+    modal_line_re = re.compile(r'^\s*(?:[GXYZFIJ]\s*[\+\-]?(?:\d+\.?\d*|\.\d+)\s*)+$')
+    modal_word_re = re.compile(r'([GXYZFIJ])\s*([\+\-]?(?:\d+\.?\d*|\.\d+))')
 
-        # Last known instruction
-        current = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'G': 0}
+    @staticmethod
+    def aligned(start, points, tolerance):
+        """
+        Whether going straight from ``start`` to the last of ``points``
+        passes within ``tolerance`` of the other points, in order.
 
-        # Current path: temporary storage until tool is
-        # lifted or lowered.
-        path = [(0, 0)]
+        :param start: (x, y)
+        :param points: List of (x, y).
+        :param tolerance: Largest distance to the line.
+        :rtype: bool
+        """
+        points = np.array(points, dtype=float) - start
+        dx, dy = points[-1]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            return False
+
+        along = (points[:, 0] * dx + points[:, 1] * dy) / length
+        across = np.abs(points[:-1, 0] * dy - points[:-1, 1] * dx) / length
+        return bool(np.all(across <= tolerance) and along[0] >= 0 and
+                    np.all(np.diff(along) >= 0))
+
+    def modal_generator(self, lines, tolerance=0.0):
+        """
+        Makes G-code shorter by keeping track of the modal state
+        (motion mode G00 to G03, F, X, Y and Z):
 
-        # Process every instruction
-        for line in StringIO(self.gcode):
+        * Words that do not change the state are dropped, and so
+          are lines left without a move.
+        * A feed rate is written with the next move.
+        * Runs of G00 or G01 XY moves that stay within ``tolerance``
+          of a straight line become a single move (see ``aligned()``).
 
-            gobj = self.codes_split(line)
+        Other lines are written as they are. Any other G word makes
+        the state unknown until it is set again.
 
-            ## Units
-            if 'G' in gobj and (gobj['G'] == 20.0 or gobj['G'] == 21.0):
-                self.units = {20.0: "IN", 21.0: "MM"}[gobj['G']]
+        The number of characters read and written is kept in
+        ``self.modal_stats`` as [read, written].
+
+        :param lines: Lines of G-code, each ending with a newline.
+        :param tolerance: Largest distance from a dropped point to the
+            move replacing it. With 0 only exactly aligned moves are
+            merged.
+        :return: Generator of lines.
+        """
+
+        log.debug("modal_generator()...")
+
+        stats = self.modal_stats = [0, 0]
+
+        # Words are (letter, text, value). The state is the last word
+        # written for each letter, or None if unknown.
+        state = dict((letter, None) for letter in 'GXYZF')
+        pending = {'F': None,   # Feed rate for the next move.
+                   'run': None} # Aligned moves not written yet.
+        mode = None  # Motion mode of the lines read.
+
+        def value(letter):
+            return None if state[letter] is None else state[letter][2]
+
+        def write(gword, words):
+            # Line with the words that change the state. None if
+            # nothing moves.
+            parts = [w[1] for w in words if w[0] in 'IJ' or value(w[0]) != w[2]]
+            if len(parts) == 0:
+                return None
+            for w in words:
+                if w[0] in 'XYZ':
+                    state[w[0]] = w
+
+            if value('G') != gword[2]:
+                parts.insert(0, gword[1] + " ")
+                state['G'] = gword
+
+            feed = pending['F']
+            pending['F'] = None
+            if feed is not None and value('F') != feed[2]:
+                parts.append(feed[1])
+                state['F'] = feed
+
+            line = ''.join(parts) + "\n"
+            stats[1] += len(line)
+            return line
+
+        def flush(feed=False):
+            # Lines to write before anything but another aligned move.
+            out = []
+            run = pending['run']
+            pending['run'] = None
+            if run is not None:
+                out.append(write(run['G'], [run['X'], run['Y']]))
+
+            if feed and pending['F'] is not None:
+                if value('F') != pending['F'][2]:
+                    state['F'] = pending['F']
+                    out.append(pending['F'][1] + "\n")
+                    stats[1] += len(out[-1])
+                pending['F'] = None
+
+            return [line for line in out if line is not None]
+
+        for line in lines:
+            stats[0] += len(line)
+
+            words = None
+            if self.modal_line_re.match(line) is not None:
+                words = [(letter, letter + text, float(text))
+                         for letter, text in self.modal_word_re.findall(line)]
+                letters = [w[0] for w in words]
+                if len(set(letters)) != len(letters):
+                    words = None
+
+            gwords = [w for w in words if w[0] == 'G'] if words is not None else []
+            line_mode = gwords[0][2] if len(gwords) > 0 else mode
+
+            ## Written as it is.
+            if words is None or line_mode not in (0, 1, 2, 3):
+                for out in flush(feed=True):
+                    yield out
+                if re.search(r'[gG]\s*\d', re.sub(r'\(.*?\)', '', line)):
+                    for letter in state:
+                        state[letter] = None
+                    mode = None
+                stats[1] += len(line)
+                yield line
                 continue
 
-            ## Changing height
-            if 'Z' in gobj:
-                if ('X' in gobj or 'Y' in gobj) and gobj['Z'] != current['Z']:
-                    log.warning("Non-orthogonal motion: From %s" % str(current))
-                    log.warning("  To: %s" % str(gobj))
-                current['Z'] = gobj['Z']
-                # Store the path into geometry and reset path
-                if len(path) > 1:
-                    geometry.append({"geom": LineString(path),
-                                     "kind": kind})
-                    path = [path[-1]]  # Start with the last point of last path.
-
-            if 'G' in gobj:
-                current['G'] = int(gobj['G'])
-                
-            if 'X' in gobj or 'Y' in gobj:
-                
-                if 'X' in gobj:
-                    x = gobj['X']
-                else:
-                    x = current['X']
-                
-                if 'Y' in gobj:
-                    y = gobj['Y']
-                else:
-                    y = current['Y']
-
-                kind = ["C", "F"]  # T=travel, C=cut, F=fast, S=slow
-
-                if current['Z'] > 0:
-                    kind[0] = 'T'
-                if current['G'] > 0:
-                    kind[1] = 'S'
-                   
-                arcdir = [None, None, "cw", "ccw"]
-                if current['G'] in [0, 1]:  # line
-                    path.append((x, y))
-
-                if current['G'] in [2, 3]:  # arc
-                    center = [gobj['I'] + current['X'], gobj['J'] + current['Y']]
-                    radius = sqrt(gobj['I']**2 + gobj['J']**2)
-                    start = arctan2(-gobj['J'], -gobj['I'])
-                    stop = arctan2(-center[1] + y, -center[0] + x)
-                    path += arc(center, radius, start, stop,
-                                arcdir[current['G']],
-                                self.steps_per_circ)
-
-            # Update current instruction
-            for code in gobj:
-                current[code] = gobj[code]
-
-        # There might not be a change in height at the
-        # end, therefore, see here too if there is
-        # a final path.
-        if len(path) > 1:
-            geometry.append({"geom": LineString(path),
-                             "kind": kind})
-
-        self.gcode_parsed = geometry
-        return geometry
+            mode = line_mode
+            gword = gwords[0] if len(gwords) > 0 else ('G', "G%02d" % mode, mode)
+            values = dict((w[0], w) for w in words)
+
+            if 'F' in values:
+                current = value('F') if pending['F'] is None else pending['F'][2]
+                if values['F'][2] != current:
+                    for out in flush():
+                        yield out
+                    pending['F'] = values['F']
+
+            moves = [w for w in words if w[0] in 'XYZIJ']
+            if len(moves) == 0:
+                continue
+
+            ## Straight XY moves, merged while aligned.
+            if mode in (0, 1) and all(w[0] in 'XY' for w in moves) and \
+                    state['X'] is not None and state['Y'] is not None:
+                run = pending['run']
+                if run is not None and run['G'][2] == mode:
+                    x = values.get('X', run['X'])
+                    y = values.get('Y', run['Y'])
+                    if self.aligned(run['start'], run['points'] + [(x[2], y[2])], tolerance):
+                        run['X'], run['Y'] = x, y
+                        run['points'].append((x[2], y[2]))
+                        continue
+
+                for out in flush():
+                    yield out
+                x = values.get('X', state['X'])
+                y = values.get('Y', state['Y'])
+                pending['run'] = {'G': gword, 'X': x, 'Y': y,
+                                  'start': (value('X'), value('Y')),
+                                  'points': [(x[2], y[2])]}
+                continue
+
+            ## Any other move.
+            for out in flush():
+                yield out
+            out = write(gword, moves)
+            if out is not None:
+                yield out
+
+        for out in flush(feed=True):
+            yield out
+
+        log.debug("modal_generator(): %d characters in, %d out." % tuple(stats))
 
     # def plot(self, tooldia=None, dpi=75, margin=0.1,
     #          color={"T": ["#F0E24D", "#B5AB3A"], "C": ["#5E6CFF", "#4650BD"]},
@@ -3502,7 +4832,8 @@ class CNCjob(Geometry):
         
     def plot2(self, axes, tooldia=None, dpi=75, margin=0.1,
               color={"T": ["#F0E24D", "#B5AB3A"], "C": ["#5E6CFF", "#4650BD"]},
-              alpha={"T": 0.3, "C": 1.0}, tool_tolerance=0.0005):
+              alpha={"T": 0.3, "C": 1.0}, tool_tolerance=0.0005,
+              fast=False, density=None):
         """
         Plots the G-code job onto the given axes.
 
@@ -3513,40 +4844,164 @@ class CNCjob(Geometry):
         :param color: Color specification.
         :param alpha: Transparency specification.
         :param tool_tolerance: Tolerance when drawing the toolshape.
+        :param fast: Draw the paths as lines with ``plot_collections()``
+            instead of a patch for each.
+        :param density: For ``fast``. See ``plot_collections()``.
         :return: None
         """
         path_num = 0
 
         if tooldia is None:
             tooldia = self.tooldia
-        
+
+        if fast:
+            self.plot_collections(axes, tooldia, color=color, alpha=alpha,
+                                  density=density)
+            return
+
+        toolpaths = self.toolpaths
+
         if tooldia == 0:
-            for geo in self.gcode_parsed:
+            for i in range(len(toolpaths)):
+                kind = toolpaths.kind_names[toolpaths.kinds[i]][0]
                 linespec = '--'
-                linecolor = color[geo['kind'][0]][1]
-                if geo['kind'][0] == 'C':
+                linecolor = color[kind][1]
+                if kind == 'C':
                     linespec = 'k-'
-                x, y = geo['geom'].coords.xy
-                axes.plot(x, y, linespec, color=linecolor)
+                path = toolpaths.path(i)
+                axes.plot(path[:, 0], path[:, 1], linespec, color=linecolor)
         else:
-            for geo in self.gcode_parsed:
+            for i in range(len(toolpaths)):
+                kind = toolpaths.kind_names[toolpaths.kinds[i]][0]
+                path = toolpaths.path(i)
                 path_num += 1
-                axes.annotate(str(path_num), xy=geo['geom'].coords[0],
+                axes.annotate(str(path_num), xy=tuple(path[0]),
                               xycoords='data')
 
-                poly = geo['geom'].buffer(tooldia / 2.0).simplify(tool_tolerance)
-                patch = PolygonPatch(poly, facecolor=color[geo['kind'][0]][0],
-                                     edgecolor=color[geo['kind'][0]][1],
-                                     alpha=alpha[geo['kind'][0]], zorder=2)
+                poly = LineString(path).buffer(tooldia / 2.0).simplify(tool_tolerance)
+                patch = PolygonPatch(poly, facecolor=color[kind][0],
+                                     edgecolor=color[kind][1],
+                                     alpha=alpha[kind], zorder=2)
                 axes.add_patch(patch)
-        
+
+    def plot_collections(self, axes, tooldia,
+                         color={"T": ["#F0E24D", "#B5AB3A"], "C": ["#5E6CFF", "#4650BD"]},
+                         alpha={"T": 0.3, "C": 1.0}, density=None):
+        """
+        Plots all the cuts as one LineCollection and all the travels
+        as another. The lines are ``tooldia`` wide in data units and
+        their width follows the zoom.
+
+        Paths are numbered only when zoomed in to less than
+        ``CNCjob.defaults["annotate_density"]`` inches per pixel, and
+        only the paths starting in view.
+
+        Widths and numbers follow the view of ``axes``. Only the
+        last plot made by this object is kept up to date.
+
+        :param axes: Matplotlib axes on which to plot.
+        :param tooldia: Tool diameter. Thin lines if 0.
+        :param color: Color specification.
+        :param alpha: Transparency specification.
+        :param density: Function returning the (x, y) units per pixel
+            of the axes, like ``PlotCanvas.get_density``. Found from
+            ``axes`` if None.
+        :return: The cuts and travels collections.
+        :rtype: dict
+        """
+
+        toolpaths = self.toolpaths
+
+        if density is None:
+            def density():
+                bbox = axes.get_window_extent()
+                xmin, xmax = axes.get_xlim()
+                ymin, ymax = axes.get_ylim()
+                return (xmax - xmin) / max(bbox.width, 1), (ymax - ymin) / max(bbox.height, 1)
+
+        max_density = CNCjob.defaults["annotate_density"]
+        if self.units.upper() == "MM":
+            max_density *= 25.4
+
+        paths = np.split(toolpaths.vertices, toolpaths.offsets[1:-1])
+        travel = toolpaths.kinds >= 2
+        collections = {}
+
+        for kind, mask in [("T", travel), ("C", ~travel)]:
+            segments = [paths[i] for i in np.flatnonzero(mask)]
+            if tooldia == 0:
+                collection = LineCollection(segments, colors=color[kind][1],
+                                            linestyles='dashed' if kind == "T" else 'solid')
+            else:
+                collection = LineCollection(segments, colors=color[kind][0],
+                                            alpha=alpha[kind], zorder=2)
+                collection.set_capstyle('round')
+                collection.set_joinstyle('round')
+            axes.add_collection(collection)
+            collections[kind] = collection
+
+        starts = toolpaths.vertices[toolpaths.offsets[:-1]]
+        labels = []
+        view = [None]
+
+        def update(*args):
+            limits = (axes.get_xlim(), axes.get_ylim())
+            if limits == view[0]:
+                return
+            view[0] = limits
+
+            units_per_px = density()[0]
+            if units_per_px <= 0:
+                return
+
+            if tooldia > 0:
+                width = tooldia / units_per_px * 72.0 / axes.figure.dpi
+                for collection in collections.values():
+                    collection.set_linewidth(width)
+
+            for label in labels:
+                label.remove()
+            del labels[:]
+
+            if units_per_px <= max_density:
+                xmin, xmax = axes.get_xlim()
+                ymin, ymax = axes.get_ylim()
+                visible = (starts[:, 0] >= xmin) & (starts[:, 0] <= xmax) & \
+                          (starts[:, 1] >= ymin) & (starts[:, 1] <= ymax)
+                for i in np.flatnonzero(visible):
+                    labels.append(axes.annotate(str(i + 1), xy=tuple(starts[i]),
+                                                xycoords='data'))
+
+        # Zooming and panning set the X limits and then the Y limits,
+        # so the view is updated once, when the Y limits change.
+        if self.plot_callback is not None:
+            registry, cid = self.plot_callback
+            registry.disconnect(cid)
+        self.plot_callback = (axes.callbacks, axes.callbacks.connect('ylim_changed', update))
+        update()
+
+        return collections
+
     def create_geometry(self):
-        # TODO: This takes forever. Too much data?
-        self.solid_geometry = cascaded_union([geo['geom'] for geo in self.gcode_parsed])
+        """
+        Drops ``self.solid_geometry`` so it is made again from the
+        tool paths when next asked for.
+
+        :return: None
+        """
+        self._solid_geometry = None
+
+    def bounds(self):
+        """
+        Returns coordinates of rectangular bounds of the tool
+        paths: (xmin, ymin, xmax, ymax). Taken from the path
+        vertices, without making ``self.solid_geometry``.
+        """
+        return self.toolpaths.bounds()
 
     def linear2gcode(self, linear, tolerance=0, down=True, up=True,
                      zcut=None, ztravel=None, downrate=None,
-                     feedrate=None, cont=False):
+                     feedrate=None, cont=False, arc_fit=None, cache=None):
         """
         Generates G-code to cut along the linear feature.
 
@@ -3555,10 +5010,23 @@ class CNCjob(Geometry):
         :param tolerance: All points in the simplified object will be within the
             tolerance distance of the original geometry.
         :type tolerance: float
+        :param arc_fit: Cut runs of points on a circle with G02/G03 if
+            within this distance of the path, after rounding to
+            ``coordinate_format``. See ``fit_arcs()``. If None,
+            ``CNCjob.defaults["arc_fit_tolerance"]``. 0 for G01 only.
+        :type arc_fit: float
+        :param cache: Dictionary kept by the caller between calls for the
+            same path, e.g. for each pass of a multi-depth cut. The XY
+            moves are formatted in the first call and reused in the
+            others, where only the Z moves change.
+        :type cache: dict
         :return: G-code to cut along the linear feature.
         :rtype: str
         """
 
+        if arc_fit is None:
+            arc_fit = CNCjob.defaults["arc_fit_tolerance"]
+
         if zcut is None:
             zcut = self.z_cut
 
@@ -3571,58 +5039,111 @@ class CNCjob(Geometry):
         if feedrate is None:
             feedrate = self.feedrate
 
-        t = "G0%d " + CNCjob.defaults["coordinate_format"] + "\n"
-
-        # Simplify paths?
-        if tolerance > 0:
-            target_linear = linear.simplify(tolerance)
+        if cache is None or "moves" not in cache:
+            moves = self.linear2moves(linear, tolerance, arc_fit)
+            if cache is not None:
+                cache.update(moves)
         else:
-            target_linear = linear
+            moves = cache
+            self.arc_fit_lines[0] += moves["counts"][0]
+            self.arc_fit_lines[1] += moves["counts"][1]
 
-        gcode = ""
-
-        path = list(target_linear.coords)
+        gcode = []
 
         # Move fast to 1st point
         if not cont:
-            gcode += t % (0, path[0][0], path[0][1])  # Move to first point
+            gcode.append(moves["start"])  # Move to first point
 
         # Move down to cutting depth
         if down:
             # Different feedrate for vertical cut?
             if self.zdownrate is not None:
-                gcode += "F%.2f\n" % downrate
-                gcode += "G01 Z%.4f\n" % zcut       # Start cutting
-                gcode += "F%.2f\n" % feedrate       # Restore feedrate
+                gcode.append("F%.2f\n" % downrate)
+                gcode.append("G01 Z%.4f\n" % zcut)       # Start cutting
+                gcode.append("F%.2f\n" % feedrate)       # Restore feedrate
             else:
-                gcode += "G01 Z%.4f\n" % zcut       # Start cutting
+                gcode.append("G01 Z%.4f\n" % zcut)       # Start cutting
 
         # Cutting...
-        for pt in path[1:]:
-            gcode += t % (1, pt[0], pt[1])    # Linear motion to point
+        gcode.append(moves["moves"])
 
         # Up to travelling height.
         if up:
-            gcode += "G00 Z%.4f\n" % ztravel  # Stop cutting
+            gcode.append("G00 Z%.4f\n" % ztravel)  # Stop cutting
+
+        return ''.join(gcode)
+
+    def linear2moves(self, linear, tolerance, arc_fit):
+        """
+        XY moves of ``linear2gcode()``.
+
+        :param linear: The path to cut along.
+        :type: Shapely.LinearRing or Shapely.Linear String
+        :param tolerance: Simplify the path to within this distance.
+        :param arc_fit: Cut along arcs within this distance.
+        :return: Dictionary with the fast move to the first point
+            ("start"), the cutting moves ("moves") and the number of
+            cutting moves without and with arcs ("counts").
+        :rtype: dict
+        """
+
+        t = "G0%d " + CNCjob.defaults["coordinate_format"] + "\n"
+        t1 = t.replace("%d", "1", 1)
+
+        # Simplify paths?
+        if tolerance > 0:
+            target_linear = linear.simplify(tolerance)
+        else:
+            target_linear = linear
 
-        return gcode
+        path = np.array(target_linear.coords)[:, :2]
+        start = t % (0, path[0][0], path[0][1])
+
+        if arc_fit > 0:
+            tarc = "G0%d " + CNCjob.defaults["coordinate_format"] + \
+                   CNCjob.defaults["coordinate_format"].replace("X", "I").replace("Y", "J") + "\n"
+            # Rounding to the format moves the ends and the center
+            # by up to half a digit on each axis, which moves the
+            # arc by up to 3 times that, diagonally.
+            digits = fixed_field_re.findall(CNCjob.defaults["coordinate_format"])
+            rounding = 3 * sqrt(0.5) * 10 ** -min(int(d) for d in digits) if digits else 0.0
+
+            gcode = []
+            current = 0
+            arcs = fit_arcs(path, arc_fit - rounding) if arc_fit > rounding else []
+            for first, last, center, clockwise in arcs:
+                gcode.append(format_lines(path[current + 1:first + 1], t1))
+                pt = path[last]
+                gcode.append(tarc % (2 if clockwise else 3, pt[0], pt[1],
+                                     center[0] - path[first][0], center[1] - path[first][1]))
+                current = last
+            gcode.append(format_lines(path[current + 1:], t1))
+            moves = ''.join(gcode)
+            counts = (len(path) - 1, moves.count("\n"))
+            self.arc_fit_lines[0] += counts[0]
+            self.arc_fit_lines[1] += counts[1]
+        else:
+            moves = format_lines(path[1:], t1)    # Linear motion to point
+            counts = (0, 0)
+
+        return {"start": start, "moves": moves, "counts": counts}
 
     def point2gcode(self, point):
-        gcode = ""
+        gcode = []
         #t = "G0%d X%.4fY%.4f\n"
         t = "G0%d " + CNCjob.defaults["coordinate_format"] + "\n"
         path = list(point.coords)
-        gcode += t % (0, path[0][0], path[0][1])  # Move to first point
+        gcode.append(t % (0, path[0][0], path[0][1]))  # Move to first point
 
         if self.zdownrate is not None:
-            gcode += "F%.2f\n" % self.zdownrate
-            gcode += "G01 Z%.4f\n" % self.z_cut       # Start cutting
-            gcode += "F%.2f\n" % self.feedrate
+            gcode.append("F%.2f\n" % self.zdownrate)
+            gcode.append("G01 Z%.4f\n" % self.z_cut)       # Start cutting
+            gcode.append("F%.2f\n" % self.feedrate)
         else:
-            gcode += "G01 Z%.4f\n" % self.z_cut       # Start cutting
+            gcode.append("G01 Z%.4f\n" % self.z_cut)       # Start cutting
 
-        gcode += "G00 Z%.4f\n" % self.z_move      # Stop cutting
-        return gcode
+        gcode.append("G00 Z%.4f\n" % self.z_move)      # Stop cutting
+        return ''.join(gcode)
 
     def scale(self, factor):
         """
@@ -3636,10 +5157,7 @@ class CNCjob(Geometry):
         :rtype: None
         """
 
-        for g in self.gcode_parsed:
-            g['geom'] = affinity.scale(g['geom'], factor, factor, origin=(0, 0))
-
-        self.create_geometry()
+        self.toolpaths = self.toolpaths.affine(factor, 0.0, 0.0, factor, 0.0, 0.0)
 
     def offset(self, vect):
         """
@@ -3652,10 +5170,7 @@ class CNCjob(Geometry):
         """
         dx, dy = vect
 
-        for g in self.gcode_parsed:
-            g['geom'] = affinity.translate(g['geom'], xoff=dx, yoff=dy)
-
-        self.create_geometry()
+        self.toolpaths = self.toolpaths.affine(1.0, 0.0, 0.0, 1.0, dx, dy)
 
     def skew(self, angle_x=None, angle_y=None, point=None):
         """
@@ -3678,15 +5193,13 @@ class CNCjob(Geometry):
         if angle_x is None:
             angle_x = 0.0
         if point == None:
-            for g in self.gcode_parsed:
-                g['geom'] = affinity.skew(g['geom'], angle_x, angle_y,
-                                          origin=(0, 0))
+            px, py = 0, 0
         else:
-            for g in self.gcode_parsed:
-                g['geom'] = affinity.skew(g['geom'], angle_x, angle_y,
-                                          origin=point)
+            px, py = point
 
-        self.create_geometry()
+        tx = math.tan(math.radians(angle_x))
+        ty = math.tan(math.radians(angle_y))
+        self.toolpaths = self.toolpaths.affine(1.0, tx, ty, 1.0, -py * tx, -px * ty)
 
     def rotate(self, angle, point=None):
         """
@@ -3696,14 +5209,19 @@ class CNCjob(Geometry):
         :return:
         """
         if point is None:
-            for g in self.gcode_parsed:
-                g['geom'] = affinity.rotate(g['geom'], angle, origin='center')
+            # Each path around the center of its own bounds.
+            centers = self.toolpaths.path_centers()
+            counts = np.diff(self.toolpaths.offsets)
+            px = np.repeat(centers[:, 0], counts)
+            py = np.repeat(centers[:, 1], counts)
         else:
             px, py = point
-            for g in self.gcode_parsed:
-                g['geom'] = affinity.rotate(g['geom'], angle, origin=(px, py))
 
-        self.create_geometry()
+        cosa = math.cos(math.radians(angle))
+        sina = math.sin(math.radians(angle))
+        self.toolpaths = self.toolpaths.affine(cosa, -sina, sina, cosa,
+                                               px - px * cosa + py * sina,
+                                               py - px * sina - py * cosa)
 
     def mirror(self, axis, point=None):
         """
@@ -3719,10 +5237,8 @@ class CNCjob(Geometry):
 
         xscale, yscale = {"X": (1.0, -1.0), "Y": (-1.0, 1.0)}[axis]
 
-        for g in self.gcode_parsed:
-            g['geom'] = affinity.scale(g['geom'], xscale, yscale, origin=(px, py))
-
-        self.create_geometry()
+        self.toolpaths = self.toolpaths.affine(xscale, 0.0, 0.0, yscale,
+                                               px - px * xscale, py - py * yscale)
         return
 
     def export_svg(self, scale_factor=0.00):
@@ -3748,20 +5264,15 @@ class CNCjob(Geometry):
 
         # Seperate the list of cuts and travels into 2 distinct lists
         # This way we can add different formatting / colors to both
-        cuts = []
-        travels = []
-        for g in self.gcode_parsed:
-            if g['kind'][0] == 'C': cuts.append(g)
-            if g['kind'][0] == 'T': travels.append(g)
-
-        # Used to determine the overall board size
-        self.solid_geometry = cascaded_union([geo['geom'] for geo in self.gcode_parsed])
+        travel = self.toolpaths.kinds >= 2
+        cuts = self.toolpaths.linestrings(np.flatnonzero(~travel))
+        travels = self.toolpaths.linestrings(np.flatnonzero(travel))
 
         # Convert the cuts and travels into single geometry objects we can render as svg xml
         if travels:
-            travelsgeom = cascaded_union([geo['geom'] for geo in travels])
+            travelsgeom = cascaded_union(travels)
         if cuts:
-            cutsgeom = cascaded_union([geo['geom'] for geo in cuts])
+            cutsgeom = cascaded_union(cuts)
 
         # Render the SVG Xml
         # The scale factor affects the size of the lines, and the stroke color adds different formatting for each set
@@ -3813,7 +5324,7 @@ def get_bounds(geometry_list):
     return [xmin, ymin, xmax, ymax]
 
 
-def arc(center, radius, start, stop, direction, steps_per_circ):
+def arc(center, radius, start, stop, direction, steps_per_circ, tolerance=None):
     """
     Creates a list of point along the specified arc.
 
@@ -3830,34 +5341,44 @@ def arc(center, radius, start, stop, direction, steps_per_circ):
     :param steps_per_circ: Number of straight line segments to
         represent a circle.
     :type steps_per_circ: int
+    :param tolerance: Maximum distance between the arc and the
+        straight segments representing it. If given, the number
+        of segments depends on the radius and ``steps_per_circ``
+        is ignored.
+    :type tolerance: float
     :return: The desired arc, as list of tuples
     :rtype: list
     """
-    # TODO: Resolution should be established by maximum error from the exact arc.
 
     da_sign = {"cw": -1.0, "ccw": 1.0}
-    points = []
     if direction == "ccw" and stop <= start:
         stop += 2 * pi
     if direction == "cw" and stop >= start:
         stop -= 2 * pi
     
     angle = abs(stop - start)
-        
-    #angle = stop-start
-    steps = max([int(ceil(angle / (2 * pi) * steps_per_circ)), 2])
-    delta_angle = da_sign[direction] * angle * 1.0 / steps
-    for i in range(steps + 1):
-        theta = start + delta_angle * i
-        points.append((center[0] + radius * cos(theta), center[1] + radius * sin(theta)))
-    return points
 
+    if tolerance:
+        # A segment spanning an angle a is at most r * (1 - cos(a / 2))
+        # away from the arc. Segments never span more than 90 degrees.
+        max_angle = pi / 2
+        if tolerance < radius:
+            max_angle = min(2 * np.arccos(1 - tolerance / radius), max_angle)
+        steps = int(ceil(angle / max_angle))
+    else:
+        steps = int(ceil(angle / (2 * pi) * steps_per_circ))
+    steps = max(steps, 2)
+
+    theta = start + da_sign[direction] * angle / steps * np.arange(steps + 1)
+    return list(zip((center[0] + radius * np.cos(theta)).tolist(),
+                    (center[1] + radius * np.sin(theta)).tolist()))
 
-def arc2(p1, p2, center, direction, steps_per_circ):
+
+def arc2(p1, p2, center, direction, steps_per_circ, tolerance=None):
     r = sqrt((center[0] - p1[0]) ** 2 + (center[1] - p1[1]) ** 2)
     start = arctan2(p1[1] - center[1], p1[0] - center[0])
     stop = arctan2(p2[1] - center[1], p2[0] - center[0])
-    return arc(center, r, start, stop, direction, steps_per_circ)
+    return arc(center, r, start, stop, direction, steps_per_circ, tolerance)
 
 
 def arc_angle(start, stop, direction):
@@ -3870,6 +5391,200 @@ def arc_angle(start, stop, direction):
     return angle
 
 
+def circle_through(p1, p2, p3):
+    """
+    Center of the circle through 3 points.
+
+    :return: (x, y) or None if the points are on a line.
+    """
+    bx, by = p2[0] - p1[0], p2[1] - p1[1]
+    cx, cy = p3[0] - p1[0], p3[1] - p1[1]
+    d = 2.0 * (bx * cy - by * cx)
+    if d == 0:
+        return None
+
+    b2 = bx * bx + by * by
+    c2 = cx * cx + cy * cy
+    return (p1[0] + (cy * b2 - by * c2) / d,
+            p1[1] + (bx * c2 - cx * b2) / d)
+
+
+def arc_through(points, tolerance, flat=False):
+    """
+    Tries to replace a run of points by a single circular arc.
+
+    The arc goes through the first and last points. All the points,
+    and the segments between them, must be within ``tolerance`` of
+    it, it must turn one way and by less than a full turn, and it
+    must stray from the straight line between its ends by more
+    than ``tolerance`` (or a line would do), unless ``flat``.
+
+    :param points: (N, 2) array, N >= 3.
+    :param tolerance: Maximum distance to the arc.
+    :param flat: Accept arcs that are flat enough to be a line.
+    :return: (center, clockwise) or None if there is no such arc.
+    """
+    center = circle_through(points[0], points[len(points) // 2], points[-1])
+    if center is None:
+        return None
+
+    v = points - center
+    radius = np.hypot(v[0, 0], v[0, 1])
+    if np.abs(np.hypot(v[:, 0], v[:, 1]) - radius).max() > tolerance:
+        return None
+
+    # Angle turned at each segment.
+    cross = v[:-1, 0] * v[1:, 1] - v[:-1, 1] * v[1:, 0]
+    dot = v[:-1, 0] * v[1:, 0] + v[:-1, 1] * v[1:, 1]
+    steps = np.arctan2(cross, dot)
+    if not (np.all(steps > 0) or np.all(steps < 0)):
+        return None
+
+    sweep = abs(steps.sum())
+    if sweep >= 1.99 * pi:
+        return None
+
+    # Points on a segment are no farther from the center than its
+    # ends, and no nearer than its point nearest to the center,
+    # which must not be more than tolerance inside the arc either.
+    d = np.diff(points, axis=0)
+    length2 = (d ** 2).sum(axis=1)
+    t = np.clip(-(v[:-1] * d).sum(axis=1) / np.where(length2 > 0, length2, 1), 0, 1)
+    nearest = np.hypot(v[:-1, 0] + t * d[:, 0], v[:-1, 1] + t * d[:, 1])
+    if (radius - nearest).max() > tolerance:
+        return None
+
+    # Flat enough to be a line.
+    if not flat and sweep < pi and radius * (1 - cos(sweep / 2)) <= tolerance:
+        return None
+
+    return center, steps[0] < 0
+
+
+def fit_arcs(points, tolerance, min_points=4):
+    """
+    Finds runs of points in a path that can be cut as circular arcs
+    (G02/G03), within ``tolerance``. See ``arc_through()``.
+
+    Each run starts where the previous one ended or later, and is
+    made as long as it can, growing it by doubling and then
+    bisecting. Short runs on a large circle are flat, so runs are
+    grown regardless, and dropped at the end if still flat.
+
+    :param points: The path, (N, 2) array-like.
+    :param tolerance: Maximum distance from the points, and from the
+        segments between them, to the arcs.
+    :param min_points: Least number of points in an arc.
+    :return: List of (first, last, center, clockwise), where first and
+        last are indexes in ``points`` of the ends of each arc.
+    :rtype: list
+    """
+
+    points = np.asarray(points, dtype=float)[:, :2]
+    n = len(points)
+    min_points = max(min_points, 3)
+    arcs = []
+
+    first = 0
+    while first + min_points <= n:
+        found = arc_through(points[first:first + min_points], tolerance, flat=True)
+        if found is None:
+            first += 1
+            continue
+
+        # last fits, too_far does not.
+        last = first + min_points - 1
+        too_far = None
+        step = min_points
+        while last < n - 1:
+            candidate = min(last + step, n - 1)
+            fit = arc_through(points[first:candidate + 1], tolerance, flat=True)
+            if fit is None:
+                too_far = candidate
+                break
+            last, found = candidate, fit
+            step *= 2
+
+        while too_far is not None and too_far - last > 1:
+            candidate = (last + too_far) // 2
+            fit = arc_through(points[first:candidate + 1], tolerance, flat=True)
+            if fit is None:
+                too_far = candidate
+            else:
+                last, found = candidate, fit
+
+        if arc_through(points[first:last + 1], tolerance) is not None:
+            arcs.append((first, last, found[0], found[1]))
+        first = last
+
+    return arcs
+
+
+# Fixed point fields, like "%.4f", in a line template.
+fixed_field_re = re.compile(r'%\.(\d+)f')
+
+
+def format_lines(coords, template, min_fixed=512):
+    """
+    Formats each row of ``coords`` with ``template``, i.e. gives
+    the same text as ``''.join(template % tuple(row) for row in coords)``.
+    For example, ``format_lines(path, "G01 X%.4fY%.4f\\n")`` gives the
+    G-code lines to cut along ``path``.
+
+    Blocks of ``min_fixed`` or more rows, with a template made of
+    ``%.Nf`` fields and plain text only, are converted to fixed
+    point integers and their digits are laid out in a byte array,
+    which becomes the text in a single join. Smaller blocks are
+    formatted by a single ``%`` with the template repeated.
+
+    :param coords: (N, M) array, M being the number of fields.
+    :param template: Line template.
+    :param min_fixed: Rows needed to use fixed point integers.
+    :return: Formatted lines.
+    :rtype: str
+    """
+    coords = np.asarray(coords, dtype=float)
+    n = len(coords)
+    if n == 0:
+        return ""
+    coords = coords.reshape(n, -1)
+
+    pieces = fixed_field_re.split(template)
+    literals, decimals = pieces[0::2], [int(d) for d in pieces[1::2]]
+    if n < min_fixed or '%' in ''.join(literals) or len(decimals) != coords.shape[1]:
+        return (template * n) % tuple(coords.ravel().tolist())
+
+    parts = []
+    for column, d in enumerate(decimals):
+        values = coords[:, column]
+        scaled = values * 10 ** d
+        ints = np.abs(np.rint(scaled)).astype(np.int64)
+
+        # Near a tie, rint() could round the other way than '%'.
+        ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        for i in np.flatnonzero(ties):
+            ints[i] = abs(int(("%.*f" % (d, values[i])).replace(".", "")))
+
+        # Digits as characters, right aligned. Leading zeros of the
+        # integer part become 0 bytes, which are dropped at the end.
+        width = max(len(str(int(ints.max()))), d + 1)
+        powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+        digits = ((ints[:, None] // powers) % 10 + ord('0')).astype(np.uint8)
+        whole = digits[:, :width - d]
+        whole[:, :-1][np.cumsum(whole[:, :-1] != ord('0'), axis=1) == 0] = 0
+
+        parts.append(np.frombuffer(literals[column].encode(), dtype=np.uint8))
+        parts.append(np.where(np.signbit(values), ord('-'), 0).astype(np.uint8)[:, None])
+        parts.append(whole)
+        if d > 0:
+            parts.append(np.array([ord('.')], dtype=np.uint8))
+            parts.append(digits[:, width - d:])
+    parts.append(np.frombuffer(literals[-1].encode(), dtype=np.uint8))
+
+    block = np.hstack([np.broadcast_to(part, (n, part.shape[-1])) for part in parts])
+    return block.tobytes().replace(b"\0", b"").decode()
+
+
 # def find_polygon(poly, point):
 #     """
 #     Find an object that object.contains(Point(point)) in
@@ -3903,18 +5618,24 @@ def to_dict(obj):
     Makes the following types into serializable form:
 
     * ApertureMacro
+    * ToolpathStore
     * BaseGeometry
 
     :param obj: Shapely geometry.
     :type obj: BaseGeometry
     :return: Dictionary with serializable form if ``obj`` was
-        BaseGeometry or ApertureMacro, otherwise returns ``obj``.
+        BaseGeometry, ApertureMacro or ToolpathStore, otherwise returns ``obj``.
     """
     if isinstance(obj, ApertureMacro):
         return {
             "__class__": "ApertureMacro",
             "__inst__": obj.to_dict()
         }
+    if isinstance(obj, ToolpathStore):
+        return {
+            "__class__": "ToolpathStore",
+            "__inst__": obj.to_dict()
+        }
     if isinstance(obj, BaseGeometry):
         return {
             "__class__": "Shply",
@@ -3938,6 +5659,10 @@ def dict2obj(d):
             am = ApertureMacro()
             am.from_dict(d['__inst__'])
             return am
+        if d['__class__'] == "ToolpathStore":
+            toolpaths = ToolpathStore()
+            toolpaths.from_dict(d['__inst__'])
+            return toolpaths
         return d
     else:
         return d
@@ -4001,6 +5726,65 @@ def parse_gerber_number(strnumber, frac_digits):
     return int(strnumber) * (10 ** (-frac_digits))
 
 
+def mmap_lines(filename, chunk_size=1 << 20, progress=None):
+    """
+    Generator of the lines of a text file. The file is memory-mapped
+    and decoded in blocks of about ``chunk_size`` bytes that end at a
+    line break, so memory use does not depend on the size of the file.
+    Lines are split on "\\n", "\\r\\n" or "\\r" and returned without them.
+
+    :param filename: File to read.
+    :type filename: str
+    :param chunk_size: Approximate number of bytes decoded at a time.
+    :type chunk_size: int
+    :param progress: Called with the percentage (0-100) of the bytes
+        read from the file, only when it changes.
+    :type progress: function
+    :return: Generator of str.
+    """
+
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mm, 'madvise'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+
+        try:
+            start = 0
+            percent = -1
+            while start < size:
+                end = min(start + chunk_size, size)
+
+                # End the block at a line break, or after the first
+                # one if the line is longer than chunk_size.
+                if end < size:
+                    pos = max(mm.rfind(b'\n', start, end), mm.rfind(b'\r', start, end))
+                    if pos < 0:
+                        found = [p for p in (mm.find(b'\n', end), mm.find(b'\r', end)) if p >= 0]
+                        pos = min(found) if len(found) > 0 else size - 1
+                    if mm[pos:pos + 2] == b'\r\n':
+                        pos += 1
+                    end = pos + 1
+
+                block = mm[start:end].decode('utf-8', 'replace')
+                block = block.replace('\r\n', '\n').replace('\r', '\n')
+                lines = block.split('\n')
+                if block.endswith('\n'):
+                    lines.pop()
+                for line in lines:
+                    yield line
+
+                start = end
+                if progress is not None and int(100 * start / size) != percent:
+                    percent = int(100 * start / size)
+                    progress(percent)
+        finally:
+            mm.close()
+
+
 # def voronoi(P):
 #     """
 #     Returns a list of all edges of the voronoi diagram for the given input points.
@@ -4245,6 +6029,851 @@ def distance(pt1, pt2):
     return sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
 
 
+def path_length(points, start=(0, 0)):
+    """
+    Length of the path from ``start`` through all points in order.
+
+    :param points: (N, 2) array of points.
+    :param start: First point of the path.
+    :return: Length of the path.
+    :rtype: float
+    """
+    path = np.vstack(([start], np.asarray(points, dtype=float).reshape(-1, 2)))
+    return float(np.hypot(*np.diff(path, axis=0).T).sum())
+
+
+def nearest_neighbour_order(points, start=(0, 0)):
+    """
+    Orders points by going from ``start`` to the nearest point
+    not yet visited, and so on. Nearest points are looked up in
+    a KD-tree, which is rebuilt without the visited points when
+    half of its points have been visited.
+
+    :param points: (N, 2) array of points.
+    :param start: Where the path starts.
+    :return: Indexes of points in visiting order.
+    :rtype: numpy.ndarray
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(points)
+
+    order = np.empty(n, dtype=int)
+    visited = np.zeros(n, dtype=bool)
+    remaining = np.arange(n)
+    tree = cKDTree(points) if n > 0 else None
+    stale = 0  # Visited points still in the tree.
+    current = start
+
+    for i in range(n):
+        k = min(8, len(remaining))
+        while True:
+            idx = np.atleast_1d(tree.query(current, k=k)[1])
+            candidates = remaining[idx]
+            free = candidates[~visited[candidates]]
+            if len(free) > 0:
+                break
+            k = min(2 * k, len(remaining))
+
+        nearest = free[0]
+        order[i] = nearest
+        visited[nearest] = True
+        current = points[nearest]
+
+        stale += 1
+        if stale > len(remaining) // 2 and i < n - 1:
+            remaining = remaining[~visited[remaining]]
+            tree = cKDTree(points[remaining])
+            stale = 0
+
+    return order
+
+
+def drill_order(points, start=(0, 0), time_budget=1.0, neighbors=8):
+    """
+    Finds a short path from ``start`` through all points, i.e. an
+    open travelling salesman tour. A nearest neighbour path is
+    improved with 2-opt (reverse a piece of the path) and Or-opt
+    (move 1 to 3 consecutive points elsewhere) moves between near
+    points, until no move shortens it or ``time_budget`` seconds
+    have passed.
+
+    :param points: (N, 2) array of points.
+    :param start: Where the tool is before the first point.
+    :param time_budget: Seconds to spend improving the path.
+    :param neighbors: Number of nearest points to try moves with.
+    :return: Indexes of points in visiting order.
+    :rtype: numpy.ndarray
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    order = nearest_neighbour_order(points, start)
+    if len(points) < 3:
+        return order
+
+    deadline = time.time() + time_budget
+
+    # Node 0 is the start. It stays first.
+    nodes = np.vstack(([start], points))
+    m = len(nodes)
+    xs = nodes[:, 0].tolist()
+    ys = nodes[:, 1].tolist()
+    near = cKDTree(nodes).query(nodes, k=min(neighbors + 1, m))[1][:, 1:].tolist()
+
+    tour = [0] + (order + 1).tolist()
+    pos = [0] * m
+    for i, node in enumerate(tour):
+        pos[node] = i
+
+    def dist(a, b):
+        return math.hypot(xs[a] - xs[b], ys[a] - ys[b])
+
+    def two_opt(i, j):
+        """
+        Replaces edges (i, i+1) and (j, j+1) with (i, j) and
+        (i+1, j+1) by reversing tour[i+1:j+1], if shorter.
+        """
+        if j - i < 2:
+            return False
+        a, b, c = tour[i], tour[i + 1], tour[j]
+        delta = dist(a, c) - dist(a, b)
+        if j + 1 < m:
+            d = tour[j + 1]
+            delta += dist(b, d) - dist(c, d)
+        if delta > -1e-9:
+            return False
+        tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+        for k in range(i + 1, j + 1):
+            pos[tour[k]] = k
+        return True
+
+    def or_opt(i, length):
+        """
+        Moves tour[i:i+length] next to a near point, if shorter.
+        """
+        if i + length > m:
+            return False
+        a, e = tour[i], tour[i + length - 1]
+        p = tour[i - 1]
+        nx = tour[i + length] if i + length < m else None
+        gain = dist(p, a)
+        if nx is not None:
+            gain += dist(e, nx) - dist(p, nx)
+        if gain < 1e-9:
+            return False
+
+        for c in near[a]:
+            dac = dist(a, c)
+            if dac >= gain:
+                break
+            k = pos[c]
+            if i <= k < i + length:
+                continue
+
+            # c, a ... e, cn
+            if k != i - 1:
+                cn = tour[k + 1] if k + 1 < m else None
+                cost = dac
+                if cn is not None:
+                    cost += dist(e, cn) - dist(c, cn)
+                if cost < gain - 1e-9:
+                    segment = tour[i:i + length]
+                    del tour[i:i + length]
+                    k = k if k < i else k - length
+                    tour[k + 1:k + 1] = segment
+                    lo, hi = min(i, k + 1), max(i + length, k + 1 + length)
+                    for idx in range(lo, hi):
+                        pos[tour[idx]] = idx
+                    return True
+            # cp, e ... a, c
+            if k != i + length and k > 0:
+                cp = tour[k - 1]
+                cost = dac + dist(cp, e) - dist(cp, c)
+                if cost < gain - 1e-9:
+                    segment = tour[i:i + length][::-1]
+                    del tour[i:i + length]
+                    k = k if k < i else k - length
+                    tour[k:k] = segment
+                    lo, hi = min(i, k), max(i + length, k + length)
+                    for idx in range(lo, hi):
+                        pos[tour[idx]] = idx
+                    return True
+        return False
+
+    improved = True
+    while improved:
+        improved = False
+        for count, a in enumerate(tour[1:]):
+            if count % 256 == 0 and time.time() > deadline:
+                improved = False
+                break
+
+            i = pos[a]
+            for c in near[a]:
+                j = pos[c]
+                # Edges leaving a and c forward.
+                if i + 1 == m or dist(a, c) < dist(a, tour[i + 1]):
+                    if two_opt(min(i, j), max(i, j)):
+                        improved = True
+                        break
+                # Edges entering a and c.
+                if j > 0 and dist(a, c) < dist(tour[i - 1], a):
+                    if two_opt(min(i, j) - 1, max(i, j) - 1):
+                        improved = True
+                        break
+            else:
+                for length in (1, 2, 3):
+                    if or_opt(pos[a], length):
+                        improved = True
+                        break
+
+    return np.array(tour[1:], dtype=int) - 1
+
+
+def path_entries(coords, closed, returning=False, rotate=True):
+    """
+    Where a path can be entered and where the tool is when it
+    leaves it. An open path is entered at either end and left at
+    the other one, or at the same end if ``returning`` (i.e. it is
+    cut an even number of times back and forth). A closed path is
+    entered and left at any of its vertices if ``rotate``, else at
+    its first vertex.
+
+    :param coords: (N, 2) array of the path's vertices. The last
+        vertex of a closed path repeats the first one.
+    :param closed: Whether the path is closed (or a single point).
+    :param returning: Whether an open path ends where it starts.
+    :param rotate: Whether a closed path can start at any vertex.
+    :return: Vertex indexes where the path can be entered, and the
+        vertex indexes where it is left for each of them.
+    :rtype: tuple
+    """
+    n = len(coords)
+    if closed:
+        entries = np.arange(max(n - 1, 1) if rotate else 1)
+        return entries, entries
+    entries = np.array([0, n - 1])
+    return entries, (entries if returning else entries[::-1])
+
+
+def orient_path(coords, entry):
+    """
+    Vertices of a path in the order they are cut when it is
+    entered at vertex ``entry``. See ``path_entries()``.
+
+    :param coords: (N, 2) array of the path's vertices.
+    :param entry: Index of the first vertex to cut.
+    :return: (N, 2) array of vertices.
+    :rtype: numpy.ndarray
+    """
+    if entry == 0:
+        return coords
+    if len(coords) > 1 and np.array_equal(coords[0], coords[-1]):
+        return np.vstack((coords[entry:-1], coords[:entry + 1]))
+    return coords[::-1]
+
+
+def path_order(paths, start=(0, 0), returning=None, rotate=True,
+               time_budget=1.0, neighbors=8):
+    """
+    Finds an order and a starting vertex for each path to cut them
+    with little travel in between. Open paths can be cut in either
+    direction and closed paths (first vertex equal to the last)
+    can start at any vertex, see ``path_entries()``.
+
+    Paths are first ordered by going to the nearest entry of a path
+    not yet cut, from a KD-tree of all entries. If ``time_budget``
+    is not zero, the order is improved with 2-opt moves (reverse a
+    piece of the order, which cuts each path in it the other way)
+    between near paths, and then each path is entered where it is
+    closest to the previous and next paths. This is repeated until
+    nothing shortens the travel or ``time_budget`` seconds have
+    passed. The result is never longer than the nearest-first
+    order with closed paths entered at their first vertex.
+
+    :param paths: List of (N, 2) arrays of vertices.
+    :param start: Where the tool is before the first path.
+    :param returning: Boolean for each path, see ``path_entries()``.
+    :param rotate: Whether closed paths can start at any vertex.
+    :param time_budget: Seconds to spend improving the order.
+    :param neighbors: Number of near paths to try moves with.
+    :return: Indexes of paths in cutting order and the vertex
+        where each one is entered, in the same order.
+    :rtype: tuple
+    """
+    paths = [np.asarray(p, dtype=float).reshape(-1, 2) for p in paths]
+    n = len(paths)
+    if returning is None:
+        returning = np.zeros(n, dtype=bool)
+    closed = [len(p) == 1 or np.array_equal(p[0], p[-1]) for p in paths]
+
+    ## All entries of all paths
+    options = [path_entries(p, c, r, rotate) for p, c, r in zip(paths, closed, returning)]
+    owner = np.repeat(np.arange(n), [len(o[0]) for o in options])
+    if n == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    entry_vertex = np.concatenate([o[0] for o in options])
+    exit_vertex = np.concatenate([o[1] for o in options])
+    entry_xy = np.vstack([p[o[0]] for p, o in zip(paths, options)])
+
+    ## Nearest neighbour
+    order = np.empty(n, dtype=int)
+    entries = np.empty(n, dtype=int)
+    exits = np.empty(n, dtype=int)
+    visited = np.zeros(n, dtype=bool)
+    remaining = np.arange(len(owner))
+    tree = cKDTree(entry_xy)
+    stale = 0  # Entries of visited paths still in the tree.
+    current = start
+    skip = 0  # Entries of the last path, which are near.
+
+    for i in range(n):
+        k = min(8 + skip, len(remaining))
+        while True:
+            idx = np.atleast_1d(tree.query(current, k=k)[1])
+            candidates = remaining[idx]
+            free = candidates[~visited[owner[candidates]]]
+            if len(free) > 0:
+                break
+            k = min(2 * k, len(remaining))
+
+        nearest = free[0]
+        path = owner[nearest]
+        order[i] = path
+        entries[i] = entry_vertex[nearest]
+        exits[i] = exit_vertex[nearest]
+        visited[path] = True
+        current = paths[path][exits[i]]
+
+        skip = len(options[path][0])
+        stale += skip
+        if stale > len(remaining) // 2 and i < n - 1:
+            remaining = remaining[~visited[owner[remaining]]]
+            tree = cKDTree(entry_xy[remaining])
+            stale = 0
+
+    if time_budget <= 0 or n < 2:
+        return order, entries
+
+    deadline = time.time() + time_budget
+
+    # Entering closed paths at any vertex can still lead the
+    # greedy order astray. Improve the shorter of the two orders,
+    # and never return one longer than it.
+    if rotate:
+        base_order, base_entries = path_order(paths, start, returning, rotate=False,
+                                              time_budget=0)
+        base_travel = path_travel(paths, base_order, base_entries, start, returning)
+        if base_travel < path_travel(paths, order, entries, start, returning):
+            order, entries = base_order, base_entries
+            for i, (path, entry) in enumerate(zip(order, entries)):
+                vin, vout = options[path]
+                exits[i] = vout[list(vin).index(entry)]
+    else:
+        base_order, base_entries = order.copy(), entries.copy()
+        base_travel = path_travel(paths, base_order, base_entries, start, returning)
+
+    ## 2-opt
+    # Node 0 is the start. It stays first. Entry and exit points
+    # of each path as cut now, indexed by node.
+    m = n + 1
+    ein = [tuple(start)] + [tuple(paths[p][e]) for p, e in zip(order, entries)]
+    eout = [tuple(start)] + [tuple(paths[p][e]) for p, e in zip(order, exits)]
+    tour = list(range(m))
+    pos = list(range(m))
+    flipped = [False] * m
+
+    ends = np.vstack((np.array(ein), np.array(eout)))
+    near_idx = cKDTree(ends).query(ends, k=min(neighbors + 1, 2 * m))[1]
+    near = [[] for _ in range(m)]
+    for a, row in enumerate(near_idx):
+        near[a % m].extend(c % m for c in row if c % m != a % m)
+    near = [list(dict.fromkeys(row)) for row in near]
+
+    def dist(p, q):
+        return math.hypot(p[0] - q[0], p[1] - q[1])
+
+    def two_opt(i, j):
+        """
+        Replaces travels (i, i+1) and (j, j+1) with (i, j) and
+        (i+1, j+1) by reversing tour[i+1:j+1], if shorter.
+        """
+        if j - i < 1 or i < 0:
+            return False
+        a, b, c = tour[i], tour[i + 1], tour[j]
+        delta = dist(eout[a], eout[c]) - dist(eout[a], ein[b])
+        if j + 1 < m:
+            d = tour[j + 1]
+            delta += dist(ein[b], ein[d]) - dist(eout[c], ein[d])
+        if delta > -1e-9:
+            return False
+        tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+        for k in range(i + 1, j + 1):
+            node = tour[k]
+            pos[node] = k
+            ein[node], eout[node] = eout[node], ein[node]
+            flipped[node] = not flipped[node]
+        return True
+
+    def reenter(node, options_node, coords):
+        """
+        Enters a path where it is closest to the previous and the
+        next paths, if shorter.
+        """
+        k = pos[node]
+        prev = np.array(eout[tour[k - 1]])
+        vin, vout = options_node
+        cost = np.hypot(*(coords[vin] - prev).T)
+        if k + 1 < m:
+            cost = cost + np.hypot(*(coords[vout] - np.array(ein[tour[k + 1]])).T)
+        best = int(np.argmin(cost))
+        current_cost = dist(prev, ein[node])
+        if k + 1 < m:
+            current_cost += dist(eout[node], ein[tour[k + 1]])
+        if cost[best] > current_cost - 1e-9:
+            return False
+        ein[node] = tuple(coords[vin[best]])
+        eout[node] = tuple(coords[vout[best]])
+        entries[node - 1] = vin[best]
+        exits[node - 1] = vout[best]
+        flipped[node] = False
+        return True
+
+    improved = True
+    while improved:
+        improved = False
+        for count, a in enumerate(tour[1:]):
+            if count % 256 == 0 and time.time() > deadline:
+                improved = False
+                break
+
+            for c in near[a]:
+                if c == 0:
+                    continue
+                i, j = pos[a], pos[c]
+                if two_opt(min(i, j), max(i, j)) or two_opt(min(i, j) - 1, max(i, j) - 1):
+                    improved = True
+                    break
+
+        # Settle flips before entering paths elsewhere.
+        for node in range(1, m):
+            if flipped[node]:
+                entries[node - 1], exits[node - 1] = exits[node - 1], entries[node - 1]
+                flipped[node] = False
+
+        for node in tour[1:]:
+            if time.time() > deadline:
+                break
+            path = order[node - 1]
+            if reenter(node, options[path], paths[path]):
+                improved = True
+
+    tour = np.array(tour[1:], dtype=int) - 1
+    order, entries = order[tour], entries[tour]
+    if path_travel(paths, order, entries, start, returning) > base_travel:
+        return base_order, base_entries
+    return order, entries
+
+
+def path_travel(paths, order, entries, start=(0, 0), returning=None):
+    """
+    Length of the travel from ``start`` and between paths cut in
+    the given order, each one entered at the given vertex.
+
+    :param paths: List of (N, 2) arrays of vertices.
+    :param order: Indexes of paths in cutting order.
+    :param entries: Vertex where each path is entered.
+    :param start: Where the tool is before the first path.
+    :param returning: Boolean for each path, see ``path_entries()``.
+    :return: Travel length.
+    :rtype: float
+    """
+    travel = 0.0
+    current = np.asarray(start, dtype=float)
+    for index, entry in zip(order, entries):
+        coords = orient_path(np.asarray(paths[index], dtype=float).reshape(-1, 2), entry)
+        travel += math.hypot(*(coords[0] - current))
+        current = coords[0] if returning is not None and returning[index] else coords[-1]
+    return travel
+
+
+def union_tile(polygons):
+    """
+    Union of the polygons in a tile. Runs in a worker process
+    of ``parallel_union()``.
+
+    :param polygons: Polygons to join.
+    :type polygons: list
+    :return: Union of the polygons.
+    """
+    return unary_union(polygons)
+
+
+def parallel_union(polygons, processes=None, tiles_per_process=4, min_polygons=500):
+    """
+    Union of a large number of polygons using a pool of processes.
+
+    The polygons are split into a grid of tiles according to the
+    center of their bounding boxes and each tile is joined in a
+    worker process. Polygons in a tile can extend beyond it, so
+    pieces from different tiles are then looked up with an STRtree
+    and only the groups of pieces that intersect across the seams
+    are joined again.
+
+    :param polygons: Polygons to join.
+    :type polygons: list
+    :param processes: Number of worker processes. Defaults to the
+        number of CPUs.
+    :type processes: int
+    :param tiles_per_process: Number of tiles per process.
+    :type tiles_per_process: int
+    :param min_polygons: Below this number of polygons the union is
+        done in this process with ``unary_union()``.
+    :type min_polygons: int
+    :return: Union of the polygons.
+    :rtype: Polygon | MultiPolygon
+    """
+
+    polygons = [poly for poly in polygons if not poly.is_empty]
+
+    if len(polygons) < min_polygons:
+        return unary_union(polygons)
+
+    processes = processes or multiprocessing.cpu_count()
+
+    ## Split into tiles
+    bounds = np.array([poly.bounds for poly in polygons])
+    cx = (bounds[:, 0] + bounds[:, 2]) / 2
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+
+    n_tiles = processes * tiles_per_process
+    nx = int(ceil(sqrt(n_tiles)))
+    ny = int(ceil(n_tiles / float(nx)))
+
+    width = max(cx.max() - cx.min(), 1e-9)
+    height = max(cy.max() - cy.min(), 1e-9)
+    ix = np.minimum(((cx - cx.min()) * nx / width).astype(int), nx - 1)
+    iy = np.minimum(((cy - cy.min()) * ny / height).astype(int), ny - 1)
+
+    tiles = [[] for _ in range(nx * ny)]
+    for i, tile in enumerate(ix * ny + iy):
+        tiles[tile].append(polygons[i])
+    tiles = [tile for tile in tiles if len(tile) > 0]
+
+    log.debug("parallel_union(): %d polygons in %d tiles, %d processes." %
+              (len(polygons), len(tiles), processes))
+
+    ## Union of each tile
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(union_tile, tiles)
+    finally:
+        pool.close()
+        pool.join()
+
+    ## Pieces and the tile they come from
+    pieces = []
+    owners = []
+    for tile, geo in enumerate(results):
+        for piece in getattr(geo, 'geoms', [geo]):
+            if not piece.is_empty:
+                pieces.append(piece)
+                owners.append(tile)
+
+    ## Group pieces that intersect across seams
+    group = list(range(len(pieces)))
+
+    def find(i):
+        while group[i] != i:
+            group[i] = group[group[i]]
+            i = group[i]
+        return i
+
+    tree = STRtree(pieces, items=range(len(pieces)))
+    for i, piece in enumerate(pieces):
+        for j in tree.query_items(piece):
+            if j > i and owners[j] != owners[i] and piece.intersects(pieces[j]):
+                group[find(j)] = find(i)
+
+    groups = collections.defaultdict(list)
+    for i in range(len(pieces)):
+        groups[find(i)].append(pieces[i])
+
+    ## Join the groups
+    joined = []
+    for members in groups.values():
+        if len(members) == 1:
+            joined.append(members[0])
+            continue
+        geo = unary_union(members)
+        joined += list(getattr(geo, 'geoms', [geo]))
+
+    log.debug("parallel_union(): %d pieces, %d joined across seams." %
+              (len(pieces), sum(len(m) for m in groups.values() if len(m) > 1)))
+
+    if len(joined) == 1:
+        return joined[0]
+    return MultiPolygon(joined)
+
+
+def polygon_rings(polygon):
+    """
+    Coordinates of the exterior and interior rings of a
+    Polygon or MultiPolygon.
+
+    :param polygon: Polygon or MultiPolygon.
+    :return: Arrays of coordinates, closed.
+    :rtype: list
+    """
+    rings = []
+    for poly in autolist(polygon):
+        for ring in [poly.exterior] + list(poly.interiors):
+            rings.append(np.asarray(ring.coords)[:, :2])
+    return rings
+
+
+def scanline_segments(polygon, ys):
+    """
+    Intersects horizontal lines with a polygon, finding the
+    crossings of all the lines with all the edges at once.
+
+    Edges are numbered in the order of the rings from
+    ``polygon_rings()`` and of their coordinates.
+
+    :param polygon: Polygon or MultiPolygon.
+    :param ys: Heights of the lines.
+    :type ys: list
+    :return: Index in ys, left and right x, and left and right
+        edge crossed, of each segment inside the polygon, sorted
+        by index and then by x.
+    :rtype: tuple
+    """
+    ys = np.asarray(ys, dtype=float)
+    rings = polygon_rings(polygon)
+
+    if len(rings) == 0 or len(ys) == 0:
+        empty = np.zeros(0, dtype=int)
+        return empty, np.zeros(0), np.zeros(0), empty, empty
+
+    x0, y0, x1, y1 = np.vstack([np.hstack((ring[:-1], ring[1:])) for ring in rings]).T
+
+    # Each edge crosses the lines in [ymin, ymax), so a line
+    # through a vertex crosses only one of its edges and
+    # horizontal edges cross none.
+    order = np.argsort(ys)
+    ys_sorted = ys[order]
+    first = np.searchsorted(ys_sorted, np.minimum(y0, y1))
+    counts = np.searchsorted(ys_sorted, np.maximum(y0, y1)) - first
+
+    edge = np.repeat(np.arange(len(x0)), counts)
+    rank = first[edge] + np.arange(len(edge)) - np.repeat(np.cumsum(counts) - counts, counts)
+    y = ys_sorted[rank]
+    x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+
+    # Every line crosses each ring an even number of times.
+    # Consecutive crossings along a line enclose a segment.
+    rows = order[rank]
+    idx = np.lexsort((x, rows))
+    rows, x, edge = rows[idx], x[idx], edge[idx]
+
+    keep = x[1::2] > x[0::2]
+    return rows[0::2][keep], x[0::2][keep], x[1::2][keep], \
+        edge[0::2][keep], edge[1::2][keep]
+
+
+def scanline_zigzag(polygon, ys):
+    """
+    Cuts the segments from ``scanline_segments()`` back and
+    forth into zig-zag paths. From the end of a segment, a path
+    follows the edge of the polygon to a segment in the next
+    line, as long as it stays between both lines.
+
+    :param polygon: Polygon or MultiPolygon.
+    :param ys: Heights of the lines, in order.
+    :type ys: list
+    :return: Paths as arrays of coordinates.
+    :rtype: list
+    """
+    ys = np.asarray(ys, dtype=float)
+    rows, lefts, rights, left_edges, right_edges = scanline_segments(polygon, ys)
+
+    rings = polygon_rings(polygon)
+    ring_start = np.cumsum([0] + [len(ring) - 1 for ring in rings])
+
+    # Segment and side at each crossing of an edge and a line.
+    crossings = {}
+    for i in range(len(rows)):
+        crossings[(rows[i], left_edges[i])] = (i, 0)
+        crossings[(rows[i], right_edges[i])] = (i, 1)
+
+    def walk(row, edge):
+        """
+        Vertices from the given crossing of an edge and a line to
+        a crossing with the next line, and the segment and side.
+        """
+        if (row + 1, edge) in crossings:
+            return [], crossings[(row + 1, edge)]
+
+        ring_index = np.searchsorted(ring_start, edge, 'right') - 1
+        ring, start = rings[ring_index], ring_start[ring_index]
+        n = len(ring) - 1
+        low, high = sorted((ys[row], ys[row + 1]))
+
+        for step in (1, -1):
+            vertices = []
+            k = edge - start
+            for _ in range(n):
+                vertex = ring[(k + 1) % n] if step == 1 else ring[k]
+                if not low <= vertex[1] <= high:
+                    break
+                vertices.append(vertex)
+                k = (k + step) % n
+                if (row + 1, start + k) in crossings:
+                    return vertices, crossings[(row + 1, start + k)]
+
+        return None, None
+
+    paths = []
+    visited = np.zeros(len(rows), dtype=bool)
+    for head in range(len(rows)):
+        if visited[head]:
+            continue
+
+        path = []
+        current, side = head, 0
+        while True:
+            visited[current] = True
+            y = ys[rows[current]]
+            if side == 0:
+                path += [(lefts[current], y), (rights[current], y)]
+                end_edge = right_edges[current]
+            else:
+                path += [(rights[current], y), (lefts[current], y)]
+                end_edge = left_edges[current]
+
+            if rows[current] + 1 == len(ys):
+                break
+
+            vertices, found = walk(rows[current], end_edge)
+            if found is None or visited[found[0]]:
+                break
+
+            path += [tuple(vertex) for vertex in vertices]
+            current, side = found
+
+        paths.append(np.array(path))
+
+    return paths
+
+
+def paint_polygon(polygon, method, tooldia, overlap=0.15, margin=0.0,
+                  connect=True, contour=True):
+    """
+    Creates the paths that clear a polygon, shrunk by ``margin``,
+    with ``Geometry.clear_polygon2()`` for method "seed",
+    ``Geometry.clear_polygon3()`` for method "lines" and
+    ``Geometry.clear_polygon()`` otherwise.
+
+    :param polygon: Polygon to paint.
+    :param method: "standard", "seed", "lines" or "zigzag".
+    :param tooldia: Tool diameter.
+    :param overlap: Tool path overlap fraction.
+    :param margin: Distance from the edges of the polygon.
+    :param connect: Connect paths to avoid tool lifts.
+    :param contour: Paint around the edges.
+    :return: The paths, or None if there is nothing to paint, and
+        the number of joins and lifts from ``Geometry.paint_connect()``.
+    :rtype: tuple
+    """
+    polygon = polygon.buffer(-margin)
+    if polygon.is_empty:
+        return None, 0, 0
+
+    if method == "seed":
+        cp = Geometry.clear_polygon2(polygon, tooldia, overlap=overlap,
+                                     connect=connect, contour=contour)
+    elif method == "lines":
+        cp = Geometry.clear_polygon3(polygon, tooldia, overlap=overlap,
+                                     connect=connect, contour=contour)
+    elif method == "zigzag":
+        cp = Geometry.clear_polygon3(polygon, tooldia, overlap=overlap,
+                                     connect=connect, contour=contour, zigzag=True)
+    else:
+        cp = Geometry.clear_polygon(polygon, tooldia, overlap=overlap,
+                                    connect=connect, contour=contour)
+
+    if cp is None:
+        return None, 0, 0
+    return list(cp.get_objects()), getattr(cp, 'joins', 0), getattr(cp, 'lifts', 0)
+
+
+def paint_polygon_wkb(polygon_wkb, *args):
+    """
+    ``paint_polygon()`` with the polygon and the paths as WKB,
+    to run in a worker process of ``paint_polygons()``.
+    """
+    paths, joins, lifts = paint_polygon(wkb_loads(polygon_wkb), *args)
+    if paths is not None:
+        paths = [path.wkb for path in paths]
+    return paths, joins, lifts
+
+
+def paint_polygons(polygons, method, tooldia, overlap=0.15, margin=0.0,
+                   connect=True, contour=True, workers=None, progress=None):
+    """
+    Paints each polygon with ``paint_polygon()``. Polygons are sent
+    as WKB to a pool of ``workers`` processes and painted in any
+    order, but the results are in the order of ``polygons``.
+
+    :param polygons: Polygons to paint.
+    :type polygons: list
+    :param method: See ``paint_polygon()``.
+    :param tooldia: Tool diameter.
+    :param overlap: Tool path overlap fraction.
+    :param margin: Distance from the edges of the polygons.
+    :param connect: Connect paths to avoid tool lifts.
+    :param contour: Paint around the edges.
+    :param workers: Number of worker processes, 0 for one per CPU.
+        Polygons are painted in this process if 1, or if there is
+        only one polygon. Defaults to ``Geometry.defaults["paint_workers"]``.
+    :type workers: int
+    :param progress: Called with the number of polygons painted so
+        far and the total, after each one.
+    :return: The paths for each polygon (None if there is nothing to
+        paint), and the total number of joins and lifts.
+    :rtype: tuple
+    """
+    if workers is None:
+        workers = Geometry.defaults["paint_workers"]
+    workers = min(workers or multiprocessing.cpu_count(), len(polygons))
+
+    args = (method, tooldia, overlap, margin, connect, contour)
+    results = [None] * len(polygons)
+
+    if workers <= 1:
+        for i, polygon in enumerate(polygons):
+            results[i] = paint_polygon(polygon, *args)
+            if progress is not None:
+                progress(i + 1, len(polygons))
+
+    else:
+        log.debug("paint_polygons(): %d polygons, %d processes." % (len(polygons), workers))
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            futures = {}
+            for i, polygon in enumerate(polygons):
+                futures[executor.submit(paint_polygon_wkb, polygon.wkb, *args)] = i
+
+            for count, future in enumerate(concurrent.futures.as_completed(futures)):
+                paths, joins, lifts = future.result()
+                if paths is not None:
+                    paths = [wkb_loads(path) for path in paths]
+                results[futures[future]] = (paths, joins, lifts)
+                if progress is not None:
+                    progress(count + 1, len(polygons))
+
+    return [paths for paths, _, _ in results], \
+        sum(joins for _, joins, _ in results), \
+        sum(lifts for _, _, lifts in results)
+
+
 class FlatCAMRTree(object):
     """
     Indexes geometry (Any object with "cooords" property containing
@@ -37,6 +37,7 @@ setup(
         "camlib",
         "DblSidedTool",
         "FlatCAMApp",
+        "FlatCAMCache",
         "FlatCAMCommon",
         "FlatCAMDraw",
         "FlatCAMGUI",
@@ -30,6 +30,7 @@ class TclCommandCncjob(TclCommandSignaled):
         ('spindlespeed', int),
         ('multidepth', bool),
         ('depthperpass', float),
+        ('optimize', bool),
         ('outname', str)
     ])
 
@@ -48,6 +49,7 @@ class TclCommandCncjob(TclCommandSignaled):
             ('spindlespeed', 'Speed of the spindle in rpm (example: 4000).'),
             ('multidepth', 'Use or not multidepth cnccut.'),
             ('depthperpass', 'Height of one layer for multidepth.'),
+            ('optimize', 'Reorder the paths to shorten the travel (example: True). Off if not given.'),
             ('outname', 'Name of the resulting Geometry object.')
         ]),
         'examples': []
@@ -68,6 +70,10 @@ class TclCommandCncjob(TclCommandSignaled):
         if 'outname' not in args:
             args['outname'] = name + "_cnc"
 
+        # Paths are reordered only if asked for.
+        if 'optimize' not in args:
+            args['optimize'] = False
+
         obj = self.app.collection.get_by_name(name)
         if obj is None:
             self.raise_tcl_error("Object not found: %s" % name)
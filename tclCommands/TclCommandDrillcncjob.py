@@ -22,6 +22,9 @@ class TclCommandDrillcncjob(TclCommandSignaled):
         ('feedrate', float),
         ('spindlespeed', int),
         ('toolchange', bool),
+        ('optimize', bool),
+        ('canned', bool),
+        ('peckdepth', float),
         ('outname', str)
     ])
 
@@ -39,6 +42,9 @@ class TclCommandDrillcncjob(TclCommandSignaled):
             ('feedrate', 'Drilling feed rate.'),
             ('spindlespeed', 'Speed of the spindle in rpm (example: 4000).'),
             ('toolchange', 'Enable tool changes (example: True).'),
+            ('optimize', 'Reorder the drills of each tool to shorten travel (example: True).'),
+            ('canned', 'Drill with a canned cycle, G81 or G83 with -peckdepth (example: True).'),
+            ('peckdepth', 'Depth of each peck in the canned cycle, 0 for no pecking (example: 0.5).'),
             ('outname', 'Name of the resulting Geometry object.')
         ]),
         'examples': []
@@ -75,9 +81,25 @@ class TclCommandDrillcncjob(TclCommandSignaled):
 
             toolchange = True if "toolchange" in args and args["toolchange"] == 1 else False
 
+            if "optimize" in args:
+                optimize = True if args["optimize"] == 1 else False
+            else:
+                optimize = obj.options["optimize"]
+
+            if "canned" in args:
+                canned = True if args["canned"] == 1 else False
+            else:
+                canned = obj.options["canned"]
+
+            peck = args["peckdepth"] if "peckdepth" in args else obj.options["peckdepth"]
+
             tools = args["tools"] if "tools" in args else 'all'
 
-            job_obj.generate_from_excellon_by_tool(obj, tools, toolchange)
+            job_obj.generate_from_excellon_by_tool(obj, tools, toolchange, optimize=optimize,
+                                                   canned=canned, peck=peck)
+            if optimize:
+                app.inform.emit("Drill travel: %.4f in file order, %.4f optimized." %
+                                job_obj.drill_travel)
             job_obj.gcode_parse()
             job_obj.create_geometry()
 
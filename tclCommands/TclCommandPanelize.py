@@ -106,8 +106,8 @@ class TclCommandPanelize(TclCommand):
 
         def initialize_local_excellon(obj_init, app):
             obj_init.tools = obj.tools
-            # drills are offset, so they need to be deep copied
-            obj_init.drills = deepcopy(obj.drills) 
+            # drills are offset, set_drills() copies the arrays
+            obj_init.set_drills(obj.drill_x, obj.drill_y, obj.drill_tool, obj.drill_tools)
             obj_init.offset([float(currentx), float(currenty)])
             obj_init.create_geometry()
             objs.append(obj_init)
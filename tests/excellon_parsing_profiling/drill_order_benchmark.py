@@ -0,0 +1,30 @@
+# This script compares the travel between drills in file order,
+# nearest neighbour order and drill_order() for a panel of boards
+# whose drills are listed in random order.
+# Run python drill_order_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+rng = np.random.RandomState(0)
+board = rng.uniform(0, 50, (500, 2))
+points = np.vstack([board + (60 * col, 60 * row) for row in range(4) for col in range(10)])
+rng.shuffle(points)
+
+print("%d drills, file order: %.0f" % (len(points), path_length(points)))
+
+start = time.time()
+order = nearest_neighbour_order(points)
+print("Nearest neighbour: %.0f in %.2f s" % (path_length(points[order]), time.time() - start))
+
+for budget in [1.0, 5.0]:
+    start = time.time()
+    order = drill_order(points, time_budget=budget)
+    print("drill_order(), %.0f s budget: %.0f in %.2f s" %
+          (budget, path_length(points[order]), time.time() - start))
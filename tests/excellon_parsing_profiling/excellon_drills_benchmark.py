@@ -0,0 +1,41 @@
+# This script times transforming a panelized drill file with
+# 200k hits, per drill with shapely.affinity (as Excellon did
+# before the columnar drill store) and with Excellon.rotate().
+# Run python excellon_drills_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+n = 200000
+
+excellon = Excellon()
+excellon.tools = {"1": {"C": 0.8}, "2": {"C": 1.0}, "3": {"C": 3.2}}
+excellon.add_drills(np.random.uniform(0, 300, n), np.random.uniform(0, 200, n),
+                    np.random.choice(["1", "2", "3"], n))
+
+start = time.time()
+drills = excellon.drills
+print("List of %d drills: %.3f s" % (n, time.time() - start))
+
+start = time.time()
+for drill in drills:
+    drill['point'] = affinity.rotate(drill['point'], 30, origin=(150, 100))
+print("shapely.affinity, per drill: %.3f s" % (time.time() - start))
+
+start = time.time()
+excellon.affine_drills(np.cos(np.pi / 6), -np.sin(np.pi / 6), np.sin(np.pi / 6), np.cos(np.pi / 6), 0, 0)
+print("affine_drills(): %.4f s" % (time.time() - start))
+
+start = time.time()
+by_tool = excellon.drills_by_tool()
+print("drills_by_tool(): %.4f s" % (time.time() - start))
+
+start = time.time()
+excellon.create_geometry()
+print("create_geometry(): %.3f s" % (time.time() - start))
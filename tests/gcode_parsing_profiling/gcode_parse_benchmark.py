@@ -0,0 +1,63 @@
+# This script times parsing a generated G-code program of a
+# million lines: the per-word re.search tokenizer that
+# CNCjob.codes_split() used before, CNCjob.gcode_tokenize() and
+# ToolpathStore.from_columns().
+# Run python gcode_parse_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+
+def codes_split_search(gline):
+    command = {}
+
+    match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
+    while match:
+        command[match.group(1)] = float(match.group(2).replace(" ", ""))
+        gline = gline[match.end():]
+        match = re.search(r'^\s*([A-Z])\s*([\+\-\.\d\s]+)', gline)
+
+    return command
+
+
+# Paths of 46 cuts with a plunge and a lift: 50 lines each.
+lines = ["G20\n", "G90\n", "G94\n", "F3.00\n", "G00 Z0.1000\n", "M03\n"]
+rng = np.random.RandomState(0)
+while len(lines) < 1000000:
+    x, y = rng.uniform(0, 10, 2)
+    lines.append("G00 X%.4fY%.4f\n" % (x, y))
+    lines.append("G01 Z-0.0020\n")
+    for i in range(46):
+        x += 0.01
+        y += rng.uniform(-0.01, 0.01)
+        lines.append("G01 X%.4fY%.4f\n" % (x, y))
+    lines.append("G00 Z0.1000\n")
+lines.append("M05\n")
+print("%d lines" % len(lines))
+
+start = time.time()
+for line in lines:
+    codes_split_search(line)
+print("re.search per word: %.2f s" % (time.time() - start))
+
+start = time.time()
+for line in lines:
+    CNCjob.codes_split(line)
+print("codes_split(): %.2f s" % (time.time() - start))
+
+job = CNCjob()
+job.gcode = ''.join(lines)
+
+start = time.time()
+columns = job.gcode_tokenize()
+print("gcode_tokenize(): %.2f s, %d points" % (time.time() - start, len(columns['x'])))
+
+start = time.time()
+toolpaths = ToolpathStore.from_columns(columns)
+print("ToolpathStore.from_columns(): %.2f s, %d paths" % (time.time() - start, len(toolpaths)))
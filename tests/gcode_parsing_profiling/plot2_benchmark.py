@@ -0,0 +1,47 @@
+# This script times plotting a job of 20k short paths with
+# CNCjob.plot2(), with a patch for each path and with
+# fast=True (two LineCollections), including a draw.
+# Run python plot2_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+
+# 10k cuts of 5 points, each with its travel.
+rng = np.random.RandomState(0)
+lines = ["G20\n", "G90\n", "G00 Z0.1000\n"]
+for i in range(10000):
+    x, y = rng.uniform(0, 10, 2)
+    lines.append("G00 X%.4fY%.4f\n" % (x, y))
+    lines.append("G01 Z-0.0020\n")
+    for j in range(4):
+        x += 0.02
+        y += rng.uniform(-0.02, 0.02)
+        lines.append("G01 X%.4fY%.4f\n" % (x, y))
+    lines.append("G00 Z0.1000\n")
+
+job = CNCjob()
+job.gcode = ''.join(lines)
+job.gcode_parse()
+print("%d paths" % len(job.toolpaths))
+
+for fast in [False, True]:
+    figure = Figure(dpi=100, figsize=(8, 8))
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_axes([0, 0, 1, 1])
+    axes.set_xlim(0, 10)
+    axes.set_ylim(0, 10)
+
+    start = time.time()
+    job.plot2(axes, tooldia=0.016, fast=fast)
+    canvas.draw()
+    print("fast=%s: %.2f s, %d artists" %
+          (fast, time.time() - start,
+           len(axes.patches) + len(axes.collections) + len(axes.texts)))
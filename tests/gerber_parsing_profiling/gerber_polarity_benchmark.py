@@ -0,0 +1,51 @@
+# This script compares applying Gerber polarity layers (%LPD/%LPC)
+# one by one to the whole geometry against Gerber.evaluate_layers(),
+# for growing numbers of layers. The layers mimic a ground plane
+# with many clear cutouts, each followed by a dark pad inside it.
+# Time should grow about linearly with the number of cutouts.
+# Run python gerber_polarity_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+
+def make_layers(n):
+    side = int(ceil(sqrt(n)))
+    layers = [('D', shply_box(0, 0, 3 * side + 1, 3 * side + 1))]
+    for i in range(n):
+        x = 2 + (i % side) * 3
+        y = 2 + (i // side) * 3
+        layers.append(('C', Point(x, y).buffer(1.2)))
+        layers.append(('D', Point(x, y).buffer(0.8)))
+    return layers
+
+
+def sequential(layers):
+    geometry = Polygon()
+    for polarity, geo in layers:
+        if polarity == 'D':
+            geometry = geometry.union(geo)
+        else:
+            geometry = geometry.difference(geo)
+    return geometry
+
+
+for n in [250, 500, 1000, 2000, 4000]:
+    layers = make_layers(n)
+
+    start = time.time()
+    result2 = Gerber.evaluate_layers(layers)
+    print("evaluate_layers(), %d cutouts: %.2f s" % (n, time.time() - start))
+
+    # Quadratic, only for the smaller stacks.
+    if n <= 500:
+        start = time.time()
+        result1 = sequential(layers)
+        print("Sequential, %d cutouts: %.2f s" % (n, time.time() - start))
+        print("Difference in area: %g" % result1.symmetric_difference(result2).area)
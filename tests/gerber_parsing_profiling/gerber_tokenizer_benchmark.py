@@ -0,0 +1,40 @@
+# This script compares the dispatching tokenizer in Gerber.tokenize()
+# against the regex-only path in Gerber.tokenize_regex(), alone and
+# as part of a complete Gerber.parse_file().
+# Run python gerber_tokenizer_benchmark.py
+
+import sys
+import timeit
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+filename = "gerber1.gbr"
+repeat = 20
+
+# Statements, split just like Gerber.parse_file() does.
+statements = []
+with open(filename, 'r') as gfile:
+    for line in gfile:
+        line = line.strip(' \r\n')
+        if len(line) > 0 and line[-1] == '%':
+            statements.append(line)
+            continue
+        statements += [s + '*' for s in line.split('*') if len(s) > 0]
+
+g = Gerber()
+
+for fcn in [g.tokenize_regex, g.tokenize]:
+    t = timeit.timeit(lambda: [fcn(s) for s in statements], number=repeat) / repeat
+    print("%-16s %d statements: %.2f ms" % (fcn.__name__, len(statements), t * 1000))
+
+for fast in [False, True]:
+    def parse():
+        gp = Gerber()
+        gp.use_fast_tokenizer = fast
+        gp.parse_file(filename)
+    t = timeit.timeit(parse, number=3) / 3
+    print("parse_file (use_fast_tokenizer=%s): %.2f ms" % (fast, t * 1000))
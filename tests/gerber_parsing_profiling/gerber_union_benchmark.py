@@ -0,0 +1,42 @@
+# This script compares the strategies available to join the
+# polygons buffered by Gerber.parse_lines(): buffer(), cascaded_union()
+# and the tile partitioned parallel_union().
+# Run python gerber_union_benchmark.py
+
+import sys
+import glob
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.ERROR)
+
+strategies = [
+    ("buffer", {"use_buffer_for_union": True, "use_parallel_union": False}),
+    ("cascaded_union", {"use_buffer_for_union": False, "use_parallel_union": False}),
+    ("parallel_union", {"use_buffer_for_union": False, "use_parallel_union": True})
+]
+
+filenames = sorted(glob.glob("../gerber_files/*.gbr") + glob.glob("../gerber_files/*.cmp"))
+
+print("%d CPUs" % multiprocessing.cpu_count())
+for filename in filenames:
+    results = []
+    for name, options in strategies:
+        g = Gerber()
+        for key in options:
+            setattr(g, key, options[key])
+        start = time.time()
+        g.parse_file(filename)
+        results.append("%s: %.3f s" % (name, time.time() - start))
+    print("%-40s %s" % (filename, ", ".join(results)))
+
+# Join only, many polygons.
+polygons = [Point(x * 0.1, y * 0.1).buffer(0.04) for x in range(100) for y in range(100)]
+for name, fcn in [("cascaded_union", lambda: cascaded_union(polygons)),
+                  ("parallel_union", lambda: parallel_union(polygons))]:
+    start = time.time()
+    fcn()
+    print("%d pads, %s: %.3f s" % (len(polygons), name, time.time() - start))
@@ -0,0 +1,34 @@
+# This script times 4 isolation passes on the test Gerber files,
+# buffering the copper at each offset and chaining each pass
+# from the previous one with Geometry.isolation_passes().
+# Run python isolation_passes_benchmark.py
+
+import sys
+import glob
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.ERROR)
+
+filenames = sorted(glob.glob("../gerber_files/*.gbr") + glob.glob("../gerber_files/*.cmp"))
+
+for filename in filenames:
+    g = Gerber()
+    g.parse_file(filename)
+    dia = g.in_units(0.008)
+    offsets = [(2 * i + 1) / 2.0 * dia - i * 0.15 * dia for i in range(4)]
+
+    start = time.time()
+    full = [g.isolation_geometry(offset) for offset in offsets]
+    full_time = time.time() - start
+
+    start = time.time()
+    chained = g.isolation_passes(offsets, tolerance=g.in_units(g.arc_tolerance))
+    chained_time = time.time() - start
+
+    difference = max(a.symmetric_difference(b).area / a.area for a, b in zip(full, chained))
+    print("%-40s full: %.3f s, chained: %.3f s, area difference: %.2e" %
+          (filename, full_time, chained_time, difference))
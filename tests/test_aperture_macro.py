@@ -0,0 +1,89 @@
+import unittest
+import camlib
+
+
+class ApertureMacroTest(unittest.TestCase):
+
+    # Name, macro content and modifiers to try.
+    macros = [
+        ("RECT", "21,1,$1,$2,0,0,$3*", [[0.5, 0.2, 0], [0.5, 0.2, 45], ['1.2', '0.8']]),
+        ("ROUNDRECT",
+         "0 Rounded rectangle*"
+         "$4=$1-2x$3*"
+         "$5=$2-2x$3*"
+         "21,1,$4,$2,0,0,0*"
+         "21,1,$1,$5,0,0,0*"
+         "1,1,2x$3,$4/2,$5/2*"
+         "1,1,2x$3,-$4/2,$5/2*"
+         "1,1,2x$3,-$4/2,-$5/2*"
+         "1,1,2x$3,$4/2,-$5/2*",
+         [[1.0, 0.6, 0.1], [2.0, 1.0, -0.25]]),
+        ("DONUT", "1,1,$1,0,0*1,0,$2,0,0*21,1,0.1,$1,0,0,0*", [[1.0, 0.5], [0.8, 0.2]]),
+        ("THERMAL", "7,0,0,$1,$2,$3,0*", [[0.08, 0.05, 0.01]]),
+        ("OUTLINE", "4,1,3,0,0,1,0,1,1,0,0,$1*", [[0], [30]])
+    ]
+
+    @staticmethod
+    def reference_geometry(macro, modifiers):
+        """
+        Geometry made with the regex based parse_content() and
+        a union/difference per primitive.
+        """
+        makers = {"1": camlib.ApertureMacro.make_circle,
+                  "21": camlib.ApertureMacro.make_centerline,
+                  "4": camlib.ApertureMacro.make_outline,
+                  "7": camlib.ApertureMacro.make_thermal}
+
+        macro.locvars = {}
+        for i, m in enumerate(modifiers):
+            macro.locvars[str(i + 1)] = float(m)
+        macro.parse_content()
+
+        geo = camlib.Polygon()
+        for primitive in macro.primitives:
+            prim_geo = makers[str(int(primitive[0]))](primitive[1:])
+            if prim_geo['pol'] == 1:
+                geo = geo.union(prim_geo['geometry'])
+            else:
+                geo = geo.difference(prim_geo['geometry'])
+
+        return macro.primitives, geo
+
+    def test_macros(self):
+        for name, content, modifiers_list in self.macros:
+            macro = camlib.ApertureMacro(name)
+            macro.append(content)
+
+            for modifiers in modifiers_list:
+                geo = macro.make_geometry(modifiers)
+                prims = macro.primitives
+
+                ref_macro = camlib.ApertureMacro(name)
+                ref_macro.append(content)
+                ref_prims, ref_geo = self.reference_geometry(ref_macro, modifiers)
+
+                self.assertEqual(prims, ref_prims, name)
+                self.assertAlmostEqual(geo.symmetric_difference(ref_geo).area, 0.0, places=9, msg=name)
+
+    def test_multiply_after_variable(self):
+        macro = camlib.ApertureMacro("CIRCLE")
+        macro.append("$2=$1x2*1,1,$2,0,0*")
+        self.assertEqual(macro.evaluate([0.25]), [[1, 1, 0.5, 0, 0]])
+
+    def test_memoized(self):
+        macro = camlib.ApertureMacro("RECT")
+        macro.append("21,1,$1,$2,0,0,$3*")
+
+        geo1 = macro.make_geometry(['0.5', '0.2', '0'])
+        geo2 = macro.make_geometry([0.5, 0.2, 0.0])
+        self.assertIs(geo1, geo2)
+        self.assertEqual(len(macro.geometry_cache), 1)
+
+        # Changing the macro drops compiled program and cache.
+        macro.append("1,1,0.1,1,1*")
+        self.assertIsNone(macro.program)
+        self.assertEqual(len(macro.geometry_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
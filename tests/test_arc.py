@@ -0,0 +1,45 @@
+import unittest
+from math import pi, sqrt, cos, sin
+
+import camlib
+
+
+class ArcTest(unittest.TestCase):
+
+    def test_steps_per_circ(self):
+        points = camlib.arc([1.0, 2.0], 0.5, 0, pi / 2, "ccw", 40)
+
+        self.assertEqual(len(points), 11)
+        for i, (x, y) in enumerate(points):
+            theta = pi / 2 / 10 * i
+            self.assertAlmostEqual(x, 1.0 + 0.5 * cos(theta))
+            self.assertAlmostEqual(y, 2.0 + 0.5 * sin(theta))
+
+    def test_cw(self):
+        points = camlib.arc([0, 0], 1.0, pi / 2, 0, "cw", 40)
+        self.assertAlmostEqual(points[0][1], 1.0)
+        self.assertAlmostEqual(points[-1][0], 1.0)
+        self.assertTrue(all(x >= -1e-12 and y >= -1e-12 for x, y in points))
+
+    def test_tolerance(self):
+        tolerance = 0.001
+
+        for radius in [0.05, 1.0, 50.0]:
+            points = camlib.arc([0, 0], radius, 0, 2 * pi, "ccw", 40, tolerance)
+
+            # Chord midpoints are the furthest from the arc.
+            for (x1, y1), (x2, y2) in zip(points[:-1], points[1:]):
+                mid = sqrt(((x1 + x2) / 2) ** 2 + ((y1 + y2) / 2) ** 2)
+                self.assertLessEqual(radius - mid, tolerance * (1 + 1e-9))
+
+        # Small arcs get fewer segments, large arcs more.
+        self.assertLess(len(camlib.arc([0, 0], 0.05, 0, pi, "ccw", 40, tolerance)), 21)
+        self.assertGreater(len(camlib.arc([0, 0], 50.0, 0, pi, "ccw", 40, tolerance)), 21)
+
+    def test_tolerance_larger_than_radius(self):
+        points = camlib.arc([0, 0], 0.001, 0, 2 * pi, "ccw", 40, 0.01)
+        self.assertEqual(len(points), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+
+import numpy as np
+import camlib
+from shapely.geometry import LineString, Point, box
+
+
+class ArcFitTest(unittest.TestCase):
+
+    def quarter(self, n=17, radius=2.0):
+        theta = np.linspace(0, np.pi / 2, n)
+        return np.column_stack((1 + radius * np.cos(theta), 1 + radius * np.sin(theta)))
+
+    def test_circle_through(self):
+        x, y = camlib.circle_through((3, 1), (1, 3), (-1, 1))
+        self.assertAlmostEqual(x, 1)
+        self.assertAlmostEqual(y, 1)
+        self.assertIsNone(camlib.circle_through((0, 0), (1, 1), (2, 2)))
+
+    def test_quarter(self):
+        arcs = camlib.fit_arcs(self.quarter(), 0.003)
+        self.assertEqual(len(arcs), 1)
+        first, last, center, clockwise = arcs[0]
+        self.assertEqual((first, last), (0, 16))
+        self.assertTrue(np.allclose(center, (1, 1)))
+        self.assertFalse(clockwise)
+
+        first, last, center, clockwise = camlib.fit_arcs(self.quarter()[::-1], 0.003)[0]
+        self.assertTrue(clockwise)
+
+    def test_not_arcs(self):
+        line = np.column_stack((np.linspace(0, 1, 10), np.zeros(10)))
+        self.assertEqual(camlib.fit_arcs(line, 0.001), [])
+
+        zigzag = np.column_stack((np.arange(10), np.arange(10) % 2))
+        self.assertEqual(camlib.fit_arcs(zigzag, 0.001), [])
+
+        # Too coarse for the tolerance.
+        self.assertEqual(camlib.fit_arcs(self.quarter(n=4), 0.001), [])
+
+    def test_dense(self):
+        # Runs of a few points on a fine circle are flat, but
+        # longer runs are not.
+        theta = np.linspace(0, np.pi, 513)
+        points = np.column_stack((0.1 * np.cos(theta), 0.1 * np.sin(theta)))
+        arcs = camlib.fit_arcs(points, 0.001)
+        self.assertEqual([(first, last) for first, last, c, cw in arcs], [(0, 512)])
+
+    def test_chords(self):
+        # Points off the circle and the chords between them
+        # must add up to within the tolerance.
+        rng = np.random.RandomState(0)
+        for trial in range(300):
+            n = rng.randint(5, 40)
+            tolerance = 10 ** rng.uniform(-4, -2)
+            theta = np.linspace(0, rng.uniform(0.3, 3), n)
+            radius = rng.uniform(0.1, 3) + rng.uniform(-1.5, 1.5, n) * tolerance
+            points = np.column_stack((radius * np.cos(theta), radius * np.sin(theta)))
+
+            for first, last, center, clockwise in camlib.fit_arcs(points, tolerance):
+                arc_radius = np.hypot(*(points[first] - center))
+                t = np.linspace(0, 1, 101)[:, None]
+                along = np.vstack([a + t * (b - a) for a, b in
+                                   zip(points[first:last], points[first + 1:last + 1])])
+                error = np.abs(np.hypot(*(along - center).T) - arc_radius).max()
+                self.assertLessEqual(error, tolerance * (1 + 1e-9))
+
+    def test_line_then_arc(self):
+        points = np.vstack(([[3, -2], [3, -1]], self.quarter()))
+        arcs = camlib.fit_arcs(points, 0.003)
+        self.assertEqual([(first, last) for first, last, c, cw in arcs], [(2, 18)])
+
+    def cut_paths(self, job):
+        job.gcode_parse()
+        return [path['geom'] for path in job.gcode_parsed if path['kind'][0] == 'C']
+
+    def test_round_trip(self):
+        geometry = camlib.Geometry()
+        geometry.solid_geometry = [box(0, 0, 2, 1).buffer(0.2).exterior,
+                                   Point(5, 5).buffer(0.5).exterior]
+
+        job = camlib.CNCjob()
+        job.generate_from_geometry_2(geometry)
+
+        job_arcs = camlib.CNCjob()
+        job_arcs.arc_tolerance = 0.0001
+        default = camlib.CNCjob.defaults["arc_fit_tolerance"]
+        camlib.CNCjob.defaults["arc_fit_tolerance"] = 0.001
+        try:
+            job_arcs.generate_from_geometry_2(geometry)
+        finally:
+            camlib.CNCjob.defaults["arc_fit_tolerance"] = default
+
+        self.assertIn("G02 ", job_arcs.gcode + "G03 ")
+        self.assertEqual(job.arc_fit_lines, [0, 0])
+        moves, lines = job_arcs.arc_fit_lines
+        self.assertEqual(moves, job.gcode.count("G01 X"))
+        self.assertLess(lines * 4, moves)
+        self.assertLess(len(job_arcs.gcode.splitlines()), len(job.gcode.splitlines()))
+
+        cuts = self.cut_paths(job)
+        cuts_arcs = self.cut_paths(job_arcs)
+        self.assertEqual(len(cuts), len(cuts_arcs))
+        for path, path_arcs in zip(cuts, cuts_arcs):
+            self.assertLessEqual(path.hausdorff_distance(path_arcs), 0.001)
+
+    def test_linear2gcode_off(self):
+        job = camlib.CNCjob()
+        path = LineString(self.quarter())
+        self.assertEqual(job.linear2gcode(path, arc_fit=0).count("G01 X"), 16)
+
+        gcode = job.linear2gcode(path, arc_fit=0.003)
+        self.assertEqual(gcode.count("G01 X"), 0)
+        self.assertIn("G03 X1.0000Y3.0000I-2.0000J", gcode)
+        self.assertEqual(job.arc_fit_lines, [16, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import camlib
+
+
+class DrillCycleTest(unittest.TestCase):
+
+    excellon_file = "tests/excellon_files/case1.drl"
+
+    def setUp(self):
+        self.excellon = camlib.Excellon()
+        self.excellon.parse_file(self.excellon_file)
+        self.n_drills = len(self.excellon.drill_x)
+
+    def job(self, **kwargs):
+        job = camlib.CNCjob(z_cut=-0.07, z_move=0.1)
+        job.generate_from_excellon_by_tool(self.excellon, "all", **kwargs)
+        return job
+
+    def test_g81(self):
+        job = self.job(canned=True)
+        gcode = job.gcode
+        n_tools = len(self.excellon.drills_by_tool())
+
+        self.assertEqual(gcode.count("G81 X"), n_tools)
+        self.assertEqual(gcode.count("G80\n"), n_tools)
+        self.assertIn(" Z-0.0700 R0.1000\n", gcode)
+        self.assertNotIn("G83", gcode)
+
+        lines = gcode.splitlines()
+        holes = [line for line in lines if line.startswith("X") or line.startswith("G81")]
+        self.assertEqual(len(holes), self.n_drills)
+        self.assertLess(len(lines), len(self.job().gcode.splitlines()) / 3)
+
+    def test_g83(self):
+        gcode = self.job(canned=True, peck=0.02).gcode
+        self.assertIn(" Z-0.0700 R0.1000 Q0.0200\n", gcode)
+        self.assertNotIn("G81", gcode)
+
+    def test_parse(self):
+        job = self.job()
+        job.gcode_parse()
+        job_canned = self.job(canned=True)
+        job_canned.gcode_parse()
+
+        # Both have a rapid move to each hole, up at travel height.
+        def points(job):
+            return [pt for p in job.gcode_parsed for pt in p['geom'].coords if p['geom'].length > 0]
+
+        self.assertEqual(set(points(job_canned)), set(points(job)))
+        for path in job_canned.gcode_parsed:
+            self.assertEqual(path['kind'], ['T', 'F'])
+        self.assertEqual(job_canned.bounds(), job.bounds())
+
+
+if __name__ == '__main__':
+    unittest.main()
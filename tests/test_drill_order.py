@@ -0,0 +1,60 @@
+import unittest
+import itertools
+import numpy as np
+import camlib
+
+
+class DrillOrderTest(unittest.TestCase):
+
+    excellon_file = "tests/excellon_files/case1.drl"
+
+    def test_permutation(self):
+        for n in [0, 1, 2, 3, 10, 200]:
+            points = np.random.RandomState(n).uniform(0, 10, (n, 2))
+            order = camlib.drill_order(points)
+            self.assertEqual(sorted(order.tolist()), list(range(n)))
+
+    def test_shorter(self):
+        points = np.random.RandomState(0).uniform(0, 10, (500, 2))
+        nn = camlib.nearest_neighbour_order(points, (5, 5))
+        order = camlib.drill_order(points, (5, 5))
+
+        file_length = camlib.path_length(points, (5, 5))
+        nn_length = camlib.path_length(points[nn], (5, 5))
+        length = camlib.path_length(points[order], (5, 5))
+        self.assertLess(nn_length, file_length)
+        self.assertLessEqual(length, nn_length)
+
+    def test_small_optimal(self):
+        # Few points on a line, shuffled. The best path
+        # from the start goes along the line.
+        points = np.array([[3, 0], [1, 0], [5, 0], [2, 0], [4, 0], [0, 0]], dtype=float)
+        order = camlib.drill_order(points, (-1, 0))
+        self.assertEqual(points[order][:, 0].tolist(), [0, 1, 2, 3, 4, 5])
+
+    def test_not_worse_than_brute_force_by_much(self):
+        points = np.random.RandomState(1).uniform(0, 10, (7, 2))
+        best = min(camlib.path_length(points[list(p)]) for p in itertools.permutations(range(7)))
+        length = camlib.path_length(points[camlib.drill_order(points)])
+        self.assertLess(length, best * 1.1)
+
+    def test_cncjob(self):
+        excellon = camlib.Excellon()
+        excellon.parse_file(self.excellon_file)
+
+        def drill_moves(gcode):
+            return sorted(line for line in gcode.splitlines() if line.startswith("G00 X"))
+
+        job_file = camlib.CNCjob()
+        job_file.generate_from_excellon_by_tool(excellon, "all")
+        job = camlib.CNCjob()
+        job.generate_from_excellon_by_tool(excellon, "all", optimize=True)
+
+        self.assertEqual(drill_moves(job.gcode), drill_moves(job_file.gcode))
+        self.assertEqual(job_file.drill_travel[0], job_file.drill_travel[1])
+        self.assertAlmostEqual(job.drill_travel[0], job_file.drill_travel[0])
+        self.assertLess(job.drill_travel[1], job.drill_travel[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
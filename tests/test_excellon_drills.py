@@ -0,0 +1,96 @@
+import unittest
+import camlib
+from shapely import affinity
+from shapely.geometry import Point
+
+
+class ExcellonDrillStoreTest(unittest.TestCase):
+
+    excellon_file = "tests/excellon_files/case1.drl"
+
+    def setUp(self):
+        self.excellon = camlib.Excellon()
+        self.excellon.parse_file(self.excellon_file)
+        self.points = [(drill['point'], drill['tool']) for drill in self.excellon.drills]
+
+    def assertDrills(self, expected):
+        drills = self.excellon.drills
+        self.assertEqual(len(drills), len(expected))
+        for drill, (point, tool) in zip(drills, expected):
+            self.assertEqual(drill['tool'], tool)
+            self.assertAlmostEqual(drill['point'].x, point.x, places=9)
+            self.assertAlmostEqual(drill['point'].y, point.y, places=9)
+
+    def test_parsed(self):
+        self.assertGreater(len(self.points), 0)
+        self.assertEqual(len(self.excellon.drill_x), len(self.points))
+        for tool in self.excellon.drill_tools:
+            self.assertIn(tool, self.excellon.tools)
+
+    def test_scale(self):
+        self.excellon.scale(2.5)
+        self.assertDrills([(affinity.scale(p, 2.5, 2.5, origin=(0, 0)), t) for p, t in self.points])
+
+    def test_offset(self):
+        self.excellon.offset((1.5, -0.25))
+        self.assertDrills([(affinity.translate(p, 1.5, -0.25), t) for p, t in self.points])
+
+    def test_mirror(self):
+        self.excellon.mirror("X", (0.5, 1.0))
+        self.assertDrills([(affinity.scale(p, 1.0, -1.0, origin=(0.5, 1.0)), t) for p, t in self.points])
+
+    def test_skew(self):
+        self.excellon.skew(10, -20, (0.5, 1.0))
+        self.assertDrills([(affinity.skew(p, 10, -20, origin=(0.5, 1.0)), t) for p, t in self.points])
+
+    def test_rotate(self):
+        self.excellon.rotate(30, (0.5, 1.0))
+        self.assertDrills([(affinity.rotate(p, 30, origin=(0.5, 1.0)), t) for p, t in self.points])
+
+    def test_geometry(self):
+        self.excellon.create_geometry()
+        self.assertEqual(len(self.excellon.solid_geometry), len(self.points))
+        for poly, (point, tool) in zip(self.excellon.solid_geometry, self.points):
+            buffered = point.buffer(self.excellon.tools[tool]['C'] / 2.0)
+            self.assertAlmostEqual(poly.symmetric_difference(buffered).area, 0.0, places=9)
+
+    def test_zero_diameter(self):
+        excellon = camlib.Excellon()
+        excellon.parse_lines(["M48", "INCH", "T1C0.0", "T2C0.1", "%",
+                              "T1", "X010000Y010000", "T2", "X020000Y010000", "M30"])
+        excellon.create_geometry()
+        self.assertEqual(len(excellon.solid_geometry), 2)
+        self.assertTrue(excellon.solid_geometry[0].is_empty)
+        self.assertAlmostEqual(excellon.solid_geometry[1].area, Point(0, 0).buffer(0.05).area, places=9)
+
+    def test_assign_list(self):
+        excellon = camlib.Excellon()
+        excellon.tools = {"1": {"C": 0.1}, "2": {"C": 0.2}}
+        excellon.drills = [{"point": Point(1, 2), "tool": "2"},
+                           {"point": Point(3, 4), "tool": "1"},
+                           {"point": Point(5, 6), "tool": "2"}]
+
+        self.assertEqual(excellon.drill_x.tolist(), [1, 3, 5])
+        self.assertEqual([d['tool'] for d in excellon.drills], ["2", "1", "2"])
+
+        excellon.add_drills([7], [8], ["3"])
+        self.assertEqual([d['tool'] for d in excellon.drills], ["2", "1", "2", "3"])
+
+    def test_by_tool(self):
+        by_tool = self.excellon.drills_by_tool()
+        self.assertEqual(sum(len(xy) for xy in by_tool.values()), len(self.points))
+
+        for tool, xy in by_tool.items():
+            expected = [[p.x, p.y] for p, t in self.points if t == tool]
+            self.assertEqual(xy.tolist(), expected)
+
+    def test_serialization(self):
+        d = self.excellon.to_dict()
+        excellon = camlib.Excellon()
+        excellon.from_dict(d)
+        self.assertEqual(excellon.drill_x.tolist(), self.excellon.drill_x.tolist())
+        self.assertEqual([d['tool'] for d in excellon.drills], [t for p, t in self.points])
+
+
+if __name__ == '__main__':
+    unittest.main()
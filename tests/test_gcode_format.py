@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import camlib
+from shapely.geometry import LineString, Point
+
+
+class FormatLinesTest(unittest.TestCase):
+
+    templates = ["G01 X%.4fY%.4f\n", "G01 X%.2f Y%.6f\n", "X%.0fY%.3f", "G01 X%fY%.4f\n"]
+
+    def assertFormatted(self, coords):
+        for template in self.templates:
+            expected = ''.join(template % tuple(row) for row in coords.tolist())
+            self.assertEqual(camlib.format_lines(coords, template, min_fixed=1), expected)
+            self.assertEqual(camlib.format_lines(coords, template), expected)
+
+    def test_random(self):
+        rng = np.random.RandomState(0)
+        self.assertFormatted(rng.uniform(-500, 500, (2000, 2)))
+        self.assertFormatted(rng.uniform(-1e-4, 1e-4, (100, 2)))
+
+    def test_ties(self):
+        # Halfway between two results, and as parsed from files.
+        rng = np.random.RandomState(1)
+        self.assertFormatted(rng.randint(-10 ** 6, 10 ** 6, (1000, 2)) / 2e4)
+        self.assertFormatted(np.round(rng.uniform(-10, 10, (1000, 2)), 5))
+
+    def test_signs(self):
+        self.assertFormatted(np.array([[0.0, -0.0], [-0.00001, 0.00001], [-1.0, 10.0]]))
+        self.assertEqual(camlib.format_lines([[-0.0, -0.00001]], "X%.4fY%.4f", min_fixed=1),
+                         "X-0.0000Y-0.0000")
+
+    def test_empty(self):
+        self.assertEqual(camlib.format_lines(np.zeros((0, 2)), "X%.4fY%.4f\n"), "")
+
+
+class Linear2GCodeCacheTest(unittest.TestCase):
+
+    def test_cache(self):
+        ring = Point(1, 1).buffer(0.5, 64).exterior
+        job = camlib.CNCjob()
+        cache = {}
+        first = job.linear2gcode(ring, zcut=-0.001, up=False, cache=cache)
+        second = job.linear2gcode(ring, zcut=-0.002, up=False, cache=cache)
+        self.assertEqual(first.replace("Z-0.0010", "Z-0.0020"), second)
+        self.assertEqual(second, job.linear2gcode(ring, zcut=-0.002, up=False))
+
+    def test_multidepth(self):
+        geometry = camlib.Geometry()
+        geometry.solid_geometry = [LineString([(0, 0), (1, 0), (1, 1)]),
+                                   Point(2, 2).buffer(0.5).exterior]
+        job = camlib.CNCjob(z_cut=-0.005)
+        job.generate_from_geometry_2(geometry, multidepth=True, depthpercut=0.001)
+
+        # Five passes, back and forth along the line.
+        lines = job.gcode.splitlines()
+        self.assertEqual(len([l for l in lines if l.startswith("G01 Z")]), 10)
+        cuts = [l for l in lines if l.startswith("G01 X")]
+        self.assertEqual(cuts[:6], ["G01 X1.0000Y0.0000", "G01 X1.0000Y1.0000",
+                                    "G01 X1.0000Y0.0000", "G01 X0.0000Y0.0000",
+                                    "G01 X1.0000Y0.0000", "G01 X1.0000Y1.0000"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+import camlib
+
+
+class GCodeParseTest(unittest.TestCase):
+
+    gcode = "G20\n" \
+            "G90\n" \
+            "(MSG, Change to tool dia=0.0350)\n" \
+            "G00 Z0.1\n" \
+            "G00 X1 Y1\n" \
+            "G01 Z-0.1\n" \
+            "G01 X2 Y1 F10\n" \
+            "G02 X3 Y2 I0 J1\n" \
+            "G1 X 1.5 Y 2.5\n" \
+            "G00 Z0.1\n" \
+            "G00 X0Y0\n" \
+            "M05\n"
+
+    def test_codes_split(self):
+        self.assertEqual(camlib.CNCjob.codes_split("G01 X1234 Y987"),
+                         {'G': 1.0, 'X': 1234.0, 'Y': 987.0})
+        self.assertEqual(camlib.CNCjob.codes_split("G00X-1.5Y+2.25\n"),
+                         {'G': 0.0, 'X': -1.5, 'Y': 2.25})
+        self.assertEqual(camlib.CNCjob.codes_split("X 1 2.5 Y3"), {'X': 12.5, 'Y': 3.0})
+        self.assertEqual(camlib.CNCjob.codes_split("M03 S1000 (spindle on) X5"),
+                         {'M': 3.0, 'S': 1000.0})
+        self.assertEqual(camlib.CNCjob.codes_split("(MSG, Change to tool dia=0.0350)"), {})
+        self.assertEqual(camlib.CNCjob.codes_split(""), {})
+
+    def test_columns(self):
+        job = camlib.CNCjob(units="mm")
+        job.gcode = self.gcode
+        columns = job.gcode_tokenize()
+
+        self.assertEqual(job.units, "IN")
+        n = len(columns['x'])
+        for key in ['y', 'z', 'g', 'f', 'path']:
+            self.assertEqual(len(columns[key]), n)
+
+        self.assertEqual((columns['x'][0], columns['y'][0], columns['z'][0]), (1, 1, 0.1))
+        self.assertTrue(np.isnan(columns['f'][0]))
+        self.assertEqual((columns['x'][-1], columns['y'][-1], columns['g'][-1]), (0, 0, 0))
+
+        # The arc goes from (2, 1) to (3, 2) around (2, 2).
+        arc = columns['g'] == 2
+        self.assertGreater(arc.sum(), 2)
+        self.assertTrue(np.allclose(np.hypot(columns['x'][arc] - 2, columns['y'][arc] - 2), 1))
+        self.assertTrue(np.all(columns['f'][arc] == 10))
+
+    def test_paths(self):
+        job = camlib.CNCjob()
+        job.gcode = self.gcode
+        job.gcode_parse()
+        paths = job.gcode_parsed
+
+        self.assertEqual([path['kind'] for path in paths],
+                         [['T', 'F'], ['C', 'S'], ['T', 'F']])
+
+        # Paths are continuous.
+        self.assertEqual(paths[0]['geom'].coords[0], (0, 0))
+        for path1, path2 in zip(paths[:-1], paths[1:]):
+            self.assertEqual(path1['geom'].coords[-1], path2['geom'].coords[0])
+        self.assertEqual(paths[1]['geom'].coords[-1], (1.5, 2.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
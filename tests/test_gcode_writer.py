@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import camlib
+from shapely.geometry import LineString, Point
+
+
+class GCodeWriterTest(unittest.TestCase):
+
+    excellon_file = "tests/excellon_files/case1.drl"
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+        self.geometry = camlib.Geometry()
+        self.geometry.solid_geometry = [LineString([(0, 0), (1, 0), (1, 1)]),
+                                        LineString([(2, 2), (3, 3)]),
+                                        Point(5, 5)]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_memory(self):
+        writer = camlib.GCodeWriter()
+        writer.write("G00 X0Y0\n")
+        writer.write("G01 Z-0.1\nG00 Z0.1\n")
+        self.assertEqual(writer.getvalue(), "G00 X0Y0\nG01 Z-0.1\nG00 Z0.1\n")
+        self.assertEqual(list(writer.lines()), ["G00 X0Y0\n", "G01 Z-0.1\n", "G00 Z0.1\n"])
+
+    def test_gcode_property(self):
+        job = camlib.CNCjob()
+        self.assertEqual(job.gcode, "")
+        job.gcode = "G20\nG90\n"
+        self.assertEqual(job.gcode, "G20\nG90\n")
+
+        d = job.to_dict()
+        job2 = camlib.CNCjob()
+        job2.from_dict(d)
+        self.assertEqual(job2.gcode, job.gcode)
+
+    def test_geometry_to_file(self):
+        job = camlib.CNCjob()
+        job.generate_from_geometry_2(self.geometry, multidepth=True, depthpercut=0.03)
+
+        filename = os.path.join(self.path, "job.gcode")
+        job_file = camlib.CNCjob()
+        job_file.generate_from_geometry_2(self.geometry, multidepth=True, depthpercut=0.03,
+                                          gcode_file=filename)
+
+        with open(filename) as f:
+            self.assertEqual(f.read(), job.gcode)
+        self.assertEqual(job_file.gcode, job.gcode)
+
+        job.gcode_parse()
+        job_file.gcode_parse()
+        self.assertEqual(len(job_file.gcode_parsed), len(job.gcode_parsed))
+
+    def test_excellon_to_file(self):
+        excellon = camlib.Excellon()
+        excellon.parse_file(self.excellon_file)
+
+        job = camlib.CNCjob()
+        job.generate_from_excellon_by_tool(excellon, "all", toolchange=True)
+
+        filename = os.path.join(self.path, "drills.gcode")
+        job_file = camlib.CNCjob()
+        job_file.generate_from_excellon_by_tool(excellon, "all", toolchange=True,
+                                                gcode_file=filename)
+
+        self.assertGreater(len(job.gcode), 0)
+        self.assertEqual(job_file.gcode, job.gcode)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import camlib
+from FlatCAMCache import GeometryCache
+
+
+class GeometryCacheTest(unittest.TestCase):
+
+    gerber_file = "tests/gerber_files/detector_copper_bottom.gbr"
+    excellon_file = "tests/excellon_files/case1.drl"
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = GeometryCache(os.path.join(self.path, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_gerber(self):
+        key = GeometryCache.key(self.gerber_file, "gerber", {"follow": False})
+
+        gerber = camlib.Gerber()
+        self.assertFalse(self.cache.load(key, gerber))
+        gerber.parse_file(self.gerber_file)
+        self.cache.store(key, gerber)
+
+        cached = camlib.Gerber()
+        self.assertTrue(self.cache.load(key, cached))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        self.assertTrue(cached.solid_geometry.equals(gerber.solid_geometry))
+        self.assertEqual(cached.units, gerber.units)
+        self.assertEqual(cached.apertures, gerber.apertures)
+
+    def test_excellon(self):
+        key = GeometryCache.key(self.excellon_file, "excellon", {"zeros": "L"})
+
+        excellon = camlib.Excellon()
+        excellon.parse_file(self.excellon_file)
+        excellon.create_geometry()
+        self.cache.store(key, excellon)
+
+        cached = camlib.Excellon()
+        self.assertTrue(self.cache.load(key, cached))
+
+        self.assertEqual(cached.tools, excellon.tools)
+        self.assertEqual(cached.zeros, excellon.zeros)
+        self.assertEqual(len(cached.drills), len(excellon.drills))
+        for drill, cached_drill in zip(excellon.drills, cached.drills):
+            self.assertEqual(drill['tool'], cached_drill['tool'])
+            self.assertTrue(drill['point'].equals(cached_drill['point']))
+        self.assertEqual(len(cached.solid_geometry), len(excellon.solid_geometry))
+
+    def test_key(self):
+        key1 = GeometryCache.key(self.gerber_file, "gerber", {"follow": False})
+        key2 = GeometryCache.key(self.gerber_file, "gerber", {"follow": True})
+        key3 = GeometryCache.key(self.gerber_file, "gerber", {"follow": False})
+        self.assertNotEqual(key1, key2)
+        self.assertEqual(key1, key3)
+
+    def test_eviction(self):
+        gerber = camlib.Gerber()
+        gerber.parse_file(self.gerber_file)
+
+        self.cache.store('a', gerber)
+        entry_size = self.cache.size()
+        self.cache.max_size = entry_size * 2
+
+        self.cache.store('b', gerber)
+        os.utime(self.cache.entry_path('a'), (1, 1))
+        os.utime(self.cache.entry_path('b'), (2, 2))
+
+        # 'a' was used least recently and is dropped.
+        self.cache.store('c', gerber)
+        keys = sorted(entry[2] for entry in self.cache.entries())
+        self.assertEqual(keys, ['b', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
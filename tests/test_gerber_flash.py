@@ -0,0 +1,44 @@
+import unittest
+import camlib
+from shapely.geometry import Point
+
+
+class GerberFlashCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.gerber = camlib.Gerber()
+        macro = camlib.ApertureMacro('THERMAL')
+        macro.append("7,0,0,0.08,0.05,0.01,45*")
+        macro.parse_content()
+        self.gerber.aperture_macros['THERMAL'] = macro
+
+        self.gerber.aperture_parse('10', 'C', '0.1')
+        self.gerber.aperture_parse('11', 'R', '0.05X0.12')
+        self.gerber.aperture_parse('12', 'O', '0.05X0.12')
+        self.gerber.aperture_parse('13', 'P', '0.1X5X30')
+        self.gerber.aperture_parse('14', 'THERMAL', None)
+
+    def test_flash_equals_direct(self):
+        locations = [(0.0, 0.0), (1.25, -3.5), (-0.3, 0.7)]
+
+        for apid in self.gerber.apertures:
+            for x, y in locations:
+                flash = self.gerber.flash(x, y, apid)
+                direct = camlib.Gerber.create_flash_geometry(Point(x, y), self.gerber.apertures[apid])
+                self.assertEqual(flash.geom_type, direct.geom_type, apid)
+                self.assertAlmostEqual(flash.symmetric_difference(direct).area, 0.0, places=9, msg=apid)
+
+        self.assertEqual(self.gerber.flash_cache_misses, len(self.gerber.apertures))
+        self.assertEqual(self.gerber.flash_cache_hits, len(self.gerber.apertures) * (len(locations) - 1))
+
+    def test_redefine_aperture(self):
+        small = self.gerber.flash(0, 0, '10')
+        self.gerber.aperture_parse('10', 'C', '0.2')
+        large = self.gerber.flash(0, 0, '10')
+
+        self.assertAlmostEqual(large.area / small.area, 4.0, places=6)
+        self.assertEqual(self.gerber.flash_cache_misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import random
+import unittest
+
+import camlib
+from shapely.geometry import Point, box
+from shapely.ops import unary_union
+
+
+class GerberPolarityTest(unittest.TestCase):
+
+    gerber = [
+        "%FSLAX24Y24*%",
+        "%MOIN*%",
+        "%ADD10C,0.1*%",
+        "%ADD11C,0.05*%",
+        "%LPD*%",
+        "G36*",
+        "X0Y0D02*",
+        "X10000Y0D01*",
+        "X10000Y10000D01*",
+        "X0Y10000D01*",
+        "X0Y0D01*",
+        "G37*",
+        "%LPC*%",
+        "G54D10*",
+        "X2000Y2000D03*",
+        "X5000Y5000D03*",
+        "%LPD*%",
+        "G54D11*",
+        "X5000Y5000D03*",
+        "%LPC*%",
+        "G54D10*",
+        "X8000Y8000D03*",
+        "M02*"
+    ]
+
+    def test_evaluate_layers(self):
+        random.seed(0)
+        layers = []
+        for k in range(20):
+            polys = [Point(random.uniform(0, 10), random.uniform(0, 10)).buffer(random.uniform(0.2, 1.5))
+                     for _ in range(10)]
+            layers.append(('D' if k % 2 == 0 else 'C', unary_union(polys)))
+
+        expected = camlib.Polygon()
+        for polarity, geo in layers:
+            if polarity == 'D':
+                expected = expected.union(geo)
+            else:
+                expected = expected.difference(geo)
+
+        result = camlib.Gerber.evaluate_layers(layers)
+        self.assertAlmostEqual(result.symmetric_difference(expected).area, 0.0, places=9)
+
+    def test_plane(self):
+        # Small cutouts in a large plane, which is cut into pieces
+        # around them, some of them across the cuts.
+        random.seed(1)
+        layers = [('D', box(0, 0, 50, 30))]
+        for k in range(60):
+            x, y = random.uniform(0, 50), random.uniform(0, 30)
+            layers.append(('C', Point(x, y).buffer(0.6)))
+            layers.append(('D', Point(x, y).buffer(0.3)))
+        layers.append(('C', box(24, 14, 26, 16)))
+
+        expected = camlib.Polygon()
+        for polarity, geo in layers:
+            if polarity == 'D':
+                expected = expected.union(geo)
+            else:
+                expected = expected.difference(geo)
+
+        result = camlib.Gerber.evaluate_layers(layers)
+        self.assertAlmostEqual(result.symmetric_difference(expected).area, 0.0, places=9)
+        # The pieces were joined back.
+        self.assertEqual(len(result.geoms), len(expected.geoms))
+        self.assertEqual(sum(len(p.interiors) for p in result.geoms),
+                         sum(len(p.interiors) for p in expected.geoms))
+
+    def test_empty(self):
+        result = camlib.Gerber.evaluate_layers([('C', box(0, 0, 1, 1))])
+        self.assertTrue(result.is_empty)
+
+    def test_parse(self):
+        gerber = camlib.Gerber()
+        gerber.parse_lines(self.gerber)
+
+        expected = box(0, 0, 1, 1)
+        for x, y in [(0.2, 0.2), (0.5, 0.5), (0.8, 0.8)]:
+            expected = expected.difference(Point(x, y).buffer(0.05))
+        expected = expected.union(Point(0.5, 0.5).buffer(0.025))
+
+        self.assertAlmostEqual(gerber.solid_geometry.area, expected.area, places=4)
+        self.assertTrue(gerber.solid_geometry.contains(Point(0.5, 0.5)))
+        self.assertFalse(gerber.solid_geometry.contains(Point(0.8, 0.8)))
+
+
+if __name__ == '__main__':
+    unittest.main()
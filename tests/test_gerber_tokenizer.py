@@ -0,0 +1,68 @@
+import unittest
+import camlib
+
+
+class GerberTokenizerTest(unittest.TestCase):
+
+    statements = [
+        "X1500Y-2000D01*",
+        "Y-2000X1500D01*",
+        "X1500D1*",
+        "G01X1500Y2000D02*",
+        "G1X1500*",
+        "G02X1500Y2000I-300J400D01*",
+        "G03X100Y0I-50J0D02*",
+        "I-300J400D01*",
+        "G02X1Y2I3J4D03*",
+        "G01X1Y1I1J1*",
+        "G02D01*",
+        "G01D01*",
+        "G01*",
+        "G3*",
+        "D03*",
+        "D2*",
+        "D10*",
+        "G54D10*",
+        "G36*",
+        "G37*",
+        "G74*",
+        "G75*",
+        "G70*",
+        "G91*",
+        "G04 Comment *",
+        "G4 Another comment *",
+        "%ADD10C,0.1*%",
+        "%ADD11R,0.05X0.12*%",
+        "%LPC*%",
+        "%LPD*%",
+        "%FSLAX24Y24*%",
+        "%MOMM*%",
+        "%IPPOS*%",
+        "M02*",
+        "M00*",
+        "*",
+        ""
+    ]
+
+    def setUp(self):
+        self.gerber = camlib.Gerber()
+
+    def test_statements(self):
+        for statement in self.statements:
+            self.assertEqual(self.gerber.tokenize(statement),
+                             self.gerber.tokenize_regex(statement),
+                             statement)
+
+    def test_file(self):
+        gerber_fast = camlib.Gerber()
+        gerber_fast.parse_file("tests/gerber_files/detector_copper_bottom.gbr")
+
+        gerber_regex = camlib.Gerber()
+        gerber_regex.use_fast_tokenizer = False
+        gerber_regex.parse_file("tests/gerber_files/detector_copper_bottom.gbr")
+
+        self.assertTrue(gerber_fast.solid_geometry.equals(gerber_regex.solid_geometry))
+
+
+if __name__ == '__main__':
+    unittest.main()
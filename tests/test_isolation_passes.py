@@ -0,0 +1,38 @@
+import unittest
+import camlib
+from shapely.geometry import LineString, Point, box
+from shapely.ops import unary_union
+
+
+class IsolationPassesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.geometry = camlib.Geometry()
+        self.geometry.solid_geometry = unary_union(
+            [Point(0, 0).buffer(0.5), box(1, -0.2, 3, 0.2), box(3.1, -1, 3.4, 1),
+             LineString([(0, 2), (2, 2.3), (3, 1.8)]).buffer(0.1)])
+        self.offsets = [0.05, 0.12, 0.19, 0.26]
+
+    def test_passes(self):
+        passes = self.geometry.isolation_passes(self.offsets, tolerance=0.0002)
+        self.assertEqual(len(passes), 4)
+        self.assertTrue(passes[0].equals(self.geometry.isolation_geometry(0.05)))
+
+        for offset, geom in zip(self.offsets, passes):
+            expected = self.geometry.isolation_geometry(offset)
+            self.assertTrue(geom.is_valid)
+            self.assertLess(geom.symmetric_difference(expected).area, 1e-3 * expected.area)
+            self.assertLess(geom.boundary.hausdorff_distance(expected.boundary), 0.002)
+
+            # Gaps closed by the full offset are closed too.
+            self.assertEqual(len(getattr(geom, 'geoms', [geom])),
+                             len(getattr(expected, 'geoms', [expected])))
+
+    def test_unordered(self):
+        passes = self.geometry.isolation_passes([0.1, 0.05])
+        self.assertTrue(passes[1].equals(self.geometry.isolation_geometry(0.05)))
+        self.assertEqual(self.geometry.isolation_passes([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+import camlib
+
+
+class MmapLinesTest(unittest.TestCase):
+
+    lines = ["G04 Comment*", "X1500Y2000D01*G54D10*", "", "%FSLAX24Y24*%", "  X1Y1D03*  ", "M02*"]
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def write(self, text):
+        with open(self.filename, 'w', newline='') as f:
+            f.write(text)
+
+    def test_line_endings(self):
+        for newline in ["\n", "\r\n", "\r"]:
+            self.write(newline.join(self.lines) + newline)
+            for chunk_size in [1, 2, 5, 16, 1 << 20]:
+                self.assertEqual(list(camlib.mmap_lines(self.filename, chunk_size=chunk_size)),
+                                 self.lines, (repr(newline), chunk_size))
+
+    def test_no_final_newline(self):
+        self.write("\n".join(self.lines))
+        self.assertEqual(list(camlib.mmap_lines(self.filename, chunk_size=4)), self.lines)
+
+    def test_empty(self):
+        self.assertEqual(list(camlib.mmap_lines(self.filename)), [])
+
+    def test_progress(self):
+        self.write("\n".join(self.lines * 100))
+        progress = []
+        for _ in camlib.mmap_lines(self.filename, chunk_size=64, progress=progress.append):
+            pass
+        self.assertEqual(progress, sorted(set(progress)))
+        self.assertEqual(progress[-1], 100)
+
+    def test_statements(self):
+        self.write("\n".join(self.lines))
+        statements = list(camlib.Gerber.split_statements(camlib.mmap_lines(self.filename)))
+        self.assertEqual(statements, ["G04 Comment*", "X1500Y2000D01*", "G54D10*",
+                                      "%FSLAX24Y24*%", "X1Y1D03*", "M02*"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+import camlib
+from shapely.geometry import LineString, Point, box
+from shapely.ops import unary_union
+
+
+class ModalGeneratorTest(unittest.TestCase):
+
+    excellon_file = "tests/excellon_files/case1.drl"
+
+    def compress(self, gcode, tolerance=0.0):
+        job = camlib.CNCjob()
+        out = ''.join(job.modal_generator(gcode.splitlines(True), tolerance))
+        self.assertEqual(job.modal_stats, [len(gcode), len(out)])
+        return out
+
+    def assertSameMoves(self, gcode, out, tolerance=0.0):
+        def parsed(text):
+            job = camlib.CNCjob()
+            job.gcode = text
+            job.gcode_parse()
+            return job
+
+        job, job_out = parsed(gcode), parsed(out)
+        self.assertEqual(job_out.units, job.units)
+        for kind in "CT":
+            paths = unary_union([p['geom'] for p in job.gcode_parsed if p['kind'][0] == kind])
+            paths_out = unary_union([p['geom'] for p in job_out.gcode_parsed if p['kind'][0] == kind])
+            self.assertEqual(paths.is_empty, paths_out.is_empty)
+            if not paths.is_empty:
+                self.assertLessEqual(paths.hausdorff_distance(paths_out), tolerance + 1e-9)
+
+    def test_words(self):
+        gcode = "G20\n" \
+                "G00 Z0.1000\n" \
+                "G00 X1.0000Y1.0000\n" \
+                "G00 X1.0000Y1.0000\n" \
+                "F2.00\n" \
+                "G01 Z-0.0100\n" \
+                "F3.00\n" \
+                "G01 X2.0000Y1.0000\n" \
+                "G01 X2.0000Y3.0000\n" \
+                "M05\n"
+        self.assertEqual(self.compress(gcode),
+                         "G20\n"
+                         "G00 Z0.1000\n"
+                         "X1.0000Y1.0000\n"
+                         "G01 Z-0.0100F2.00\n"
+                         "X2.0000F3.00\n"
+                         "Y3.0000\n"
+                         "M05\n")
+
+    def test_merge(self):
+        gcode = "G00 Z0\nG00 X0Y0\nG01 X1Y0\nG01 X2Y0.00005\nG01 X3Y0\nG01 X3Y1\nG01 X2Y1\n"
+        self.assertEqual(self.compress(gcode), "G00 Z0\nX0Y0\nG01 X1\nX2Y0.00005\nX3Y0\nY1\nX2\n")
+        self.assertEqual(self.compress(gcode, 0.0001), "G00 Z0\nX0Y0\nG01 X3\nY1\nX2\n")
+
+        # Going back is not merged.
+        self.assertEqual(self.compress("G00 X0Y0\nG01 X2Y0\nG01 X1Y0\n", 0.1),
+                         "G00 X0Y0\nG01 X2\nX1\n")
+
+    def test_unknown_state(self):
+        # After G81, XY lines are holes and are left as they are.
+        gcode = "G00 Z0.1\nG00 X1Y1\nG98\nG81 X1Y1 Z-0.1 R0.1\nX1Y1\nX2Y2\nG80\nG00 X2Y2\nG00 Z0.1\n"
+        self.assertEqual(self.compress(gcode),
+                         "G00 Z0.1\nX1Y1\nG98\nG81 X1Y1 Z-0.1 R0.1\nX1Y1\nX2Y2\nG80\nG00 X2Y2\nZ0.1\n")
+
+    def test_geometry_job(self):
+        geometry = camlib.Geometry()
+        geometry.solid_geometry = [box(0, 0, 2, 1).buffer(0.2).exterior,
+                                   LineString([(3, 3), (3.5, 3), (4, 3), (4, 4)]),
+                                   Point(5, 5)]
+        job = camlib.CNCjob(zdownrate=2.0)
+        job.generate_from_geometry_2(geometry, multidepth=True, depthpercut=0.001)
+
+        out = self.compress(job.gcode)
+        self.assertLess(len(out), len(job.gcode) * 0.8)
+        self.assertSameMoves(job.gcode, out)
+
+        out = self.compress(job.gcode, 0.001)
+        self.assertSameMoves(job.gcode, out, 0.001)
+
+    def test_excellon_jobs(self):
+        excellon = camlib.Excellon()
+        excellon.parse_file(self.excellon_file)
+        for canned in [False, True]:
+            job = camlib.CNCjob()
+            job.generate_from_excellon_by_tool(excellon, "all", toolchange=True, canned=canned)
+            out = self.compress(job.gcode)
+            self.assertLess(len(out), len(job.gcode))
+            self.assertSameMoves(job.gcode, out)
+
+
+if __name__ == '__main__':
+    unittest.main()
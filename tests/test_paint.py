@@ -208,5 +208,59 @@ class PaintConnectTest3(PaintTestCase):
         # self.plot_summary_A(paths, tooldia, result, "WALK Expected")
 
 
+class PaintConnectTest4(PaintTestCase):
+    """
+    Walks near the edge of the tool's reach, and counts.
+    """
+
+    def setUp(self):
+        self.boundary = Polygon([[0, 0], [0, 5], [5, 5], [5, 0]])
+
+    def walk(self, y, tooldia=1.0):
+        paths = [
+            LineString([[1, y], [2, y]]),
+            LineString([[3, y], [4, y]])
+        ]
+        return Geometry.paint_connect(mkstorage(paths), self.boundary, tooldia)
+
+    def test_edge(self):
+        # The tool fits along y = 0.5 exactly and not below.
+        for y, joins in [(0.52, 1), (0.51, 1), (0.49, 0), (0.45, 0), (2.5, 1)]:
+            result = self.walk(y)
+            self.assertEqual((result.joins, result.lifts), (joins, 1 - joins))
+            self.assertEqual(len(list(result.get_objects())), 2 - joins)
+
+    def test_coords(self):
+        result = list(self.walk(2.5).get_objects())
+        self.assertEqual(list(result[0].coords), [(1, 2.5), (2, 2.5), (3, 2.5), (4, 2.5)])
+
+
+class PaintPolygonsTest(unittest.TestCase):
+    """
+    Paints in worker processes, same as in this process.
+    """
+
+    def setUp(self):
+        self.polygons = [Point(2 * i, 0).buffer(0.5 + 0.1 * i) for i in range(5)]
+        self.polygons.append(Point(20, 0).buffer(0.01))
+
+    def test_workers(self):
+        for method in ["standard", "seed", "lines"]:
+            serial = paint_polygons(self.polygons, method, 0.1, margin=0.05, workers=1)
+            parallel = paint_polygons(self.polygons, method, 0.1, margin=0.05, workers=2)
+
+            self.assertEqual(serial[1:], parallel[1:])
+            self.assertIsNone(serial[0][-1])
+            for paths1, paths2 in zip(serial[0][:-1], parallel[0][:-1]):
+                self.assertEqual([list(p.coords) for p in paths1],
+                                 [list(p.coords) for p in paths2])
+
+    def test_progress(self):
+        counts = []
+        paint_polygons(self.polygons, "standard", 0.1, workers=2,
+                       progress=lambda done, total: counts.append((done, total)))
+        self.assertEqual(counts, [(i + 1, 6) for i in range(6)])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import camlib
+from shapely.geometry import Point, LineString
+from shapely.ops import unary_union
+
+
+class ParallelUnionTest(unittest.TestCase):
+
+    def test_overlapping_tiles(self):
+        # A grid of pads and long traces crossing many tiles.
+        polygons = [Point(x * 0.1, y * 0.1).buffer(0.04) for x in range(30) for y in range(30)]
+        polygons += [LineString([(0, y * 0.3), (3, y * 0.3 + 0.5)]).buffer(0.02) for y in range(10)]
+
+        expected = unary_union(polygons)
+        result = camlib.parallel_union(polygons, processes=2, min_polygons=0)
+
+        self.assertTrue(result.is_valid)
+        self.assertAlmostEqual(result.symmetric_difference(expected).area, 0.0, places=9)
+        self.assertEqual(len(getattr(result, 'geoms', [result])),
+                         len(getattr(expected, 'geoms', [expected])))
+
+    def test_gerber(self):
+        gerber1 = camlib.Gerber()
+        gerber1.parse_file("tests/gerber_files/STM32F4-spindle.cmp")
+
+        gerber2 = camlib.Gerber()
+        gerber2.use_parallel_union = True
+        gerber2.parse_file("tests/gerber_files/STM32F4-spindle.cmp")
+
+        self.assertAlmostEqual(gerber1.solid_geometry.symmetric_difference(gerber2.solid_geometry).area,
+                               0.0, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
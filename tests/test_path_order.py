@@ -0,0 +1,144 @@
+import unittest
+import numpy as np
+import camlib
+from shapely.geometry import LineString, LinearRing, Point
+
+
+def square(x, y, size=1.0):
+    return np.array([[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]])
+
+
+class PathOrderTest(unittest.TestCase):
+
+    def random_paths(self, n, seed=0):
+        rng = np.random.RandomState(seed)
+        paths = []
+        for i in range(n):
+            x, y = rng.uniform(0, 20, 2)
+            if i % 3 == 0:
+                paths.append(square(x, y, rng.uniform(0.1, 1)))
+            elif i % 3 == 1:
+                paths.append(np.vstack(([x, y], [x, y] + rng.uniform(-1, 1, (3, 2)))))
+            else:
+                paths.append(np.array([[x, y]]))
+        return paths
+
+    def test_permutation(self):
+        for n in [0, 1, 2, 3, 10, 100]:
+            paths = self.random_paths(n, n)
+            order, entries = camlib.path_order(paths)
+            self.assertEqual(sorted(order.tolist()), list(range(n)))
+            for index, entry in zip(order, entries):
+                self.assertIn(entry, camlib.path_entries(paths[index], index % 3 != 1)[0])
+
+    def test_orient(self):
+        ring = square(0, 0)
+        rotated = camlib.orient_path(ring, 2)
+        self.assertEqual(rotated.tolist(), [[1, 1], [0, 1], [0, 0], [1, 0], [1, 1]])
+        line = np.array([[0, 0], [1, 0], [2, 1]])
+        self.assertEqual(camlib.orient_path(line, 2).tolist(), [[2, 1], [1, 0], [0, 0]])
+        self.assertIs(camlib.orient_path(line, 0), line)
+
+    def test_nearest_first(self):
+        # Without rotating closed paths nor improving, the nearest
+        # open path end or closed path start is taken each time.
+        paths = [np.array([[5, 0], [4, 0]]), square(1, 0), np.array([[10, 0], [8, 0]])]
+        order, entries = camlib.path_order(paths, rotate=False, time_budget=0)
+        self.assertEqual(order.tolist(), [1, 0, 2])
+        self.assertEqual(entries.tolist(), [0, 1, 1])
+
+    def test_rotate(self):
+        # The ring is entered at its vertex nearest to the line's end.
+        paths = [np.array([[0, 0], [5, 0]]), square(6, 0)]
+        order, entries = camlib.path_order(paths, time_budget=0)
+        self.assertEqual(order.tolist(), [0, 1])
+        self.assertEqual(paths[1][entries[1]].tolist(), [6, 0])
+
+    def test_shorter(self):
+        paths = self.random_paths(300)
+        before = camlib.path_travel(paths, *camlib.path_order(paths, rotate=False, time_budget=0))
+        nearest = camlib.path_travel(paths, *camlib.path_order(paths, time_budget=0))
+        after = camlib.path_travel(paths, *camlib.path_order(paths))
+        self.assertLessEqual(nearest, before)
+        self.assertLess(after, nearest)
+
+    def test_never_longer(self):
+        rng = np.random.RandomState(1)
+        for case in range(100):
+            paths = []
+            for i in range(rng.randint(2, 40)):
+                x, y = rng.uniform(0, 20, 2)
+                if rng.randint(2):
+                    theta = np.linspace(0, 2 * np.pi, rng.randint(4, 12))
+                    radius = rng.uniform(0.1, 2)
+                    ring = np.column_stack((x + radius * np.cos(theta), y + radius * np.sin(theta)))
+                    ring[-1] = ring[0]
+                    paths.append(ring)
+                else:
+                    steps = rng.uniform(-1, 1, (rng.randint(1, 5), 2))
+                    paths.append(np.vstack(([x, y], [x, y] + np.cumsum(steps, axis=0))))
+            returning = rng.randint(2, size=len(paths)).astype(bool)
+
+            before = camlib.path_order(paths, returning=returning, rotate=False, time_budget=0)
+            after = camlib.path_order(paths, returning=returning, time_budget=0.1)
+            self.assertLessEqual(camlib.path_travel(paths, *after, returning=returning),
+                                 camlib.path_travel(paths, *before, returning=returning) + 1e-9)
+
+    def test_returning(self):
+        # Open paths that end where they start are left at their entry.
+        paths = [np.array([[1, 0], [1, 5]]), np.array([[2, 0], [2, 5]])]
+        returning = np.array([True, True])
+        order, entries = camlib.path_order(paths, returning=returning)
+        self.assertEqual(entries.tolist(), [0, 0])
+        self.assertAlmostEqual(camlib.path_travel(paths, order, entries, returning=returning), 2)
+
+
+class GeometryPathOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.geometry = camlib.Geometry()
+        rng = np.random.RandomState(1)
+        shapes = []
+        for i in range(60):
+            x, y = rng.uniform(0, 10, 2)
+            if i % 2:
+                shapes.append(LinearRing(square(x, y, 0.5)[:-1]))
+            else:
+                shapes.append(LineString([(x, y), (x + 0.5, y + 0.25)]))
+        shapes.append(Point(3, 3))
+        self.geometry.solid_geometry = shapes
+
+    def cut_segments(self, job):
+        job.gcode_parse()
+        segments = set()
+        for path in job.gcode_parsed:
+            if path['kind'][0] == 'C':
+                coords = np.round(np.array(path['geom'].coords), 4).tolist()
+                for a, b in zip(coords[:-1], coords[1:]):
+                    if a != b:
+                        segments.add(tuple(sorted([tuple(a), tuple(b)])))
+        return segments
+
+    def test_generate(self):
+        for multidepth in [False, True]:
+            job = camlib.CNCjob()
+            job.generate_from_geometry_2(self.geometry, multidepth=multidepth, depthpercut=0.001)
+            job_opt = camlib.CNCjob()
+            job_opt.generate_from_geometry_2(self.geometry, multidepth=multidepth,
+                                             depthpercut=0.001, optimize=True)
+
+            self.assertEqual(job.path_travel[0], job.path_travel[1])
+            self.assertAlmostEqual(job_opt.path_travel[0], job.path_travel[0])
+            self.assertLess(job_opt.path_travel[1], job_opt.path_travel[0])
+            self.assertEqual(self.cut_segments(job_opt), self.cut_segments(job))
+
+    def test_source_unchanged(self):
+        coords = [list(geo.coords) for geo in self.geometry.solid_geometry]
+        job = camlib.CNCjob()
+        job.generate_from_geometry_2(self.geometry, multidepth=True, depthpercut=0.001,
+                                     optimize=True)
+        self.assertEqual([list(geo.coords) for geo in self.geometry.solid_geometry], coords)
+
+
+if __name__ == '__main__':
+    unittest.main()
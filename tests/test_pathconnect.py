@@ -84,5 +84,31 @@ class PathConnectTest1(unittest.TestCase):
         matches = [p for p in result if p.equals(LineString([[0, 0], [1, 1], [2, 1]]))]
         self.assertEqual(len(matches), 1)
 
+    def test_chain_connect(self):
+        # Pieces of a polyline in random order, some reversed.
+        line = [[i, i % 3] for i in range(30)]
+        paths = [LineString(line[i:i + 2]) if i % 4 else LineString(line[i:i + 2][::-1])
+                 for i in range(29)]
+        paths = paths[1::2] + paths[::2]
+
+        result = Geometry.path_connect(mkstorage(paths))
+
+        result = list(result.get_objects())
+        self.assertEqual(len(result), 1)
+        self.assertTrue(result[0].equals(LineString(line)))
+        self.assertEqual(len(result[0].coords), len(line))
+
+    def test_tolerance_connect(self):
+        paths = [
+            LineString([[0, 0], [1, 1]]),
+            LineString([[1 + 1e-12, 1 - 1e-12], [2, 1]])
+        ]
+
+        result = list(Geometry.path_connect(mkstorage(paths)).get_objects())
+        self.assertEqual(len(result), 1)
+
+        result = list(Geometry.path_connect(mkstorage(paths), tolerance=1e-13).get_objects())
+        self.assertEqual(len(result), 2)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
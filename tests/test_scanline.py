@@ -0,0 +1,101 @@
+import unittest
+import numpy as np
+import camlib
+from shapely.geometry import LineString, Point, Polygon, box
+from shapely.prepared import prep
+
+
+def star(n=12, inner=0.5):
+    angles = np.linspace(0, 2 * np.pi, 2 * n, endpoint=False)
+    radii = np.where(np.arange(2 * n) % 2, inner, 1.0)
+    return Polygon(np.column_stack((radii * np.cos(angles), radii * np.sin(angles))))
+
+
+class ScanlineSegmentsTest(unittest.TestCase):
+
+    def assertSameSegments(self, polygon, ys):
+        rows, lefts, rights = camlib.scanline_segments(polygon, ys)[:3]
+        found = [(ys[row], round(x0, 9), round(x1, 9)) for row, x0, x1 in zip(rows, lefts, rights)]
+
+        expected = []
+        for y in ys:
+            line = LineString([(-10, y), (10, y)]).intersection(polygon)
+            for part in getattr(line, 'geoms', [line]):
+                if isinstance(part, LineString) and part.length > 0:
+                    x0, x1 = sorted([part.coords[0][0], part.coords[-1][0]])
+                    expected.append((y, round(x0, 9), round(x1, 9)))
+        self.assertEqual(found, sorted(expected, key=lambda s: (list(ys).index(s[0]), s[1])))
+
+    def test_shapes(self):
+        ys = list(np.linspace(0.95, -0.95, 37))
+        holed = box(-1, -1, 1, 1).difference(Point(0.3, 0.2).buffer(0.3)).difference(
+            Point(-0.4, -0.3).buffer(0.25))
+        for polygon in [Point(0, 0).buffer(1), star(), holed, holed.union(box(2, -1, 3, 1))]:
+            self.assertSameSegments(polygon, ys)
+
+    def test_vertex(self):
+        # Lines through vertices and along edges.
+        diamond = Polygon([(0, -1), (1, 0), (0, 1), (-1, 0)])
+        rows, lefts, rights = camlib.scanline_segments(diamond, [0.5, 0, -0.5])[:3]
+        self.assertEqual(rows.tolist(), [0, 1, 2])
+        self.assertEqual(list(zip(lefts, rights)), [(-0.5, 0.5), (-1, 1), (-0.5, 0.5)])
+
+        rows = camlib.scanline_segments(box(0, 0, 1, 1), [0, 1])[0]
+        self.assertEqual(rows.tolist(), [0])
+
+
+class ClearPolygon3Test(unittest.TestCase):
+
+    tooldia = 0.05
+
+    def shapes(self):
+        rng = np.random.RandomState(0)
+        holes = [Point(x, y).buffer(r) for x, y, r in
+                 zip(rng.uniform(0, 4, 20), rng.uniform(0, 2, 20), rng.uniform(0.02, 0.1, 20))]
+        pour = box(0, 0, 4, 2)
+        for hole in holes:
+            pour = pour.difference(hole)
+        return [Point(0, 0).buffer(1), star(), pour]
+
+    def test_zigzag(self):
+        for polygon in self.shapes():
+            lines = camlib.Geometry.clear_polygon3(polygon, self.tooldia, contour=False,
+                                                   connect=False)
+            zigzag = camlib.Geometry.clear_polygon3(polygon, self.tooldia, contour=False,
+                                                    connect=False, zigzag=True)
+            lines = list(lines.get_objects())
+            zigzag = list(zigzag.get_objects())
+            self.assertLess(len(zigzag), len(lines))
+
+            # Stays within reach of the tool.
+            fits = prep(polygon.buffer(-self.tooldia / 2 + 1e-6))
+            for path in zigzag:
+                self.assertTrue(fits.covers(path))
+
+            # Cuts all the lines.
+            rows = set()
+            for path in zigzag:
+                coords = np.round(np.array(path.coords), 9)
+                for a, b in zip(coords[:-1], coords[1:]):
+                    if a[1] == b[1] and a[0] != b[0]:
+                        rows.add((a[1], min(a[0], b[0]), max(a[0], b[0])))
+            for line in lines:
+                coords = np.round(np.array(line.coords), 9)
+                self.assertIn((coords[0][1], coords[0][0], coords[1][0]), rows)
+
+    def test_connect(self):
+        # One zig-zag and the contour in a circle.
+        circle = camlib.Geometry.clear_polygon3(Point(0, 0).buffer(1), self.tooldia, zigzag=True)
+        self.assertEqual(circle.lifts, 1)
+
+        for polygon in self.shapes():
+            lines = camlib.Geometry.clear_polygon3(polygon, self.tooldia)
+            zigzag = camlib.Geometry.clear_polygon3(polygon, self.tooldia, zigzag=True)
+            self.assertLess(zigzag.lifts, lines.lifts)
+
+    def test_empty(self):
+        self.assertIsNone(camlib.Geometry.clear_polygon3(Point(0, 0).buffer(0.01), 0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import json
+import unittest
+
+import numpy as np
+import camlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from shapely import affinity
+from shapely.geometry import LineString
+
+
+class ToolpathStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        geometry = camlib.Geometry()
+        geometry.solid_geometry = [LineString([(0, 0), (1, 0), (1, 1)]),
+                                   LineString([(2, 2), (3, 3), (2.5, 4)])]
+
+        self.job = camlib.CNCjob()
+        self.job.generate_from_geometry_2(geometry, multidepth=True, depthpercut=0.03)
+        self.job.gcode_parse()
+        self.paths = [(path['geom'], path['kind']) for path in self.job.gcode_parsed]
+
+    def assertPaths(self, expected):
+        paths = self.job.gcode_parsed
+        self.assertEqual(len(paths), len(expected))
+        for path, (geom, kind) in zip(paths, expected):
+            self.assertEqual(path['kind'], kind)
+            self.assertTrue(np.allclose(np.array(path['geom'].coords), np.array(geom.coords)))
+
+    def test_store(self):
+        toolpaths = self.job.toolpaths
+        self.assertEqual(len(toolpaths), len(self.paths))
+        self.assertEqual(toolpaths.offsets[-1], len(toolpaths.vertices))
+        self.assertEqual(set(toolpaths.kinds.tolist()), {1, 2})
+
+        for i, (geom, kind) in enumerate(self.paths):
+            self.assertEqual(toolpaths.kind(i), kind)
+            self.assertEqual(toolpaths.path(i).tolist(), [list(c) for c in geom.coords])
+
+    def test_from_list(self):
+        toolpaths = camlib.ToolpathStore.from_list(self.job.gcode_parsed)
+        self.assertEqual(toolpaths.vertices.tolist(), self.job.toolpaths.vertices.tolist())
+        self.assertEqual(toolpaths.offsets.tolist(), self.job.toolpaths.offsets.tolist())
+        self.assertEqual(toolpaths.kinds.tolist(), self.job.toolpaths.kinds.tolist())
+
+    def test_scale(self):
+        self.job.scale(2.5)
+        self.assertPaths([(affinity.scale(g, 2.5, 2.5, origin=(0, 0)), k) for g, k in self.paths])
+
+    def test_offset(self):
+        self.job.offset((1.5, -0.25))
+        self.assertPaths([(affinity.translate(g, 1.5, -0.25), k) for g, k in self.paths])
+
+    def test_skew(self):
+        self.job.skew(10, -20, (0.5, 1.0))
+        self.assertPaths([(affinity.skew(g, 10, -20, origin=(0.5, 1.0)), k) for g, k in self.paths])
+
+    def test_rotate(self):
+        self.job.rotate(30, (0.5, 1.0))
+        self.assertPaths([(affinity.rotate(g, 30, origin=(0.5, 1.0)), k) for g, k in self.paths])
+
+    def test_rotate_centers(self):
+        self.job.rotate(30)
+        self.assertPaths([(affinity.rotate(g, 30, origin='center'), k) for g, k in self.paths])
+
+    def test_mirror(self):
+        self.job.mirror("Y", (0.5, 1.0))
+        self.assertPaths([(affinity.scale(g, -1.0, 1.0, origin=(0.5, 1.0)), k) for g, k in self.paths])
+
+    def test_lazy_geometry(self):
+        self.assertIsNone(self.job._solid_geometry)
+        union = self.job.solid_geometry
+        self.assertTrue(union.equals(camlib.cascaded_union([g for g, k in self.paths])))
+        self.assertIs(self.job.solid_geometry, union)
+
+        self.job.mirror("X", (0, 0))
+        self.assertIsNone(self.job._solid_geometry)
+        xmin, ymin, xmax, ymax = self.job.solid_geometry.bounds
+        self.assertEqual((xmin, ymin, xmax, ymax), (0, -4, 3, 0))
+
+    def test_bounds(self):
+        self.assertEqual(self.job.bounds(), camlib.cascaded_union([g for g, k in self.paths]).bounds)
+        self.job.offset((1, 2))
+        self.assertEqual(self.job.bounds(), (1, 2, 4, 6))
+        self.assertIsNone(self.job._solid_geometry)
+        self.assertEqual(camlib.CNCjob().bounds(), (0, 0, 0, 0))
+
+    def test_fast_plot(self):
+        figure = Figure(dpi=100, figsize=(4, 4))
+        FigureCanvasAgg(figure)
+        axes = figure.add_axes([0, 0, 1, 1])
+        axes.set_xlim(-1, 4)
+        axes.set_ylim(-1, 4)
+
+        collections = self.job.plot_collections(axes, 0.1)
+        self.assertEqual(len(axes.collections), 2)
+        self.assertEqual(len(axes.patches), 0)
+        self.assertEqual(len(axes.texts), 0)
+
+        n_travels = len(collections["T"].get_segments())
+        n_cuts = len(collections["C"].get_segments())
+        self.assertEqual(n_travels + n_cuts, len(self.paths))
+        self.assertEqual(n_cuts, len([k for g, k in self.paths if k[0] == "C"]))
+
+        # 0.1 units at 400 px / 5 units, in points.
+        self.assertAlmostEqual(collections["C"].get_linewidth()[0], 0.1 * 80 * 72 / 100.0)
+
+        # Zoom in past the density threshold around (2, 2).
+        axes.set_xlim(1.9, 2.1)
+        axes.set_ylim(1.9, 2.1)
+        self.assertAlmostEqual(collections["C"].get_linewidth()[0], 0.1 * 2000 * 72 / 100.0)
+        labels = [text.get_text() for text in axes.texts]
+        self.assertGreater(len(labels), 0)
+        starts = [g.coords[0] for g, k in self.paths]
+        for label in labels:
+            x, y = starts[int(label) - 1]
+            self.assertTrue(1.9 <= x <= 2.1 and 1.9 <= y <= 2.1)
+
+        axes.set_xlim(-1, 4)
+        axes.set_ylim(-1, 4)
+        self.assertEqual(len(axes.texts), 0)
+
+    def test_fast_plot_updates(self):
+        figure = Figure(dpi=100, figsize=(4, 4))
+        FigureCanvasAgg(figure)
+        axes = figure.add_axes([0, 0, 1, 1])
+        calls = []
+
+        def density():
+            calls.append(axes)
+            return 0.01, 0.01
+
+        self.job.plot_collections(axes, 0.1, density=density)
+        self.assertEqual(len(calls), 1)
+
+        # One update per zoom or pan.
+        axes.set_xlim(1.9, 2.1)
+        axes.set_ylim(1.9, 2.1)
+        self.assertEqual(len(calls), 2)
+        axes.set_ylim(1.9, 2.1)
+        self.assertEqual(len(calls), 2)
+
+        # Replotting stops updating the previous plot.
+        other = figure.add_axes([0, 0, 1, 1])
+        self.job.plot_collections(other, 0.1, density=lambda: (0.01, 0.01))
+        axes.set_xlim(0, 1)
+        axes.set_ylim(0, 1)
+        self.assertEqual(len(calls), 2)
+
+    def test_serialization(self):
+        text = json.dumps(self.job.to_dict(), default=camlib.to_dict)
+        self.assertNotIn("Shply", text)
+
+        job = camlib.CNCjob()
+        job.from_dict(json.loads(text, object_hook=camlib.dict2obj))
+        self.assertPaths([(p['geom'], p['kind']) for p in job.gcode_parsed])
+
+    def test_old_project(self):
+        # Projects saved before had the list of paths.
+        d = self.job.to_dict()
+        d['gcode_parsed'] = [{"geom": geom, "kind": kind} for geom, kind in self.paths]
+        d = json.loads(json.dumps(d, default=camlib.to_dict), object_hook=camlib.dict2obj)
+
+        job = camlib.CNCjob()
+        job.from_dict(d)
+        self.assertEqual(job.toolpaths.vertices.tolist(), self.job.toolpaths.vertices.tolist())
+        self.assertEqual(job.toolpaths.kinds.tolist(), self.job.toolpaths.kinds.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+# This script times Geometry.clear_polygon3() with straight and
+# zig-zag lines on a ground pour with holes, and reports the
+# tool lifts left.
+# Run python clear_polygon3_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+rng = np.random.RandomState(0)
+n = 50
+holes = unary_union([Point(x, y).buffer(r) for x, y, r in
+                     zip(rng.uniform(0, 4, n), rng.uniform(0, 2, n), rng.uniform(0.01, 0.1, n))])
+pour = shply_box(0, 0, 4, 2).difference(holes)
+
+for polygon, name in [(pour, "pour"), (Point(0, 0).buffer(1), "circle")]:
+    for tooldia in [0.01, 0.05]:
+        for zigzag in [False, True]:
+            start = time.time()
+            geoms = Geometry.clear_polygon3(polygon, tooldia, zigzag=zigzag)
+            print("%s, tool %.2f, %s: %d joins, %d lifts in %.3f s" %
+                  (name, tooldia, "zigzag" if zigzag else "lines",
+                   geoms.joins, geoms.lifts, time.time() - start))
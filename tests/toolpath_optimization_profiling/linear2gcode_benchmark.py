@@ -0,0 +1,37 @@
+# This script times formatting the cutting moves of dense paths
+# one vertex at a time and with format_lines(), and generating
+# a multi-depth job, where the moves of each path are formatted
+# once and reused in every pass.
+# Run python linear2gcode_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+geometry = Geometry()
+geometry.solid_geometry = [Point(0.3 * col, 0.3 * row).buffer(0.1, 256).exterior
+                           for row in range(20) for col in range(20)]
+paths = [np.array(ring.coords) for ring in geometry.solid_geometry]
+template = "G01 " + CNCjob.defaults["coordinate_format"] + "\n"
+print("%d paths, %d vertices" % (len(paths), sum(len(path) for path in paths)))
+
+start = time.time()
+for path in paths:
+    ''.join([template % (x, y) for x, y in path.tolist()])
+print("Vertex by vertex: %.2f s" % (time.time() - start))
+
+start = time.time()
+for path in paths:
+    format_lines(path, template)
+print("format_lines(): %.2f s" % (time.time() - start))
+
+for passes in [1, 5]:
+    job = CNCjob(z_cut=-0.002 * passes)
+    start = time.time()
+    job.generate_from_geometry_2(geometry, multidepth=True, depthpercut=0.002)
+    print("generate_from_geometry_2(), %d passes: %.2f s" % (passes, time.time() - start))
@@ -0,0 +1,29 @@
+# This script times Geometry.paint_connect() on the paths that
+# clear a ground pour with holes, and reports the tool lifts
+# left out of the possible ones.
+# Run python paint_connect_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+rng = np.random.RandomState(0)
+n = 200
+holes = unary_union([Point(x, y).buffer(r) for x, y, r in
+                     zip(rng.uniform(0, 4, n), rng.uniform(0, 2, n), rng.uniform(0.01, 0.06, n))])
+pour = shply_box(0, 0, 4, 2).difference(holes)
+tooldia = 0.01
+
+for method in [Geometry.clear_polygon, Geometry.clear_polygon3]:
+    storage = method(pour, tooldia, overlap=0.15, connect=False)
+    count = len(list(storage.get_objects()))
+
+    start = time.time()
+    result = Geometry.paint_connect(storage, pour, tooldia)
+    print("%s: %d paths, %d joins, %d lifts in %.2f s" %
+          (method.__name__, count, result.joins, result.lifts, time.time() - start))
@@ -0,0 +1,27 @@
+# This script times paint_polygons() on a board of pads, painted
+# in this process and in a pool of worker processes.
+# Run python paint_polygons_benchmark.py [workers]
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+if __name__ == '__main__':
+    rng = np.random.RandomState(0)
+    polygons = [shply_box(x, y, x + w, y + h) for x, y, w, h in
+                zip(rng.uniform(0, 10, 200), rng.uniform(0, 10, 200),
+                    rng.uniform(0.2, 1, 200), rng.uniform(0.2, 1, 200))]
+    tooldia = 0.01
+
+    for workers in [1, int(sys.argv[1]) if len(sys.argv) > 1 else 0]:
+        start = time.time()
+        results, joins, lifts = paint_polygons(polygons, "standard", tooldia,
+                                               workers=workers)
+        print("%d workers: %d paths, %d joins, %d lifts in %.2f s" %
+              (workers, sum(len(paths) for paths in results if paths),
+               joins, lifts, time.time() - start))
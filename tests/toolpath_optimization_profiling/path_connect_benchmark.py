@@ -0,0 +1,49 @@
+# This script times Geometry.path_connect() on the paths of
+# tests/test_pathconnect.py repeated on a grid, in random order,
+# with polylines split into segments.
+# Run python path_connect_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+
+def get_pts(o):
+    return [o.coords[0], o.coords[-1]]
+
+
+def make_paths(copies, segments=20):
+    rng = np.random.RandomState(0)
+    paths = []
+    for k in range(copies):
+        x, y = 4 * (k % 100), 4 * (k // 100)
+        paths += [LineString([[x, y], [x + 1, y + 1]]),
+                  LineString([[x + 1, y + 1], [x + 2, y + 1]]),
+                  LineString([[x - 0.5, y + 0.5], [x + 0.5, y]]),
+                  LinearRing([[x + 1, y + 1], [x + 2, y + 2], [x + 1, y + 3], [x, y + 2]])]
+
+        # A polyline cut in pieces, some of them reversed.
+        line = np.column_stack((x + np.linspace(0, 3, segments + 1),
+                                y + 3.5 + 0.2 * np.sin(np.arange(segments + 1))))
+        for i in range(segments):
+            piece = line[i:i + 2] if rng.rand() < 0.5 else line[i + 1:i - 1 if i else None:-1]
+            paths.append(LineString(piece))
+    rng.shuffle(paths)
+    return paths
+
+
+for copies in [100, 1000, 4000]:
+    paths = make_paths(copies)
+    storage = FlatCAMRTreeStorage()
+    storage.get_points = get_pts
+    for path in paths:
+        storage.insert(path)
+
+    start = time.time()
+    result = list(Geometry.path_connect(storage).get_objects())
+    print("%d paths into %d: %.2f s" % (len(paths), len(result), time.time() - start))
@@ -0,0 +1,37 @@
+# This script compares the travel between the isolation paths of
+# a board (repeated on a panel) ordered like generate_from_geometry_2()
+# did before path_order(), i.e. nearest path first and closed paths
+# entered at their first vertex, and ordered by path_order().
+# Run python path_order_benchmark.py
+
+import sys
+import time
+sys.path.append('../../')
+
+from camlib import *
+
+log = logging.getLogger('base2')
+log.setLevel(logging.WARNING)
+
+gerber = Gerber()
+gerber.parse_file('../gerber_files/detector_copper_bottom.gbr')
+board = Geometry()
+board.solid_geometry = gerber.isolation_geometry(0.008)
+paths = [np.array(geo.coords) for geo in board.flatten(pathonly=True)]
+paths = [p + (2.5 * col, 2.5 * row) for row in range(4) for col in range(5) for p in paths]
+
+start = time.time()
+order, entries = path_order(paths, rotate=False, time_budget=0)
+print("%d paths, nearest first: %.2f in %.2f s" %
+      (len(paths), path_travel(paths, order, entries), time.time() - start))
+
+start = time.time()
+order, entries = path_order(paths, time_budget=0)
+print("Nearest first, any vertex: %.2f in %.2f s" %
+      (path_travel(paths, order, entries), time.time() - start))
+
+for budget in [1.0, 5.0]:
+    start = time.time()
+    order, entries = path_order(paths, time_budget=budget)
+    print("path_order(), %.0f s budget: %.2f in %.2f s" %
+          (budget, path_travel(paths, order, entries), time.time() - start))